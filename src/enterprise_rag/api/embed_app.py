@@ -0,0 +1,101 @@
+"""Embedding-only service: the model behind /embed, with no vector store.
+
+Other services that need the same vectors call this instead of loading
+their own copy of the model. Configuration is shared with the main app
+(RAG_EMBED_*), and batching and caching behave the same.
+
+    uvicorn enterprise_rag.api.embed_app:app --port 8001
+"""
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+
+from .responses import ORJSONResponse
+from .middleware import RequestClass, AdmissionController, AdmissionMiddleware
+from .routes.embed import create_embed_router
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+try:
+    from ..core.embedding_service import EmbeddingService
+    from ..core.embed_batcher import EmbeddingBatcher
+    from ..core.health import HealthMonitor, HEALTHY, ERROR
+
+    embedding_service = EmbeddingService(
+        model_name=os.getenv("RAG_EMBED_MODEL", "all-mpnet-base-v2"),
+        token_budget=int(os.getenv("RAG_EMBED_TOKEN_BUDGET", "8192")),
+        replicas=int(os.getenv("RAG_EMBED_REPLICAS", "1")),
+        num_threads=int(os.getenv("RAG_EMBED_THREADS", "0")) or None
+    )
+    embedding_batcher = EmbeddingBatcher(
+        embedding_service,
+        max_batch=int(os.getenv("RAG_EMBED_BATCH", "64")),
+        max_wait_ms=float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", "2")),
+        cache_size=int(os.getenv("RAG_EMBED_CACHE_SIZE", "4096"))
+    )
+
+    health_monitor = HealthMonitor(interval=float(os.getenv("RAG_HEALTH_INTERVAL", "15")))
+    health_monitor.register(
+        "embedding_service",
+        lambda: HEALTHY if embedding_service.is_ready() else ERROR
+    )
+    admission_controller = AdmissionController()
+    admission_controller.add_class(
+        RequestClass(
+            "embed",
+            max_concurrency=int(os.getenv("RAG_EMBED_CONCURRENCY", "4")),
+            max_queue=int(os.getenv("RAG_EMBED_QUEUE", "64")),
+            queue_timeout=float(os.getenv("RAG_EMBED_QUEUE_TIMEOUT", "10")),
+            retry_after=1
+        ),
+        paths=("/embed",)
+    )
+    logger.info("Embedding service mode initialized")
+except Exception as e:
+    logger.error(f"Error initializing embedding service mode: {e}")
+    raise
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await health_monitor.start()
+    yield
+    await health_monitor.stop()
+    embedding_service.close()
+
+app = FastAPI(
+    title="RAG Embedding Service",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+app.include_router(
+    create_embed_router(
+        embedding_batcher,
+        embedding_service.model_name,
+        max_texts=int(os.getenv("RAG_EMBED_MAX_TEXTS", "2048"))
+    )
+)
+
+@app.get("/livez")
+async def liveness_probe():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_probe():
+    """Readiness: the model is loaded"""
+    ready = health_monitor.is_ready()
+    return ORJSONResponse(
+        {"status": "ready" if ready else "not_ready", "model": embedding_service.model_name},
+        status_code=200 if ready else 503
+    )
+
+@app.get("/admin/admission")
+async def admission_stats():
+    """Concurrency, queue depth and rejection counters of /embed"""
+    return admission_controller.stats()
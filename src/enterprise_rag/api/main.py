@@ -3,15 +3,21 @@ from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Depends
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from fastapi.responses import HTMLResponse, StreamingResponse
+from typing import Optional, Dict, Any, List, Tuple
+from contextlib import asynccontextmanager
 import shutil
 from pathlib import Path
 import os
 import asyncio
 import numpy as np
 
+from ..schemas import QueryRequest, QueryResponse
+from .responses import ORJSONResponse, dumps
+from .middleware import (
+    RequestClass, AdmissionController, AdmissionMiddleware, WriterProxyMiddleware, TracingMiddleware
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,36 +25,196 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Pydantic models
-class QueryRequest(BaseModel):
-    query: str
-
-class QueryResponse(BaseModel):
-    categories: Dict[str, List[Dict[str, Any]]]
-    message: Optional[str] = None
-    processing_time: Optional[float] = None
-
 # Initialize components
 try:
     from ..core.document_processor import DocumentProcessor
-    from ..core.embedding_service import EmbeddingService
+    from ..core.embedding_service import EmbeddingService, PRIORITY_BULK
     from ..core.vector_store import VectorStore
+    from ..core.remote_chroma import RemoteChromaClient
+    from ..core.mmap_index import SharedIndexReader, IndexPublisher
+    from ..core.snapshot import export_snapshot
     from ..core.rag_engine import RAGEngine
+    from ..core.deadline import Deadline
+    from ..core.health import HealthMonitor, HEALTHY, EMPTY, ERROR
+    from ..core.tracing import Trace, TraceSampler, current_trace, stage
+    from ..core.memory_governor import MemoryGovernor, container_memory_limit
+    from ..core.ingest_log import IngestLog, chunk_ids
+    from ..core.embed_batcher import EmbeddingBatcher
+    from .routes.embed import create_embed_router
 
     doc_processor = DocumentProcessor()
-    embedding_service = EmbeddingService()
-    vector_store = VectorStore(
-        collection_name="radiation_docs",
-        persist_directory="data/vector_store"
+    embedding_service = EmbeddingService(
+        model_name=os.getenv("RAG_EMBED_MODEL", "all-mpnet-base-v2"),
+        token_budget=int(os.getenv("RAG_EMBED_TOKEN_BUDGET", "8192")),
+        replicas=int(os.getenv("RAG_EMBED_REPLICAS", "1")),
+        num_threads=int(os.getenv("RAG_EMBED_THREADS", "0")) or None
+    )
+    # Queries and /embed requests share forward passes and a vector cache
+    embedding_batcher = EmbeddingBatcher(
+        embedding_service,
+        max_batch=int(os.getenv("RAG_EMBED_BATCH", "64")),
+        max_wait_ms=float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", "2")),
+        cache_size=int(os.getenv("RAG_EMBED_CACHE_SIZE", "4096"))
+    )
+
+    # standalone: one process owns everything; writer/reader: see api/prefork.py
+    service_role = os.getenv("RAG_ROLE", "standalone")
+    shared_index_dir = os.getenv("RAG_SHARED_INDEX_DIR", "data/shared_index")
+    writer_socket = os.getenv("RAG_WRITER_SOCKET", "data/writer.sock")
+    snapshot_dir = Path(os.getenv("RAG_SNAPSHOT_DIR", "data/snapshots"))
+    snapshot_dtype = os.getenv("RAG_SNAPSHOT_DTYPE", "float32")
+
+    # Every pod pointed at the same Chroma server shares one index
+    chroma_url = os.getenv("RAG_CHROMA_URL", "")
+    remote_chroma = (
+        RemoteChromaClient(
+            chroma_url,
+            timeout=float(os.getenv("RAG_CHROMA_TIMEOUT", "10")),
+            retries=int(os.getenv("RAG_CHROMA_RETRIES", "3")),
+            max_connections=int(os.getenv("RAG_CHROMA_MAX_CONNECTIONS", "32")),
+            query_batch_ms=float(os.getenv("RAG_CHROMA_QUERY_BATCH_MS", "2")),
+            token=os.getenv("RAG_CHROMA_TOKEN") or None
+        )
+        if chroma_url and service_role != "reader" else None
+    )
+
+    if service_role == "reader":
+        vector_store = SharedIndexReader(shared_index_dir)
+    else:
+        vector_store = VectorStore(
+            collection_name="radiation_docs",
+            persist_directory="data/vector_store",
+            candidate_documents=int(os.getenv("RAG_COARSE_CANDIDATES", "20")),
+            coarse_min_documents=int(os.getenv("RAG_COARSE_MIN_DOCUMENTS", "50")),
+            dedup_threshold=float(os.getenv("RAG_DEDUP_THRESHOLD", "0")) or None,
+            reduced_dimension=int(os.getenv("RAG_REDUCED_DIMENSION", "0")) or None,
+            projection_mode=os.getenv("RAG_PROJECTION", "pca"),
+            rescore_factor=int(os.getenv("RAG_RESCORE_FACTOR", "4")),
+            hot_tier_chunks=int(os.getenv("RAG_HOT_TIER_CHUNKS", "0")),
+            tier_promote_hits=float(os.getenv("RAG_TIER_PROMOTE_HITS", "3")),
+            tier_half_life=float(os.getenv("RAG_TIER_HALF_LIFE", "3600")),
+            tier_nprobe=int(os.getenv("RAG_TIER_NPROBE", "16")),
+            remote=remote_chroma
+        )
+    # Durable record of in-progress uploads; replayed or rolled back on startup
+    ingest_log = None
+    if service_role != "reader":
+        ingest_log = IngestLog(
+            "data/vector_store/ingest_log.sqlite3",
+            vector_store,
+            group_size=int(os.getenv("RAG_INGEST_GROUP_SIZE", "256"))
+        )
+        ingest_log.recover()
+    index_publisher = (
+        IndexPublisher(vector_store, shared_index_dir, dtype=snapshot_dtype)
+        if service_role == "writer" else None
+    )
+    rag_engine = RAGEngine(
+        embedding_service,
+        vector_store,
+        cache_size=int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024")),
+        cache_threshold=float(os.getenv("RAG_QUERY_CACHE_THRESHOLD", "0.95")),
+        diversity=float(os.getenv("RAG_MMR_DIVERSITY", "0")),
+        batcher=embedding_batcher
+    )
+
+    health_monitor = HealthMonitor(
+        interval=float(os.getenv("RAG_HEALTH_INTERVAL", "15")),
+        deep_check_ttl=float(os.getenv("RAG_HEALTH_DEEP_TTL", "30"))
+    )
+    health_monitor.register("document_processor", lambda: HEALTHY)
+    health_monitor.register(
+        "embedding_service",
+        lambda: HEALTHY if embedding_service.is_ready() else ERROR,
+        deep_check=lambda: (
+            HEALTHY
+            if isinstance(embedding_service.generate_embeddings(["health check"])[0], np.ndarray)
+            else ERROR
+        )
+    )
+    health_monitor.register(
+        "vector_store",
+        lambda: EMPTY if vector_store.is_empty() else HEALTHY
+    )
+    trace_sampler = TraceSampler(
+        sample_every=int(os.getenv("RAG_TRACE_SAMPLE_EVERY", "0")),
+        profile=os.getenv("RAG_TRACE_PROFILE", "false").lower() == "true"
+    )
+    profile_dir = os.getenv("RAG_PROFILE_DIR", "data/profiles")
+    query_deadline_ms = int(os.getenv("RAG_QUERY_DEADLINE_MS", "0"))
+    # Without an explicit RSS limit, stay clear of the container's OOM limit
+    rss_limit_mb = int(os.getenv("RAG_INGEST_RSS_LIMIT_MB", "0"))
+    memory_limit = container_memory_limit()
+    memory_governor = MemoryGovernor(
+        budget_bytes=int(os.getenv("RAG_INGEST_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024,
+        rss_limit_bytes=(
+            rss_limit_mb * 1024 * 1024 if rss_limit_mb
+            else int(memory_limit * 0.85) if memory_limit else None
+        )
+    )
+    admission_controller = AdmissionController()
+    admission_controller.add_class(
+        RequestClass(
+            "query",
+            max_concurrency=int(os.getenv("RAG_QUERY_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("RAG_QUERY_QUEUE", "64")),
+            queue_timeout=float(os.getenv("RAG_QUERY_QUEUE_TIMEOUT", "5")),
+            retry_after=1
+        ),
+        paths=("/query", "/query/stream", "/query-debug")
+    )
+    admission_controller.add_class(
+        RequestClass(
+            "ingest",
+            max_concurrency=int(os.getenv("RAG_INGEST_CONCURRENCY", "1")),
+            max_queue=int(os.getenv("RAG_INGEST_QUEUE", "4")),
+            queue_timeout=float(os.getenv("RAG_INGEST_QUEUE_TIMEOUT", "30")),
+            retry_after=10
+        ),
+        paths=("/upload",)
+    )
+    admission_controller.add_class(
+        RequestClass(
+            "embed",
+            max_concurrency=int(os.getenv("RAG_EMBED_CONCURRENCY", "4")),
+            max_queue=int(os.getenv("RAG_EMBED_QUEUE", "64")),
+            queue_timeout=float(os.getenv("RAG_EMBED_QUEUE_TIMEOUT", "10")),
+            retry_after=1
+        ),
+        paths=("/embed",)
     )
-    rag_engine = RAGEngine(embedding_service, vector_store)
     logger.info("Components initialized successfully")
 except Exception as e:
     logger.error(f"Error initializing components: {e}")
     raise
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await health_monitor.start()
+    if index_publisher is not None:
+        index_publisher.start()
+    tiers = getattr(vector_store, "tiers", None)
+    if tiers is not None:
+        tiers.start()
+    resume = asyncio.create_task(_resume_ingestion(ingest_log.recovered.get("resume", []))) if ingest_log else None
+    yield
+    if resume is not None:
+        resume.cancel()
+    if index_publisher is not None:
+        index_publisher.stop()
+    if tiers is not None:
+        tiers.stop()
+    await health_monitor.stop()
+    embedding_service.close()
+    if remote_chroma is not None:
+        remote_chroma.close()
+
 # Initialize FastAPI
-app = FastAPI(title="RAG System")
+app = FastAPI(
+    title="RAG System",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # CORS setup
 app.add_middleware(
@@ -59,6 +225,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reader workers hand every write to the single writer process
+if service_role == "reader":
+    app.add_middleware(
+        WriterProxyMiddleware,
+        socket_path=writer_socket,
+        paths=(
+            "/upload", "/documents", "/clear-database",
+            "/admin/compact", "/admin/snapshot", "/admin/projection",
+            "/admin/tiers", "/admin/tiers/maintain"
+        )
+    )
+
+# Per-stage tracing of sampled or explicitly requested queries
+app.add_middleware(
+    TracingMiddleware,
+    sampler=trace_sampler,
+    paths=("/query", "/query/stream"),
+    profile_dir=profile_dir
+)
+
+# Admission control, added last so it runs first
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+app.include_router(
+    create_embed_router(
+        embedding_batcher,
+        embedding_service.model_name,
+        max_texts=int(os.getenv("RAG_EMBED_MAX_TEXTS", "2048"))
+    )
+)
+
 # Templates setup
 templates = Jinja2Templates(directory="templates")
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -72,89 +269,209 @@ async def read_root(request: Request):
         logger.error(f"Error serving template: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Rough memory costs used to size ingestion reservations
+PARSE_BYTES_PER_FILE_BYTE = 4  # extracted text plus chunk strings and overlap
+CHUNK_OVERHEAD_BYTES = 512  # chunk dict and metadata
+EMBED_BYTES_PER_DIMENSION = 40  # tensor, NumPy copy and the float list sent to Chroma
+INGEST_WINDOW = 256  # chunks embedded and stored per reservation
+
+def _ingest_document(file_path: Path, job) -> Tuple[int, int]:
+    """Parse, embed and store one document; runs in a worker thread.
+
+    Every stage reserves its estimated memory with the governor first, so
+    concurrent uploads wait for each other instead of exhausting memory.
+    Stored batches go through the ingestion log, so a failure or crash
+    never leaves the document half stored. Returns the number of chunks
+    and how many of them were near-duplicates stored by reference.
+    """
+    logger.info("Processing document...")
+    parse_bytes = file_path.stat().st_size * PARSE_BYTES_PER_FILE_BYTE
+    with memory_governor.reservation(job, parse_bytes, "parse"):
+        chunks = doc_processor.process_document(str(file_path))
+    logger.info(f"Document processed into {len(chunks)} chunks")
+    total = len(chunks)
+    doc_hash = chunks[0]["metadata"].get("doc_hash") if chunks else None
+    doc_key = ingest_log.begin(str(file_path), doc_hash)
+    try:
+        duplicates = _store_chunks(chunks, doc_key, job)
+    except Exception:
+        ingest_log.abort(doc_key)
+        raise
+    logger.info("Documents stored successfully")
+    return total, len(duplicates)
+
+def _store_chunks(chunks: List[Dict[str, Any]], doc_key: str, job) -> List[Tuple[str, Dict[str, Any]]]:
+    """Deduplicate, embed and log one document's chunks; returns its duplicates"""
+    total = len(chunks)
+    ids = chunk_ids(chunks)
+    duplicates = []
+    # Near-duplicates of stored chunks skip embedding entirely
+    dedup = getattr(vector_store, "dedup", None)
+    if dedup is not None:
+        plan = dedup.partition(chunks, ids)
+        chunks, ids, duplicates = plan.unique, plan.ids, plan.duplicates
+        logger.info(
+            f"{len(duplicates)} of {total} chunks are near-duplicates of stored chunks, "
+            f"{plan.existing} were stored by an earlier upload of this file"
+        )
+
+    # The chunks stay alive until the job ends
+    memory_governor.reserve(
+        job,
+        sum(len(chunk["text"]) for chunk in chunks) + CHUNK_OVERHEAD_BYTES * len(chunks),
+        "chunks"
+    )
+
+    # Embed in length-sorted, token-budgeted batches at bulk priority and
+    # store each batch as soon as it is ready, one window at a time
+    logger.info("Generating embeddings...")
+    bytes_per_chunk = (embedding_service.dimension or 768) * EMBED_BYTES_PER_DIMENSION
+    for start in range(0, len(chunks), INGEST_WINDOW):
+        window = chunks[start:start + INGEST_WINDOW]
+        window_ids = ids[start:start + INGEST_WINDOW]
+        with memory_governor.reservation(job, len(window) * bytes_per_chunk, "embed"):
+            texts = [chunk["text"] for chunk in window]
+            for indices, embeddings in embedding_service.iter_embeddings(texts, priority=PRIORITY_BULK):
+                ingest_log.append(
+                    doc_key,
+                    [window[i] for i in indices],
+                    embeddings,
+                    [window_ids[i] for i in indices]
+                )
+            # Nothing of this window may outlive its memory reservation
+            ingest_log.flush(doc_key)
+    # Recorded last, once every canonical chunk they point at is stored
+    ingest_log.finish(doc_key, duplicates)
+    return duplicates
+
+async def _resume_ingestion(sources: List[str]):
+    """Ingest again the documents rolled back after a crash"""
+    for source in sources:
+        file_path = Path(source)
+        if not file_path.exists():
+            logger.warning(f"Cannot resume ingestion of {source}: file is gone")
+            continue
+        try:
+            with memory_governor.job(file_path.name) as job:
+                chunk_count, _ = await asyncio.to_thread(_ingest_document, file_path, job)
+            logger.info(f"Resumed ingestion of {source}: {chunk_count} chunks")
+        except Exception as e:
+            logger.error(f"Resumed ingestion of {source} failed: {e}")
+
+def _save_upload(file: UploadFile, file_path: Path):
+    with file_path.open("wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
 # File upload endpoint
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     try:
         logger.info(f"Received file upload: {file.filename}")
-        
+
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-        
+
         # Create upload directory
         upload_dir = Path("data/documents")
         upload_dir.mkdir(parents=True, exist_ok=True)
-        
+
         # Save file path
         file_path = upload_dir / file.filename
         logger.info(f"Saving file to: {file_path}")
-        
+
         # Save uploaded file
         try:
-            with file_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            await asyncio.to_thread(_save_upload, file, file_path)
             logger.info("File saved successfully")
         except Exception as e:
             logger.error(f"Error saving file: {e}")
             raise HTTPException(status_code=500, detail=f"File save failed: {str(e)}")
 
-        # Process document
+        # Process document off the event loop so probes and queries stay responsive
         try:
-            logger.info("Processing document...")
-            chunks = doc_processor.process_document(str(file_path))
-            logger.info(f"Document processed into {len(chunks)} chunks")
-
-            # Generate embeddings
-            logger.info("Generating embeddings...")
-            texts = [chunk["text"] for chunk in chunks]
-            embeddings = embedding_service.generate_embeddings(texts)
-            logger.info(f"Generated embeddings of shape {embeddings.shape}")
-
-            # Store in vector store
-            logger.info("Storing in vector database...")
-            vector_store.add_documents(chunks, embeddings)
-            logger.info("Documents stored successfully")
+            with memory_governor.job(file.filename) as job:
+                chunk_count, duplicate_count = await asyncio.to_thread(_ingest_document, file_path, job)
 
             return {
-                "message": f"Successfully processed {len(chunks)} chunks from {file.filename}",
+                "message": f"Successfully processed {chunk_count} chunks from {file.filename}",
                 "status": "success",
-                "chunks": len(chunks)
+                "chunks": chunk_count,
+                "duplicates": duplicate_count,
+                "memory": job.report()
             }
         except Exception as e:
             logger.error(f"Error processing document: {e}")
             raise HTTPException(status_code=500, detail=f"Document processing failed: {str(e)}")
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _query_deadline(query_req: QueryRequest) -> Optional[Deadline]:
+    """The request's own deadline, else the configured default (0 means none)"""
+    deadline_ms = query_req.deadline_ms or query_deadline_ms
+    return Deadline(deadline_ms / 1000) if deadline_ms else None
+
+async def _cancel_on_disconnect(request: Request, deadline: Deadline, task: asyncio.Task):
+    """Stop a query's work when its client goes away"""
+    while not task.done():
+        if await request.is_disconnected():
+            deadline.cancel("client disconnected")
+            task.cancel()
+            return
+        await asyncio.sleep(0.05)
+
 # Query endpoint
-@app.post("/query")
-async def query_system(query_req: QueryRequest):
+@app.post("/query", response_model=QueryResponse)
+async def query_system(query_req: QueryRequest, request: Request):
     try:
         logger.info(f"Processing query: {query_req.query}")
         
         # Check if vector store is empty
         if vector_store.is_empty():
             logger.warning("Vector store is empty")
-            return {
+            return ORJSONResponse({
                 "message": "No documents have been processed yet. Please upload a document first.",
                 "categories": {},
                 "processing_time": 0
-            }
+            })
 
-        # Process query
+        # Process query, abandoning it if the client disconnects
         start_time = asyncio.get_event_loop().time()
-        results = await rag_engine.process_query(query_req.query)
+        deadline = _query_deadline(query_req) or Deadline()
+        task = asyncio.ensure_future(rag_engine.process_query(
+            query_req.query,
+            top_k=query_req.top_k,
+            compact=query_req.compact,
+            max_text_length=query_req.max_text_length,
+            snippet_length=query_req.snippet_length,
+            diversity=query_req.diversity,
+            expand_neighbors=query_req.expand_neighbors,
+            deadline=deadline
+        ))
+        watcher = asyncio.ensure_future(_cancel_on_disconnect(request, deadline, task))
+        try:
+            results = await task
+        except asyncio.CancelledError:
+            if not deadline.cancelled:
+                raise
+            logger.info(f"Client disconnected; abandoned query: {query_req.query}")
+            return ORJSONResponse({"detail": "Client closed request"}, status_code=499)
+        finally:
+            watcher.cancel()
         processing_time = asyncio.get_event_loop().time() - start_time
         
         # Add processing time to results
         results["processing_time"] = processing_time
         
         logger.info(f"Query processed in {processing_time:.2f} seconds")
-        logger.info(f"Results: {results}")
-        
-        return results
+        logger.debug("Results: %s", results)
+
+        # Returning the response directly bypasses jsonable_encoder
+        with stage("serialize"):
+            return ORJSONResponse(results)
 
     except Exception as e:
         logger.error(f"Query failed: {e}")
@@ -163,10 +480,63 @@ async def query_system(query_req: QueryRequest):
             detail=f"Query processing failed: {str(e)}"
         )
 
+def _sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+# Streaming query endpoint
+@app.post("/query/stream")
+async def query_stream(query_req: QueryRequest):
+    """Stream query results as server-sent events"""
+    logger.info(f"Streaming query: {query_req.query}")
+
+    async def event_source():
+        # Flush headers immediately so the client sees the first byte
+        yield b": stream opened\n\n"
+
+        if vector_store.is_empty():
+            logger.warning("Vector store is empty")
+            yield _sse_event("done", {
+                "message": "No documents have been processed yet. Please upload a document first.",
+                "total_results": 0,
+                "processing_time": 0
+            })
+            return
+
+        start_time = asyncio.get_event_loop().time()
+        try:
+            async for event in rag_engine.stream_query(
+                query_req.query,
+                top_k=query_req.top_k,
+                max_text_length=query_req.max_text_length,
+                snippet_length=query_req.snippet_length,
+                diversity=query_req.diversity,
+                expand_neighbors=query_req.expand_neighbors,
+                deadline=_query_deadline(query_req)
+            ):
+                data = event["data"]
+                if event["event"] == "done":
+                    data["processing_time"] = asyncio.get_event_loop().time() - start_time
+                yield _sse_event(event["event"], data)
+        except Exception as e:
+            logger.error(f"Streaming query failed: {e}")
+            yield _sse_event("error", {"detail": f"Query processing failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Query debug endpoint
 @app.post("/query-debug")
-async def query_debug(query_req: QueryRequest):
-    """Debug endpoint to test query processing"""
+async def query_debug(query_req: QueryRequest, profile: bool = False):
+    """Debug endpoint to test query processing.
+
+    Always traces the query and returns the per-stage waterfall; with
+    ``profile=true`` it also returns the top functions from cProfile and
+    writes the full profile to RAG_PROFILE_DIR.
+    """
     try:
         logger.info(f"Debug: Received query: {query_req.query}")
         
@@ -183,16 +553,34 @@ async def query_debug(query_req: QueryRequest):
             query_embedding = embedding_service.generate_embeddings([query_req.query])[0]
             logger.info(f"Debug: Generated query embedding shape: {query_embedding.shape}")
             
-            # Get results
-            results = await rag_engine.process_query(query_req.query)
+            # Get results under a trace of their own
+            trace = Trace(profile=profile)
+            token = trace.activate()
+            try:
+                results = await rag_engine.process_query(
+                    query_req.query,
+                    top_k=query_req.top_k,
+                    compact=query_req.compact,
+                    max_text_length=query_req.max_text_length,
+                    snippet_length=query_req.snippet_length,
+                    diversity=query_req.diversity,
+                    expand_neighbors=query_req.expand_neighbors
+                )
+                with stage("serialize"):
+                    dumps(results)
+            finally:
+                trace.deactivate(token)
             logger.info(f"Debug: Query results: {results}")
             
-            return {
+            return ORJSONResponse({
                 "status": "success",
                 "vector_store_stats": stats,
                 "embedding_shape": query_embedding.shape,
-                "results": results
-            }
+                "results": results,
+                "trace": trace.summary(),
+                "profile": trace.top_functions() if profile else None,
+                "profile_path": trace.dump_profile(profile_dir) if profile else None
+            })
         else:
             return {
                 "status": "empty",
@@ -203,42 +591,189 @@ async def query_debug(query_req: QueryRequest):
         logger.error(f"Debug: Query error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Document delete endpoint
+@app.delete("/documents")
+async def delete_document(source: Optional[str] = None, doc_hash: Optional[str] = None):
+    """Delete one document's chunks by source path or content hash"""
+    if not source and not doc_hash:
+        raise HTTPException(status_code=400, detail="Provide source or doc_hash")
+    try:
+        removed = await asyncio.to_thread(
+            vector_store.delete_document, source=source, doc_hash=doc_hash
+        )
+        if removed == 0:
+            raise HTTPException(status_code=404, detail="No matching document found")
+        return {"message": f"Deleted {removed} chunks", "chunks": removed}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to delete document: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Compaction endpoint
+@app.post("/admin/compact")
+async def compact_store():
+    """Rebuild the collection and reclaim disk space after heavy churn"""
+    try:
+        return await asyncio.to_thread(vector_store.compact)
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Tiered index endpoints
+@app.get("/admin/tiers")
+async def tier_stats():
+    """Hot and cold tier sizes, hit ratio, promotions and the most-hit documents"""
+    tiers = getattr(vector_store, "tiers", None)
+    if tiers is None:
+        return {"enabled": False}
+    return {"enabled": True, **tiers.stats()}
+
+@app.post("/admin/tiers/maintain")
+async def maintain_tiers():
+    """Run a promotion/demotion pass now instead of waiting for the background one"""
+    tiers = getattr(vector_store, "tiers", None)
+    if tiers is None:
+        raise HTTPException(status_code=400, detail="Tiered search is not enabled")
+    try:
+        return await asyncio.to_thread(tiers.maintain)
+    except Exception as e:
+        logger.error(f"Tier maintenance failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Reduced-dimension projection endpoint
+@app.post("/admin/projection")
+async def fit_projection():
+    """Fit the dimensionality reduction on the corpus and rebuild the reduced index"""
+    try:
+        return await asyncio.to_thread(vector_store.fit_projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Projection fit failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Snapshot export endpoint
+@app.post("/admin/snapshot")
+async def create_snapshot(name: Optional[str] = None, dtype: Optional[str] = None):
+    """Write a snapshot file of the store while it keeps serving queries"""
+    name = Path(name or f"snapshot-{vector_store.version:08d}.snap").name
+    dtype = dtype or snapshot_dtype
+    if dtype not in ("float32", "float16"):
+        raise HTTPException(status_code=400, detail="dtype must be float32 or float16")
+    try:
+        return await asyncio.to_thread(export_snapshot, vector_store, snapshot_dir / name, dtype)
+    except Exception as e:
+        logger.error(f"Snapshot export failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Admission control statistics endpoint
+@app.get("/admin/admission")
+async def admission_stats():
+    """Per-class concurrency, queue depth and rejection counters"""
+    return admission_controller.stats()
+
+# Query coalescing statistics endpoint
+@app.get("/admin/coalescing")
+async def coalescing_stats():
+    """How many queries shared an identical in-flight retrieval"""
+    return rag_engine.single_flight.stats()
+
+# Semantic query cache statistics endpoint
+@app.get("/admin/query-cache")
+async def query_cache_stats():
+    """Exact and semantic hit counts of the query cache"""
+    if rag_engine.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **rag_engine.cache.stats()}
+
+# Near-duplicate index statistics endpoint
+@app.get("/admin/dedup")
+async def dedup_stats():
+    """Chunks in the near-duplicate index and duplicates stored by reference"""
+    dedup = getattr(vector_store, "dedup", None)
+    if dedup is None:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(dedup.stats)}
+
+# Ingestion log endpoint
+@app.get("/admin/ingest-log")
+async def ingest_log_stats():
+    """Group commit counters, documents in flight and the last crash recovery"""
+    if ingest_log is None:
+        return {"enabled": False}
+    return {"enabled": True, **await asyncio.to_thread(ingest_log.stats)}
+
+# Ingestion memory endpoint
+@app.get("/admin/memory")
+async def memory_stats():
+    """Ingestion memory budget, current reservations and per-job high-water marks"""
+    return memory_governor.stats()
+
+# Query tracing configuration endpoint
+@app.get("/admin/tracing")
+async def tracing_settings():
+    """Current query sampling settings and the number of traced requests"""
+    return trace_sampler.stats()
+
+@app.post("/admin/tracing")
+async def configure_tracing(sample_every: Optional[int] = None, profile: Optional[bool] = None):
+    """Trace one in every ``sample_every`` queries (0 disables sampling)"""
+    trace_sampler.configure(sample_every=sample_every, profile=profile)
+    return trace_sampler.stats()
+
+# Vector store statistics endpoint
+@app.get("/stats")
+async def store_stats():
+    """Collection statistics maintained in memory by the vector store"""
+    try:
+        return vector_store.get_stats()
+    except Exception as e:
+        logger.error(f"Failed to get stats: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Clear database endpoint
 @app.post("/clear-database")
 async def clear_database():
     try:
         logger.info("Clearing vector database")
-        vector_store.clear()
+        await asyncio.to_thread(vector_store.clear)
         return {"message": "Vector database cleared successfully"}
     except Exception as e:
         logger.error(f"Failed to clear database: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Health check endpoint
+# Health check endpoints
+@app.get("/livez")
+async def liveness_probe():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_probe():
+    """Readiness: cached component state, no model or store calls"""
+    components = health_monitor.snapshot()
+    ready = health_monitor.is_ready()
+    return ORJSONResponse(
+        {
+            "status": "ready" if ready else "not_ready",
+            "components": {name: c["status"] for name, c in components.items()}
+        },
+        status_code=200 if ready else 503
+    )
+
 @app.get("/health")
-async def health_check():
+async def health_check(deep: bool = False):
+    """Report cached component health; pass deep=true to exercise the model"""
     try:
-        # Check components
-        doc_processor_status = "healthy"
-        
-        # Check vector store
-        vector_store_status = "healthy" if not vector_store.is_empty() else "empty"
-        
-        # Check embedding service
-        try:
-            test_embedding = embedding_service.generate_embeddings(["test"])[0]
-            embedding_status = "healthy" if isinstance(test_embedding, np.ndarray) else "error"
-        except:
-            embedding_status = "error"
-        
+        components = await health_monitor.deep_check() if deep else health_monitor.snapshot()
+        healthy = all(c["status"] in (HEALTHY, EMPTY) for c in components.values())
+
         return {
-            "status": "healthy",
-            "components": {
-                "document_processor": doc_processor_status,
-                "embedding_service": embedding_status,
-                "vector_store": vector_store_status
-            },
-            "vector_store_empty": vector_store.is_empty()
+            "status": "healthy" if healthy else "unhealthy",
+            "components": {name: c["status"] for name, c in components.items()},
+            "details": components,
+            "vector_store_empty": components.get("vector_store", {}).get("status") == EMPTY
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
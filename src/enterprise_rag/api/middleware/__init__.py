@@ -0,0 +1,11 @@
+from .admission import RequestClass, AdmissionController, AdmissionMiddleware
+from .writer_proxy import WriterProxyMiddleware
+from .tracing import TracingMiddleware
+
+__all__ = [
+    "RequestClass",
+    "AdmissionController",
+    "AdmissionMiddleware",
+    "WriterProxyMiddleware",
+    "TracingMiddleware"
+]
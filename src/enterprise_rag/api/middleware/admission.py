@@ -0,0 +1,129 @@
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import logging
+
+from ..responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+class RequestClass:
+    """Concurrency limit and bounded wait queue for one class of requests"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the server's event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+class AdmissionController:
+    """Maps request paths to request classes and tracks their load"""
+
+    def __init__(self):
+        self.classes: Dict[str, RequestClass] = {}
+        self._routes: Dict[str, str] = {}
+
+    def add_class(self, request_class: RequestClass, paths: Tuple[str, ...]):
+        self.classes[request_class.name] = request_class
+        for path in paths:
+            self._routes[path] = request_class.name
+
+    def classify(self, path: str) -> Optional[RequestClass]:
+        name = self._routes.get(path)
+        return self.classes[name] if name else None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: c.stats() for name, c in self.classes.items()}
+
+class AdmissionMiddleware:
+    """ASGI middleware that sheds load before a request reaches its handler.
+
+    A request whose class is at its concurrency limit waits in a bounded
+    queue; when the queue is full it is rejected at once with 429, and if
+    it waits longer than the class's queue timeout it gets 503. Both carry
+    Retry-After. Paths without a class (health probes, stats) pass through.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_class = self.controller.classify(scope["path"])
+        if request_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        semaphore = request_class.semaphore
+        if not semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await semaphore.acquire()
+        else:
+            if request_class.waiting >= request_class.max_queue:
+                request_class.rejected += 1
+                logger.warning(f"Rejecting {request_class.name} request: queue full")
+                await self._reject(request_class, 429, "Too many queued requests", scope, receive, send)
+                return
+
+            request_class.waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=request_class.queue_timeout)
+            except asyncio.TimeoutError:
+                request_class.timed_out += 1
+                logger.warning(f"Rejecting {request_class.name} request: queue wait timed out")
+                await self._reject(request_class, 503, "Server busy, queue wait timed out", scope, receive, send)
+                return
+            finally:
+                request_class.waiting -= 1
+
+        request_class.active += 1
+        request_class.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_class.active -= 1
+            semaphore.release()
+
+    @staticmethod
+    async def _reject(request_class: RequestClass, status_code: int, detail: str, scope, receive, send):
+        response = ORJSONResponse(
+            {"detail": detail, "request_class": request_class.name},
+            status_code=status_code,
+            headers={"Retry-After": str(request_class.retry_after)}
+        )
+        await response(scope, receive, send)
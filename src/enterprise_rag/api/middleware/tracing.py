@@ -0,0 +1,63 @@
+from typing import Optional, Tuple
+import logging
+
+from ...core.tracing import TraceSampler
+
+logger = logging.getLogger(__name__)
+
+class TracingMiddleware:
+    """ASGI middleware that traces sampled or explicitly requested queries.
+
+    A traced request gets its stage waterfall in a ``Server-Timing`` header
+    and an ``X-RAG-Trace-Id`` header, and is logged; if it was profiled the
+    merged cProfile output is written to ``profile_dir`` as
+    ``<trace id>.prof``. Untraced requests pass straight through.
+    """
+
+    def __init__(
+        self,
+        app,
+        sampler: TraceSampler,
+        paths: Tuple[str, ...],
+        profile_dir: Optional[str] = None
+    ):
+        self.app = app
+        self.sampler = sampler
+        self.paths = set(paths)
+        self.profile_dir = profile_dir
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        requested = None
+        for name, value in scope["headers"]:
+            if name == b"x-rag-trace":
+                requested = value.decode("latin-1")
+                break
+
+        trace = self.sampler.start(requested)
+        if trace is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-rag-trace-id", trace.trace_id.encode()))
+                timing = trace.server_timing()
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = trace.activate()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            trace.deactivate(token)
+            summary = trace.summary()
+            if trace.profile and self.profile_dir:
+                summary["profile_path"] = trace.dump_profile(self.profile_dir)
+            logger.info(f"Trace {scope['path']}: {summary}")
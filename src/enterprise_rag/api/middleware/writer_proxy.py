@@ -0,0 +1,84 @@
+from typing import Tuple
+import logging
+import httpx
+
+from ..responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Hop-by-hop headers that must not be forwarded
+_HOP_HEADERS = {
+    "host", "connection", "keep-alive", "transfer-encoding",
+    "content-length", "content-encoding"
+}
+
+class _ClientDisconnected(Exception):
+    """The client went away while its request body was being relayed"""
+
+class WriterProxyMiddleware:
+    """Forward write requests from reader workers to the single writer.
+
+    Reader workers serve queries from the shared memory-mapped index and
+    hold no Chroma client; any request to a write path is relayed to the
+    writer process over its Unix socket, with the request body streamed
+    through, and the writer's response is returned unchanged.
+    """
+
+    def __init__(self, app, socket_path: str, paths: Tuple[str, ...], timeout: float = 600.0):
+        self.app = app
+        self.paths = set(paths)
+        self._client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://writer",
+            timeout=timeout
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        async def body():
+            # Streamed to the writer as it arrives; uploads are never held whole here
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise _ClientDisconnected()
+                yield message.get("body", b"")
+                more_body = message.get("more_body", False)
+
+        headers = [
+            (k.decode("latin-1"), v.decode("latin-1"))
+            for k, v in scope["headers"]
+            if k.decode("latin-1").lower() not in _HOP_HEADERS
+        ]
+        try:
+            upstream = await self._client.request(
+                scope["method"],
+                scope["path"],
+                params=scope["query_string"].decode("latin-1"),
+                headers=headers,
+                content=body()
+            )
+        except _ClientDisconnected:
+            logger.info(f"Client disconnected during {scope['method']} {scope['path']}")
+            return
+        except httpx.HTTPError as e:
+            logger.error(f"Writer unavailable: {e}")
+            response = ORJSONResponse(
+                {"detail": "Writer process unavailable"},
+                status_code=503,
+                headers={"Retry-After": "5"}
+            )
+            await response(scope, receive, send)
+            return
+
+        response_headers = [
+            (k.encode("latin-1"), v.encode("latin-1"))
+            for k, v in upstream.headers.multi_items()
+            if k.lower() not in _HOP_HEADERS
+        ]
+        response_headers.append((b"content-length", str(len(upstream.content)).encode()))
+        await send({"type": "http.response.start", "status": upstream.status_code, "headers": response_headers})
+        await send({"type": "http.response.body", "body": upstream.content})
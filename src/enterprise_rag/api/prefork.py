@@ -0,0 +1,132 @@
+"""Pre-fork server: one writer process plus N reader workers.
+
+The writer runs the full app (Chroma, ingestion) on a Unix socket and
+publishes the index as memory-mapped files. The parent then loads the
+embedding model once in reader mode and forks the reader workers, which
+share the model weights copy-on-write and the index through the page
+cache; each extra worker costs only its own Python heap.
+
+    python -m enterprise_rag.api.prefork --workers 4 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+def _start_writer(socket_path: str, log_level: str) -> subprocess.Popen:
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    env = {**os.environ, "RAG_ROLE": "writer", "RAG_WRITER_SOCKET": socket_path}
+    writer = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", f"{__package__}.main:app",
+            "--uds", socket_path, "--log-level", log_level
+        ],
+        env=env
+    )
+    deadline = time.monotonic() + 300
+    while not os.path.exists(socket_path):
+        if writer.poll() is not None:
+            raise RuntimeError("Writer process exited during startup")
+        if time.monotonic() > deadline:
+            writer.terminate()
+            raise RuntimeError("Writer process did not start in time")
+        time.sleep(0.2)
+    logger.info(f"Writer process {writer.pid} listening on {socket_path}")
+    return writer
+
+def _serve_worker(app, sock: socket.socket, threads: int, log_level: str):
+    import torch
+    import uvicorn
+
+    # Split the cores between workers instead of every worker using all of them
+    torch.set_num_threads(threads)
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the RAG API with pre-forked reader workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper())
+    socket_path = os.getenv("RAG_WRITER_SOCKET", "data/writer.sock")
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    writer = _start_writer(socket_path, args.log_level)
+
+    # Load the model before forking; reader workers use a single in-process
+    # replica since the replica pool's threads do not survive fork()
+    os.environ["RAG_ROLE"] = "reader"
+    os.environ["RAG_EMBED_REPLICAS"] = "1"
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    from .main import app
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                _serve_worker(app, sock, threads, args.log_level)
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        writer.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"Started {args.workers} reader workers on {args.host}:{args.port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid == writer.pid and not stopping:
+            logger.error(f"Writer process exited with status {status}, shutting down")
+            shutdown(signal.SIGTERM, None)
+            continue
+        if pid not in children:
+            continue
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Reader worker {pid} exited with status {status}, restarting")
+            spawn()
+
+    writer.wait(timeout=30)
+
+if __name__ == "__main__":
+    main()
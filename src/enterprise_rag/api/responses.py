@@ -0,0 +1,22 @@
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes with orjson"""
+    return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Handlers on the hot path return this directly so FastAPI skips
+    response-model validation and ``jsonable_encoder``; NumPy arrays and
+    scalars are serialized natively.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,64 @@
+import asyncio
+import base64
+import logging
+import numpy as np
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+
+from ...core.embed_batcher import EmbeddingBatcher
+from ...schemas import EmbedRequest
+from ..responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+def create_embed_router(batcher: EmbeddingBatcher, model_name: str, max_texts: int = 2048) -> APIRouter:
+    """``/embed`` backed by the shared batcher, for the full app and the embed-only service"""
+    router = APIRouter()
+
+    @router.post("/embed")
+    async def embed(embed_req: EmbedRequest, request: Request):
+        """Embed a batch of texts; vectors come back as float32, not JSON number lists.
+
+        Send ``Accept: application/octet-stream`` or ``encoding=binary`` for
+        the raw row-major matrix, with its shape in ``X-Embedding-Count`` and
+        ``X-Embedding-Dimension``.
+        """
+        if len(embed_req.texts) > max_texts:
+            raise HTTPException(status_code=413, detail=f"At most {max_texts} texts per request")
+        try:
+            vectors = await asyncio.wrap_future(batcher.submit(embed_req.texts))
+        except Exception as e:
+            logger.error(f"Embedding request failed: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        if embed_req.normalize:
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        count, dimension = vectors.shape
+
+        if embed_req.encoding == "binary" or "application/octet-stream" in request.headers.get("accept", ""):
+            return Response(
+                content=vectors.tobytes(),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Embedding-Model": model_name,
+                    "X-Embedding-Count": str(count),
+                    "X-Embedding-Dimension": str(dimension),
+                    "X-Embedding-Dtype": "float32"
+                }
+            )
+        return ORJSONResponse({
+            "model": model_name,
+            "count": count,
+            "dimension": dimension,
+            "dtype": "float32",
+            "encoding": "base64",
+            "embeddings": base64.b64encode(vectors.tobytes()).decode("ascii")
+        })
+
+    @router.get("/admin/embed")
+    async def embed_stats():
+        """Micro-batching and embedding cache counters"""
+        return batcher.stats()
+
+    return router
@@ -2,10 +2,12 @@ from .document_processor import DocumentProcessor
 from .embedding_service import EmbeddingService
 from .vector_store import VectorStore
 from .rag_engine import RAGEngine
+from .health import HealthMonitor
 
 __all__ = [
     "DocumentProcessor",
     "EmbeddingService",
     "VectorStore",
-    "RAGEngine"
+    "RAGEngine",
+    "HealthMonitor"
 ]
\ No newline at end of file
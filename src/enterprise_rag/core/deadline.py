@@ -0,0 +1,55 @@
+from typing import Optional
+import time
+
+class DeadlineExceeded(Exception):
+    """Raised at a pipeline checkpoint once the request's time is up or it was cancelled"""
+
+class Deadline:
+    """Time budget and cancellation flag of a request.
+
+    Pipeline stages call ``check`` between pieces of work, so a request
+    that ran out of time, or whose client went away, stops at the next
+    checkpoint instead of finishing work nobody will read. Checks use a
+    cutoff ``reserve`` of the budget before the deadline itself, which
+    leaves time to return what was done so far; waits use ``remaining``
+    to the deadline. Safe to share with worker threads.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, reserve: float = 0.1):
+        now = time.monotonic()
+        self.expires_at: Optional[float] = now + timeout if timeout is not None else None
+        self.cutoff: Optional[float] = now + timeout * (1 - reserve) if timeout is not None else None
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def expired(self) -> bool:
+        """True once cancelled or past the cutoff for starting more work"""
+        return self.cancelled or (self.cutoff is not None and time.monotonic() >= self.cutoff)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left until the deadline, 0 once cancelled, or None without a time limit"""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def extend(self, other: Optional["Deadline"]):
+        """Stretch this deadline to also cover ``other`` (None means no limit)"""
+        if other is None or other.expires_at is None:
+            self.expires_at = self.cutoff = None
+        elif self.expires_at is not None:
+            self.expires_at = max(self.expires_at, other.expires_at)
+            self.cutoff = max(self.cutoff, other.cutoff)
+
+    def check(self, stage: str):
+        if self.expired:
+            raise DeadlineExceeded(f"{self.reason or 'deadline expired'} before {stage}")
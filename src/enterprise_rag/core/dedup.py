@@ -0,0 +1,318 @@
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import uuid
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+# 2^32 + 15, the smallest prime above 2^32
+_PRIME = np.uint64(4294967311)
+
+class DedupPlan:
+    """Result of partitioning chunks into new content and near-duplicates"""
+
+    def __init__(self):
+        self.unique: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+        # (canonical chunk id, metadata of the duplicate chunk)
+        self.duplicates: List[Tuple[str, Dict[str, Any]]] = []
+        # Chunks already stored, or recorded as duplicates, by an earlier
+        # upload of the same file; there is nothing to do for them
+        self.existing = 0
+
+class DedupIndex:
+    """Persistent MinHash LSH index of stored chunk texts.
+
+    Each chunk is reduced to a MinHash signature over word shingles; the
+    signature is split into bands and every band is hashed into an SQLite
+    table, so candidates for a new chunk are the chunks sharing at least
+    one band. A candidate counts as a duplicate when the signatures agree
+    on at least ``threshold`` of their positions (the estimated Jaccard
+    similarity of the shingle sets). Duplicates are recorded against the
+    canonical chunk instead of being embedded and stored again. A chunk
+    is never matched against itself or against its own document, so
+    uploading a file again does not turn it into duplicates of itself.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = Path(path)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS signatures (
+                    chunk_id TEXT PRIMARY KEY, source TEXT, signature BLOB, doc_hash TEXT
+                );
+                CREATE INDEX IF NOT EXISTS signatures_source ON signatures (source);
+                CREATE TABLE IF NOT EXISTS bands (band_key INTEGER, chunk_id TEXT);
+                CREATE INDEX IF NOT EXISTS bands_key ON bands (band_key);
+                CREATE INDEX IF NOT EXISTS bands_chunk ON bands (chunk_id);
+                CREATE TABLE IF NOT EXISTS duplicates (
+                    canonical_id TEXT, source TEXT, doc_hash TEXT, metadata TEXT
+                );
+                CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (canonical_id);
+                CREATE INDEX IF NOT EXISTS duplicates_source ON duplicates (source);
+                CREATE INDEX IF NOT EXISTS duplicates_hash ON duplicates (doc_hash);
+            """)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")]
+            if "doc_hash" not in columns:
+                # Indexes from before doc hashes were kept
+                self._conn.execute("ALTER TABLE signatures ADD COLUMN doc_hash TEXT")
+        logger.info(f"Dedup index opened at {self.path}")
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint32 x num_perm) of the text's word shingles"""
+        words = _WORD.findall(text.lower())
+        size = self.shingle_size
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, "little") + chunk, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "little", signed=True))
+        return keys
+
+    def partition(self, chunks: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> DedupPlan:
+        """Split chunks into new ones (with ids assigned) and duplicates.
+
+        Chunks are compared with the stored ones and with earlier chunks of
+        the same call, so repeated boilerplate inside one document is
+        caught too. New chunks keep their entry of ``ids`` when given and
+        get a random id otherwise. Chunks an earlier upload of the same
+        file already stored (same id) or recorded as duplicates (same
+        document and position) are left out of the plan altogether.
+        """
+        plan = DedupPlan()
+        pending_bands: Dict[int, List[int]] = {}
+        pending_signatures: List[np.ndarray] = []
+        stored = self._indexed(ids) if ids is not None else set()
+        recorded = self._recorded_duplicates(chunks)
+
+        for index, chunk in enumerate(chunks):
+            metadata = chunk["metadata"]
+            chunk_id = ids[index] if ids is not None else None
+            if chunk_id in stored or (
+                metadata.get("source"), metadata.get("doc_hash"), metadata.get("chunk_id")
+            ) in recorded:
+                plan.existing += 1
+                continue
+
+            signature = self.signature(chunk["text"])
+            keys = self.band_keys(signature)
+
+            canonical = self._find_stored(signature, keys, chunk_id, metadata.get("source"), metadata.get("doc_hash"))
+            if canonical is None:
+                local = {i for key in keys for i in pending_bands.get(key, ())}
+                for i in local:
+                    if self._similarity(signature, pending_signatures[i]) >= self.threshold:
+                        canonical = plan.ids[i]
+                        break
+
+            if canonical is not None:
+                plan.duplicates.append((canonical, chunk["metadata"]))
+                continue
+
+            position = len(plan.ids)
+            plan.ids.append(chunk_id if chunk_id is not None else str(uuid.uuid4()))
+            plan.unique.append(chunk)
+            pending_signatures.append(signature)
+            for key in keys:
+                pending_bands.setdefault(key, []).append(position)
+        return plan
+
+    def register(
+        self,
+        ids: List[str],
+        texts: List[str],
+        sources: List[str],
+        doc_hashes: Optional[List[Optional[str]]] = None
+    ):
+        """Index the signatures of chunks that were just stored"""
+        rows, band_rows = [], []
+        doc_hashes = doc_hashes or [None] * len(ids)
+        for chunk_id, text, source, doc_hash in zip(ids, texts, sources, doc_hashes):
+            signature = self.signature(text)
+            rows.append((chunk_id, source, signature.tobytes(), doc_hash))
+            band_rows.extend((key, chunk_id) for key in self.band_keys(signature))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO signatures (chunk_id, source, signature, doc_hash) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany("INSERT INTO bands VALUES (?, ?)", band_rows)
+
+    def add_duplicates(self, duplicates: List[Tuple[str, Dict[str, Any]]]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO duplicates VALUES (?, ?, ?, ?)",
+                [
+                    (canonical, metadata.get("source"), metadata.get("doc_hash"), json.dumps(metadata))
+                    for canonical, metadata in duplicates
+                ]
+            )
+
+    def references(self, chunk_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Metadata of the duplicates recorded against each canonical chunk"""
+        rows = []
+        with self._lock:
+            for batch in self._batches(chunk_ids):
+                marks = ",".join("?" * len(batch))
+                rows.extend(self._conn.execute(
+                    f"SELECT canonical_id, metadata FROM duplicates WHERE canonical_id IN ({marks})",
+                    batch
+                ).fetchall())
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        for canonical, metadata in rows:
+            found.setdefault(canonical, []).append(json.loads(metadata))
+        return found
+
+    def remove_duplicates(self, source: Optional[str] = None, doc_hash: Optional[str] = None) -> int:
+        """Forget the duplicate references belonging to one document.
+
+        Matches on whichever of ``source`` and ``doc_hash`` are given.
+        """
+        clauses = [(column, value) for column, value in (("source", source), ("doc_hash", doc_hash)) if value]
+        where = " AND ".join(f"{column} = ?" for column, _ in clauses)
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM duplicates WHERE {where}", [value for _, value in clauses]
+            ).rowcount
+
+    def remove_chunks(self, chunk_ids: List[str]):
+        """Drop stored chunks from the signature index"""
+        with self._lock, self._conn:
+            for batch in self._batches(chunk_ids):
+                marks = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM signatures WHERE chunk_id IN ({marks})", batch)
+                self._conn.execute(f"DELETE FROM bands WHERE chunk_id IN ({marks})", batch)
+
+    def promote(self, old_id: str, new_id: str) -> Optional[Dict[str, Any]]:
+        """Turn one duplicate of ``old_id`` into the canonical chunk ``new_id``.
+
+        Returns the promoted duplicate's metadata, or None when ``old_id``
+        has no duplicates. The remaining duplicates are re-pointed at the
+        new canonical chunk.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT rowid, metadata FROM duplicates WHERE canonical_id = ? LIMIT 1", (old_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM duplicates WHERE rowid = ?", (row[0],))
+            self._conn.execute(
+                "UPDATE duplicates SET canonical_id = ? WHERE canonical_id = ?", (new_id, old_id)
+            )
+        return json.loads(row[1])
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signatures")
+            self._conn.execute("DELETE FROM bands")
+            self._conn.execute("DELETE FROM duplicates")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            signatures = self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            duplicates = self._conn.execute("SELECT COUNT(*) FROM duplicates").fetchone()[0]
+        return {"indexed_chunks": signatures, "duplicate_chunks": duplicates, "threshold": self.threshold}
+
+    def _find_stored(
+        self,
+        signature: np.ndarray,
+        keys: List[int],
+        chunk_id: Optional[str] = None,
+        source: Optional[str] = None,
+        doc_hash: Optional[str] = None
+    ) -> Optional[str]:
+        """Best stored match, skipping the chunk itself and its own document"""
+        marks = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT s.chunk_id, s.source, s.doc_hash, s.signature FROM signatures s WHERE s.chunk_id IN "
+                f"(SELECT DISTINCT chunk_id FROM bands WHERE band_key IN ({marks}))",
+                keys
+            ).fetchall()
+        best_id, best = None, self.threshold
+        for candidate, candidate_source, candidate_hash, blob in rows:
+            if candidate == chunk_id or (
+                doc_hash is not None and candidate_source == source and candidate_hash == doc_hash
+            ):
+                continue
+            similarity = self._similarity(signature, np.frombuffer(blob, dtype=np.uint32))
+            if similarity >= best:
+                best_id, best = candidate, similarity
+        return best_id
+
+    def _indexed(self, chunk_ids: List[str]) -> set:
+        """The subset of ids whose signatures are stored"""
+        present = set()
+        with self._lock:
+            for batch in self._batches(chunk_ids):
+                marks = ",".join("?" * len(batch))
+                present.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM signatures WHERE chunk_id IN ({marks})", batch
+                ))
+        return present
+
+    def _recorded_duplicates(self, chunks: List[Dict[str, Any]]) -> set:
+        """(source, doc_hash, chunk_id) of the given documents' recorded duplicates"""
+        documents = {
+            (chunk["metadata"].get("source"), chunk["metadata"].get("doc_hash"))
+            for chunk in chunks if chunk["metadata"].get("doc_hash") is not None
+        }
+        recorded = set()
+        with self._lock:
+            for source, doc_hash in documents:
+                for (metadata,) in self._conn.execute(
+                    "SELECT metadata FROM duplicates WHERE source = ? AND doc_hash = ?", (source, doc_hash)
+                ):
+                    recorded.add((source, doc_hash, json.loads(metadata).get("chunk_id")))
+        return recorded
+
+    @staticmethod
+    def _batches(values: List[str], size: int = 500):
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
+
+    @staticmethod
+    def _similarity(a: np.ndarray, b: np.ndarray) -> float:
+        return float(np.mean(a == b))
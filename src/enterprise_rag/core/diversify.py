@@ -0,0 +1,45 @@
+from typing import List
+import numpy as np
+
+def mmr_select(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    k: int,
+    diversity: float = 0.3
+) -> List[int]:
+    """Pick ``k`` candidates by maximal marginal relevance.
+
+    Each step takes the candidate maximizing
+    ``(1 - diversity) * sim(query, c) - diversity * max sim(c, selected)``
+    using cosine similarity. The candidate-candidate similarity matrix is
+    computed once, and each step updates the running max similarity with a
+    single vectorized ``np.maximum``, so selection is O(k * n) after one
+    n x n product. Returns indices into ``candidate_embeddings`` in
+    selection order.
+    """
+    n = len(candidate_embeddings)
+    k = min(k, n)
+    if k == 0:
+        return []
+
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    candidates = candidates / np.maximum(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = (1.0 - diversity) * relevance - diversity * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, similarity[best], out=max_similarity)
+    return selected
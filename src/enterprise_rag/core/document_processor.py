@@ -1,6 +1,7 @@
 import fitz  # PyMuPDF
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -28,7 +29,8 @@ class DocumentProcessor:
             logger.info(f"Extracted {len(text)} characters from PDF")
             
             # Create chunks
-            chunks = self._create_chunks(text, str(file_path))
+            doc_hash = self._file_hash(file_path)
+            chunks = self._create_chunks(text, str(file_path), doc_hash)
             logger.info(f"Created {len(chunks)} chunks")
             
             return chunks
@@ -40,17 +42,32 @@ class DocumentProcessor:
     def _extract_pdf_text(self, file_path: Path) -> str:
         """Extract text from PDF file"""
         try:
-            text = ""
+            # Join once at the end; repeated += copies the text on every page
+            pages = []
             with fitz.open(str(file_path)) as doc:
                 for page_num, page in enumerate(doc):
-                    text += page.get_text() + "\n\n"
+                    pages.append(page.get_text())
                     logger.info(f"Processed page {page_num + 1}/{len(doc)}")
-            return text
+            return "\n\n".join(pages) + "\n\n"
         except Exception as e:
             logger.error(f"PDF extraction failed: {e}")
             raise
 
-    def _create_chunks(self, text: str, source_path: str) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _file_hash(file_path: Path) -> str:
+        """SHA-256 of the file contents, used to address a document in the store"""
+        digest = hashlib.sha256()
+        with file_path.open("rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _create_chunks(
+        self,
+        text: str,
+        source_path: str,
+        doc_hash: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """Split text into chunks with overlap"""
         chunks = []
         current_chunk = ""
@@ -69,11 +86,9 @@ class DocumentProcessor:
                 if current_chunk:
                     chunks.append({
                         "text": current_chunk.strip(),
-                        "metadata": {
-                            "source": source_path,
-                            "chunk_id": chunk_id,
-                            "char_count": len(current_chunk)
-                        }
+                        "metadata": self._chunk_metadata(
+                            source_path, chunk_id, len(current_chunk), doc_hash
+                        )
                     })
                     chunk_id += 1
                     # Keep overlap for next chunk
@@ -85,11 +100,25 @@ class DocumentProcessor:
         if current_chunk:
             chunks.append({
                 "text": current_chunk.strip(),
-                "metadata": {
-                    "source": source_path,
-                    "chunk_id": chunk_id,
-                    "char_count": len(current_chunk)
-                }
+                "metadata": self._chunk_metadata(
+                    source_path, chunk_id, len(current_chunk), doc_hash
+                )
             })
         
-        return chunks
\ No newline at end of file
+        return chunks
+
+    @staticmethod
+    def _chunk_metadata(
+        source_path: str,
+        chunk_id: int,
+        char_count: int,
+        doc_hash: Optional[str]
+    ) -> Dict[str, Any]:
+        metadata = {
+            "source": source_path,
+            "chunk_id": chunk_id,
+            "char_count": char_count
+        }
+        if doc_hash:
+            metadata["doc_hash"] = doc_hash
+        return metadata
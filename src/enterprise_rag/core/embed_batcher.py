@@ -0,0 +1,203 @@
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import logging
+import os
+import queue
+import threading
+import time
+import numpy as np
+from .embedding_service import EmbeddingService, PRIORITY_INTERACTIVE, PRIORITY_BULK
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """Shares model calls between concurrent embedding requests.
+
+    Small requests (queries, short /embed batches) are queued and a
+    collector thread merges whatever arrives within ``max_wait_ms`` into
+    one interactive forward pass of up to ``max_batch`` texts. Requests
+    larger than that go to the service at bulk priority, which batches
+    them by length and yields to interactive work. Recent texts are served
+    from an LRU cache of their vectors, and a text repeated within a batch
+    is encoded once.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        max_batch: int = 64,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 4096
+    ):
+        self.embedding_service = embedding_service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.withdrawn = 0
+        self._worker_pid: Optional[int] = None
+        self._worker_lock = threading.Lock()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Embed texts asynchronously; the future resolves to a float32 (n, d) array"""
+        self.requests += 1
+        future: Future = Future()
+        vectors = self._cached(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            future.set_result(np.stack(vectors) if vectors else np.empty((0, 0), dtype=np.float32))
+            return future
+
+        miss_texts = [texts[i] for i in missing]
+        inner = self._embed_bulk(miss_texts) if len(miss_texts) > self.max_batch else self._enqueue(miss_texts)
+
+        def merge(done: Future):
+            if done.cancelled():
+                future.cancel()
+            if future.done():
+                return
+            try:
+                for i, vector in zip(missing, done.result()):
+                    vectors[i] = vector
+                future.set_result(np.stack(vectors))
+            except Exception as e:
+                future.set_exception(e)
+        inner.add_done_callback(merge)
+        # Cancelling the caller's future withdraws a request still in the queue
+        future.add_done_callback(lambda done: done.cancelled() and inner.cancel())
+        return future
+
+    def embed(self, texts: List[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Embed texts, giving up (and withdrawing the request) after ``timeout`` seconds"""
+        future = self.submit(texts)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_per_batch": round(self.batched_texts / self.batches, 2) if self.batches else None,
+            "cache_size": len(self._cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "queued": self._queue.qsize(),
+            "withdrawn": self.withdrawn
+        }
+
+    def _enqueue(self, texts: List[str]) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _ensure_worker(self):
+        # Started on first use, and again in a forked child, where the
+        # parent's thread does not exist
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,), name="embed-batcher", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _embed_bulk(self, texts: List[str]) -> Future:
+        future: Future = Future()
+
+        def work():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                vectors = self._encode(texts, PRIORITY_BULK)
+                future.set_result(vectors)
+            except Exception as e:
+                future.set_exception(e)
+        threading.Thread(target=work, name="embed-bulk", daemon=True).start()
+        return future
+
+    def _run(self, requests: "queue.Queue[Tuple[List[str], Future]]"):
+        while True:
+            pending = [requests.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(request)
+                size += len(request[0])
+
+            # Requests withdrawn while queued cost no model time
+            live = [request for request in pending if request[1].set_running_or_notify_cancel()]
+            self.withdrawn += len(pending) - len(live)
+            pending = live
+            if not pending:
+                continue
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                vectors = self._encode(texts, PRIORITY_INTERACTIVE)
+            except Exception as e:
+                logger.error(f"Batched embedding failed: {e}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            start = 0
+            for request_texts, future in pending:
+                future.set_result(vectors[start:start + len(request_texts)])
+                start += len(request_texts)
+
+    def _encode(self, texts: List[str], priority: int) -> np.ndarray:
+        """Encode the distinct texts once and cache them"""
+        unique = list(dict.fromkeys(texts))
+        encoded = np.asarray(
+            self.embedding_service.generate_embeddings(unique, priority=priority),
+            dtype=np.float32
+        )
+        self.batches += 1
+        self.batched_texts += len(unique)
+        by_text = dict(zip(unique, encoded))
+        self._store(by_text)
+        return np.stack([by_text[text] for text in texts])
+
+    def _cached(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        if not self.cache_size:
+            self.cache_misses += len(texts)
+            return [None] * len(texts)
+        found = []
+        with self._cache_lock:
+            for text in texts:
+                vector = self._cache.get(text)
+                if vector is not None:
+                    self._cache.move_to_end(text)
+                found.append(vector)
+        hits = sum(vector is not None for vector in found)
+        self.cache_hits += hits
+        self.cache_misses += len(texts) - hits
+        return found
+
+    def _store(self, by_text: Dict[str, np.ndarray]):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            for text, vector in by_text.items():
+                # Copy so a cached row does not pin its whole batch
+                self._cache[text] = vector.copy()
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,267 @@
+from concurrent.futures import Future
+from multiprocessing.connection import wait as wait_for_exit
+from typing import List, Dict, Optional, Sequence, Tuple
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def available_cores() -> List[int]:
+    """CPU ids this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def partition_cores(cores: Sequence[int], replicas: int) -> List[List[int]]:
+    """Split cores into `replicas` contiguous, near-equal groups"""
+    replicas = max(1, min(replicas, len(cores)))
+    size, extra = divmod(len(cores), replicas)
+    groups, start = [], 0
+    for i in range(replicas):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(list(cores[start:end]))
+        start = end
+    return groups
+
+def _worker_main(worker_id, model_name, cores, num_threads, tasks, results):
+    """Entry point of one replica process: pin, tune threads, load, serve"""
+    # Imported here so the parent never needs the model stack for the pool
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(num_threads)
+
+    try:
+        model = SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        results.put((worker_id, None, None, f"model load failed: {e}"))
+        return
+    results.put((worker_id, None, model.get_sentence_embedding_dimension(), None))
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        request_id, texts = item
+        try:
+            with torch.inference_mode():
+                embeddings = model.encode(
+                    texts,
+                    batch_size=max(1, len(texts)),
+                    convert_to_numpy=True
+                )
+            results.put((worker_id, request_id, embeddings, None))
+        except Exception as e:
+            results.put((worker_id, request_id, None, str(e)))
+
+class EmbeddingWorkerPool:
+    """N SentenceTransformer replicas in separate processes.
+
+    Each replica is pinned to its own core group and runs torch with one
+    intra-op thread per core, so replicas never compete for cores. Work goes
+    to the replica with the fewest in-flight batches; large inputs are
+    sharded across replicas and reassembled in order.
+
+    A replica that exits (OOM kill, crash) fails the batches it held and is
+    started again, up to ``max_restarts`` times; ``encode`` gives up on a
+    batch after ``task_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        replicas: int,
+        threads_per_replica: Optional[int] = None,
+        cores: Optional[Sequence[int]] = None,
+        start_timeout: float = 300.0,
+        task_timeout: float = 120.0,
+        max_restarts: int = 3
+    ):
+        self.model_name = model_name
+        self.core_groups = partition_cores(list(cores or available_cores()), replicas)
+        self.replicas = len(self.core_groups)
+        self.threads_per_replica = threads_per_replica
+        self.task_timeout = task_timeout
+        self.max_restarts = max_restarts
+        self.dimension: Optional[int] = None
+
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._tasks = [self._ctx.Queue() for _ in range(self.replicas)]
+        self._in_flight = [0] * self.replicas
+        # request_id -> (worker_id, future)
+        self._futures: Dict[int, Tuple[int, Future]] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._ready = threading.Event()
+        self._ready_workers = set()
+        self._start_error: Optional[str] = None
+        self._restarts = [0] * self.replicas
+        self._retired = set()
+        self._closing = False
+
+        self._processes = [None] * self.replicas
+        for worker_id in range(self.replicas):
+            self._start_worker(worker_id)
+
+        self._collector = threading.Thread(target=self._collect, daemon=True, name="embedding-pool-collector")
+        self._collector.start()
+        self._monitor = threading.Thread(target=self._watch, daemon=True, name="embedding-pool-monitor")
+        self._monitor.start()
+
+        if not self._ready.wait(start_timeout) or self._start_error:
+            self.close()
+            raise RuntimeError(self._start_error or "Embedding replicas did not start in time")
+        logger.info(f"Embedding pool started: {self.replicas} replicas on cores {self.core_groups}")
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue one batch on the least loaded replica"""
+        future: Future = Future()
+        with self._lock:
+            if not self._ready_workers:
+                future.set_exception(RuntimeError("No embedding replica is running"))
+                return future
+            worker_id = min(self._ready_workers, key=self._in_flight.__getitem__)
+            request_id = next(self._ids)
+            self._in_flight[worker_id] += 1
+            self._futures[request_id] = (worker_id, future)
+            tasks = self._tasks[worker_id]
+        tasks.put((request_id, texts))
+        return future
+
+    def shards(self, count: int, min_shard_size: int = 8) -> int:
+        """Number of replicas ``encode`` spreads ``count`` texts over"""
+        return min(self.replicas, max(1, count // min_shard_size))
+
+    def encode(self, texts: List[str], min_shard_size: int = 8) -> np.ndarray:
+        """Encode texts, sharding across replicas when there are enough of them"""
+        shards = self.shards(len(texts), min_shard_size)
+        if shards <= 1:
+            return self.submit(texts).result(self.task_timeout)
+        bounds = np.linspace(0, len(texts), shards + 1, dtype=int)
+        futures = [self.submit(texts[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate([f.result(self.task_timeout) for f in futures])
+
+    def is_alive(self) -> bool:
+        return (
+            self._ready.is_set()
+            and len(self._ready_workers) == self.replicas
+            and all(p.is_alive() for p in self._processes)
+        )
+
+    def close(self):
+        self._closing = True
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        for thread in (self._collector, self._monitor):
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join(timeout=10)
+        logger.info("Embedding pool stopped")
+
+    def _start_worker(self, worker_id: int):
+        group = self.core_groups[worker_id]
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                self.model_name,
+                group,
+                self.threads_per_replica or len(group),
+                self._tasks[worker_id],
+                self._results
+            ),
+            daemon=True,
+            name=f"embedding-replica-{worker_id}"
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def _watch(self):
+        """Notice replicas that exit and fail or restart them"""
+        while not self._closing:
+            sentinels = {
+                process.sentinel: worker_id
+                for worker_id, process in enumerate(self._processes) if worker_id not in self._retired
+            }
+            if not sentinels:
+                return
+            for sentinel in wait_for_exit(list(sentinels), timeout=1.0):
+                if self._closing:
+                    return
+                self._replica_exited(sentinels[sentinel])
+
+    def _replica_exited(self, worker_id: int):
+        process = self._processes[worker_id]
+        process.join(timeout=1)
+        with self._lock:
+            self._ready_workers.discard(worker_id)
+            lost = [request_id for request_id, (owner, _) in self._futures.items() if owner == worker_id]
+            futures = [self._futures.pop(request_id)[1] for request_id in lost]
+            self._in_flight[worker_id] = 0
+            # Batches still queued for the dead replica are failed below
+            self._tasks[worker_id] = self._ctx.Queue()
+        logger.error(
+            f"Embedding replica {worker_id} exited with code {process.exitcode}; "
+            f"failing {len(futures)} in-flight batches"
+        )
+        for future in futures:
+            future.set_exception(RuntimeError(f"Embedding replica {worker_id} exited"))
+
+        if not self._ready.is_set():
+            self._start_error = f"Embedding replica {worker_id} exited during startup"
+            self._ready.set()
+            self._retired.add(worker_id)
+        elif self._restarts[worker_id] < self.max_restarts:
+            self._restarts[worker_id] += 1
+            logger.warning(f"Restarting embedding replica {worker_id} ({self._restarts[worker_id]}/{self.max_restarts})")
+            self._start_worker(worker_id)
+        else:
+            self._retired.add(worker_id)
+            logger.error(f"Embedding replica {worker_id} exited too often; leaving it stopped")
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            worker_id, request_id, payload, error = message
+
+            if request_id is None:
+                # Startup handshake; payload is the embedding dimension
+                if error:
+                    if self._ready.is_set():
+                        logger.error(f"Restarted embedding replica {worker_id} failed: {error}")
+                    else:
+                        self._start_error = error
+                        self._ready.set()
+                    continue
+                self.dimension = payload
+                with self._lock:
+                    self._ready_workers.add(worker_id)
+                    started = len(self._ready_workers) == self.replicas
+                if started:
+                    self._ready.set()
+                continue
+
+            with self._lock:
+                owner = self._futures.pop(request_id, None)
+                if owner is None:
+                    # Already failed when its replica exited
+                    continue
+                self._in_flight[worker_id] -= 1
+            future = owner[1]
+            if error:
+                future.set_exception(RuntimeError(f"Embedding replica {worker_id} failed: {error}"))
+            else:
+                future.set_result(payload)
@@ -1,25 +1,233 @@
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List
+from typing import List, Iterator, Tuple, Optional
+from collections import deque
+from contextlib import contextmanager
+import threading
 import torch
 import logging
+from .embedding_pool import EmbeddingWorkerPool
 
 logger = logging.getLogger(__name__)
 
+# Embedding work priorities; lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+
+class EmbeddingScheduler:
+    """Grants model slots to callers, interactive work first.
+
+    There is one slot per model replica, and a caller holds one slot per
+    replica its work is spread over. Bulk callers re-acquire a slot for
+    every batch, so a query that arrives mid-ingestion runs as soon as a
+    batch finishes.
+    """
+
+    def __init__(self, capacity: int = 1):
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+
+    def enter(self, priority: int = PRIORITY_INTERACTIVE, slots: int = 1) -> int:
+        """Wait for ``slots`` free slots (at most the capacity); returns the number taken"""
+        slots = max(1, min(slots, self.capacity))
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while self._active + slots > self.capacity or (
+                    priority == PRIORITY_BULK and self._waiting[PRIORITY_INTERACTIVE] > 0
+                ):
+                    self._cond.wait()
+            finally:
+                self._waiting[priority] -= 1
+            self._active += slots
+        return slots
+
+    def exit(self, slots: int = 1):
+        with self._cond:
+            self._active -= slots
+            self._cond.notify_all()
+
+    @contextmanager
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, slots: int = 1):
+        slots = self.enter(priority, slots)
+        try:
+            yield
+        finally:
+            self.exit(slots)
+
+    def waiting(self, priority: int) -> int:
+        return self._waiting[priority]
+
 class EmbeddingService:
-    def __init__(self, model_name: str = "all-mpnet-base-v2"):
-        self.model = SentenceTransformer(model_name)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model.to(self.device)
-        logger.info(f"Embedding service initialized with model {model_name} on {self.device}")
+    def __init__(
+        self,
+        model_name: str = "all-mpnet-base-v2",
+        bulk_batch_size: int = 32,
+        token_budget: int = 8192,
+        replicas: int = 1,
+        num_threads: Optional[int] = None
+    ):
+        self.model_name = model_name
+        self.bulk_batch_size = bulk_batch_size
+        self.token_budget = token_budget
+        self.pool: Optional[EmbeddingWorkerPool] = None
 
-    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        if replicas > 1:
+            # Replicas live in worker processes; this process holds no model
+            self.model = None
+            self.device = 'cpu'
+            self.pool = EmbeddingWorkerPool(
+                model_name,
+                replicas=replicas,
+                threads_per_replica=num_threads
+            )
+            self.scheduler = EmbeddingScheduler(capacity=self.pool.replicas)
+            self.dimension = self.pool.dimension
+        else:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            self.model = SentenceTransformer(model_name)
+            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            self.model.to(self.device)
+            self.scheduler = EmbeddingScheduler()
+            self.dimension = self.model.get_sentence_embedding_dimension()
+        logger.info(
+            f"Embedding service initialized with model {model_name} on {self.device} "
+            f"with {self.pool.replicas if self.pool else 1} replica(s)"
+        )
+
+    def generate_embeddings(
+        self,
+        texts: List[str],
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> np.ndarray:
         try:
             logger.info(f"Generating embeddings for {len(texts)} texts")
-            embeddings = self.model.encode(texts, convert_to_tensor=True)
-            embeddings_np = embeddings.cpu().numpy()
+            if priority == PRIORITY_BULK and len(texts) > 1:
+                # Length-bucketed batches, written back in input order
+                embeddings_np = None
+                for indices, batch_embeddings in self.iter_embeddings(texts, priority):
+                    if embeddings_np is None:
+                        embeddings_np = np.empty(
+                            (len(texts), batch_embeddings.shape[1]),
+                            dtype=batch_embeddings.dtype
+                        )
+                    embeddings_np[indices] = batch_embeddings
+            else:
+                # The pool shards larger inputs, one replica per shard
+                slots = self.pool.shards(len(texts)) if self.pool is not None else 1
+                with self.scheduler.acquire(priority, slots):
+                    embeddings_np = self._encode(texts)
             logger.info(f"Generated embeddings with shape {embeddings_np.shape}")
             return embeddings_np
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def iter_embeddings(
+        self,
+        texts: List[str],
+        priority: int = PRIORITY_BULK
+    ) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """Embed texts in length-sorted batches under the token budget.
+
+        Yields ``(indices, embeddings)`` per batch, where ``indices`` are the
+        positions of the batch's texts in the input list. Texts of similar
+        length are batched together so little compute goes to padding, and
+        callers can store each batch before the next one is encoded. The
+        model is re-acquired per batch so interactive work can preempt.
+        """
+        lengths = self.token_lengths(texts)
+        batches = self.plan_batches(lengths, self.token_budget, self.bulk_batch_size)
+
+        if self.pool is not None:
+            # Keep one batch in flight per replica, each holding a slot
+            # until its result is read
+            pending = deque()
+            try:
+                for indices in batches:
+                    self.scheduler.enter(priority)
+                    pending.append((indices, self.pool.submit([texts[i] for i in indices])))
+                    if len(pending) >= self.pool.replicas:
+                        yield self._next_result(pending)
+                while pending:
+                    yield self._next_result(pending)
+            finally:
+                # Batches left unread when the caller stops early or a batch fails
+                self.scheduler.exit(len(pending))
+            return
+
+        for indices in batches:
+            batch = [texts[i] for i in indices]
+            with self.scheduler.acquire(priority):
+                embeddings = self._encode(batch, batch_size=len(batch))
+            yield indices, embeddings
+
+    def _next_result(self, pending: deque) -> Tuple[List[int], np.ndarray]:
+        """Wait for the oldest in-flight batch and free its slot"""
+        indices, future = pending.popleft()
+        try:
+            return indices, future.result(self.pool.task_timeout)
+        finally:
+            self.scheduler.exit()
+
+    def is_ready(self) -> bool:
+        if self.pool is not None:
+            return self.pool.is_alive()
+        return self.model is not None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Token count per text, capped at the model's max sequence length"""
+        max_length = getattr(self.model, "max_seq_length", None) or 512
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            # Rough estimate of four characters per token
+            return [min(len(text) // 4 + 2, max_length) for text in texts]
+        encoded = tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=max_length
+        )
+        return [min(len(ids), max_length) for ids in encoded["input_ids"]]
+
+    @staticmethod
+    def plan_batches(
+        lengths: List[int],
+        token_budget: int,
+        max_batch_size: int
+    ) -> List[List[int]]:
+        """Group indices longest-first so that batch size x longest text stays within budget"""
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+        batches: List[List[int]] = []
+        current: List[int] = []
+        current_max = 0
+        for i in order:
+            padded_max = max(current_max, lengths[i])
+            if current and (
+                len(current) >= max_batch_size
+                or (len(current) + 1) * padded_max > token_budget
+            ):
+                batches.append(current)
+                current, padded_max = [], lengths[i]
+            current.append(i)
+            current_max = padded_max
+        if current:
+            batches.append(current)
+        return batches
+
+    def _encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if self.pool is not None:
+            return self.pool.encode(texts)
+        embeddings = self.model.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_tensor=True
+        )
+        return embeddings.cpu().numpy()
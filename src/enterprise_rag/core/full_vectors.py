@@ -0,0 +1,91 @@
+from typing import List, Dict, Any, Tuple
+from pathlib import Path
+import logging
+import sqlite3
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FullVectorStore:
+    """Full-dimension chunk vectors kept outside the vector index.
+
+    With reduced-dimension search the collection indexes projected vectors
+    only; the full vectors are needed just to rescore a search's shortlist
+    and to export or refit the corpus, so they sit here as float32 blobs
+    keyed by chunk id. Nothing here is loaded into memory: a search reads
+    the rows of its shortlist and nothing else.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS vectors (chunk_id TEXT PRIMARY KEY, data BLOB)"
+            )
+        logger.info(f"Full vector store opened at {self.path}")
+
+    def put(self, ids: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                [(chunk_id, vector.tobytes()) for chunk_id, vector in zip(ids, vectors)]
+            )
+
+    def get(self, ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """The stored ids among ``ids``, in the given order, and their vectors as rows"""
+        rows: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                for chunk_id, data in self._conn.execute(
+                    f"SELECT chunk_id, data FROM vectors WHERE chunk_id IN ({marks})", batch
+                ):
+                    rows[chunk_id] = np.frombuffer(data, dtype=np.float32)
+        found = [chunk_id for chunk_id in ids if chunk_id in rows]
+        if not found:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return found, np.stack([rows[chunk_id] for chunk_id in found])
+
+    def contains(self, ids: List[str]) -> set:
+        """The subset of ids whose vector is in the store"""
+        present = set()
+        with self._lock:
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                present.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM vectors WHERE chunk_id IN ({marks})", batch
+                ))
+        return present
+
+    def delete(self, ids: List[str]):
+        with self._lock, self._conn:
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM vectors WHERE chunk_id IN ({marks})", batch)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM vectors")
+
+    def vacuum(self):
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            vectors, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM vectors"
+            ).fetchone()
+        return {"vectors": vectors, "bytes": stored}
+
+    @staticmethod
+    def _batches(values: List[str], size: int = 500):
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
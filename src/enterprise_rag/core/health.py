@@ -0,0 +1,112 @@
+from typing import Callable, Dict, Any, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Statuses a component may report; anything else counts as not ready
+HEALTHY = "healthy"
+EMPTY = "empty"
+ERROR = "error"
+UNKNOWN = "unknown"
+
+class HealthMonitor:
+    """Caches component health so probes never touch the model or the store.
+
+    Cheap checks run on a background task every ``interval`` seconds; deep
+    checks (e.g. an embedding forward pass) only run when explicitly
+    requested and their result is reused for ``deep_check_ttl`` seconds.
+    """
+
+    def __init__(self, interval: float = 15.0, deep_check_ttl: float = 30.0):
+        self.interval = interval
+        self.deep_check_ttl = deep_check_ttl
+        self._checks: Dict[str, Callable[[], str]] = {}
+        self._deep_checks: Dict[str, Callable[[], str]] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._deep_state: Dict[str, Dict[str, Any]] = {}
+        self._deep_checked_at = 0.0
+        self._deep_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.started_at = time.time()
+        logger.info(f"HealthMonitor initialized with {interval}s interval")
+
+    def register(
+        self,
+        name: str,
+        check: Callable[[], str],
+        deep_check: Optional[Callable[[], str]] = None
+    ):
+        """Register a cheap check and an optional on-demand deep check"""
+        self._checks[name] = check
+        if deep_check is not None:
+            self._deep_checks[name] = deep_check
+        self._state[name] = {"status": UNKNOWN, "checked_at": None}
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Health checker started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Health checker stopped")
+
+    async def refresh(self):
+        """Run all cheap checks once and update the cached state"""
+        self._state = await self._run_checks(self._checks)
+
+    async def deep_check(self) -> Dict[str, Dict[str, Any]]:
+        """Run deep checks, reusing a recent result if one is fresh enough"""
+        if self._deep_lock is None:
+            self._deep_lock = asyncio.Lock()
+        async with self._deep_lock:
+            if time.monotonic() - self._deep_checked_at > self.deep_check_ttl:
+                self._deep_state = await self._run_checks(self._deep_checks)
+                self._deep_checked_at = time.monotonic()
+        return {**self._state, **self._deep_state}
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._state)
+
+    def is_ready(self) -> bool:
+        return all(
+            component["status"] in (HEALTHY, EMPTY)
+            for component in self._state.values()
+        )
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Health refresh failed: {e}")
+
+    async def _run_checks(self, checks: Dict[str, Callable[[], str]]) -> Dict[str, Dict[str, Any]]:
+        state = {}
+        for name, check in checks.items():
+            start = time.perf_counter()
+            try:
+                # Checks may block, keep them off the event loop
+                status = await asyncio.to_thread(check)
+                error = None
+            except Exception as e:
+                logger.error(f"Health check '{name}' failed: {e}")
+                status = ERROR
+                error = str(e)
+            state[name] = {
+                "status": status,
+                "checked_at": time.time(),
+                "latency_ms": round((time.perf_counter() - start) * 1000, 3)
+            }
+            if error:
+                state[name]["error"] = error
+        return state
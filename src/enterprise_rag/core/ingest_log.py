@@ -0,0 +1,288 @@
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Namespace of the deterministic chunk ids
+CHUNK_NAMESPACE = uuid.UUID("6f1c2f4e-8d5b-4a63-9a4e-2c1b7d0e9f35")
+
+OPEN = "open"
+SEALED = "sealed"
+
+def chunk_ids(chunks: List[Dict[str, Any]]) -> List[str]:
+    """Deterministic ids: the same chunk of the same file content always gets the same id"""
+    return [
+        str(uuid.uuid5(
+            CHUNK_NAMESPACE,
+            f"{chunk['metadata'].get('source')}\0{chunk['metadata'].get('doc_hash', '')}\0"
+            f"{chunk['metadata'].get('chunk_id')}"
+        ))
+        for chunk in chunks
+    ]
+
+class IngestLog:
+    """Write-ahead log for document ingestion.
+
+    Every upload opens a document record, and every batch of embedded
+    chunks is written to the log (ids, text, metadata and vectors) before
+    it is applied to the vector store. Batches from all uploads are pooled
+    and committed in groups of ``group_size`` chunks: one durable log
+    transaction and one store write per group instead of per batch. Once
+    applied, a batch's payload is dropped; once a document finishes, its
+    records are.
+
+    After a crash, ``recover`` brings the store back in line with the log.
+    Documents that had finished embedding (sealed) are rolled forward:
+    unapplied batches are replayed and their duplicate references
+    re-recorded. Unfinished documents are rolled back by id, to be
+    ingested again from their files. Chunk ids are deterministic and
+    already-stored ids are skipped, so replaying twice is harmless. Only
+    the chunks an upload inserted are logged under it, so rolling it back
+    never deletes a copy stored by an earlier upload of the same file.
+    """
+
+    def __init__(self, path: str, store, group_size: int = 256):
+        self.path = Path(path)
+        self.store = store
+        self.group_size = group_size
+        self._pending: List[Tuple[str, List[str], List[Dict[str, Any]], np.ndarray]] = []
+        self._pending_chunks = 0
+        self._buffer_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        # Why a group holding an upload's batch failed, by doc_key; kept
+        # until the upload is aborted so it can never be sealed
+        self._failures: Dict[str, Exception] = {}
+        self.groups = 0
+        self.batches = 0
+        self.chunks = 0
+        self.recovered: Dict[str, Any] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            with self._conn:
+                self._conn.executescript("""
+                    CREATE TABLE IF NOT EXISTS documents (
+                        doc_key TEXT PRIMARY KEY, source TEXT, doc_hash TEXT,
+                        state TEXT, duplicates TEXT, started_at REAL
+                    );
+                    CREATE TABLE IF NOT EXISTS batches (
+                        batch_id INTEGER PRIMARY KEY AUTOINCREMENT, doc_key TEXT,
+                        ids TEXT, documents TEXT, embeddings BLOB, dimension INTEGER,
+                        applied INTEGER DEFAULT 0
+                    );
+                    CREATE INDEX IF NOT EXISTS batches_doc ON batches (doc_key);
+                """)
+
+    def begin(self, source: str, doc_hash: Optional[str] = None) -> str:
+        """Record the intent to ingest a document; returns its log key"""
+        doc_key = uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, NULL, ?)",
+                (doc_key, source, doc_hash, OPEN, time.time())
+            )
+        return doc_key
+
+    def append(self, doc_key: str, documents: List[Dict[str, Any]], embeddings: np.ndarray, ids: List[str]):
+        """Queue a batch; a full group is logged and applied before this returns"""
+        with self._buffer_lock:
+            self._pending.append((doc_key, ids, documents, np.asarray(embeddings, dtype=np.float32)))
+            self._pending_chunks += len(ids)
+            full = self._pending_chunks >= self.group_size
+        if full:
+            self.flush(doc_key)
+
+    def flush(self, doc_key: Optional[str] = None):
+        """Log and apply every queued batch as one group.
+
+        A failed group fails every upload with a batch in it, whichever
+        thread flushed it. With ``doc_key``, that upload's failure is
+        raised and other uploads' failures are left to their owners.
+        """
+        with self._commit_lock:
+            with self._buffer_lock:
+                group, self._pending, self._pending_chunks = self._pending, [], 0
+            if group:
+                try:
+                    self._commit(group)
+                except Exception as e:
+                    logger.error(f"Ingestion group commit failed: {e}")
+                    for batch in group:
+                        self._failures[batch[0]] = e
+                    if doc_key is None:
+                        raise
+        if doc_key is not None:
+            self._check_failed(doc_key)
+
+    def finish(self, doc_key: str, duplicates: List[Tuple[str, Dict[str, Any]]]):
+        """Apply what is queued, seal the document and record its duplicates.
+
+        Refuses to seal a document with a batch that was not applied; the
+        caller should abort it instead.
+        """
+        self.flush(doc_key)
+        with self._lock:
+            unapplied = self._conn.execute(
+                "SELECT COUNT(*) FROM batches WHERE doc_key = ? AND applied = 0", (doc_key,)
+            ).fetchone()[0]
+        if unapplied:
+            raise RuntimeError(f"{unapplied} logged batches of ingestion {doc_key} were not applied")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE documents SET state = ?, duplicates = ? WHERE doc_key = ?",
+                (SEALED, json.dumps(duplicates), doc_key)
+            )
+        if duplicates:
+            self.store.add_duplicates(duplicates)
+        self._close(doc_key)
+
+    def abort(self, doc_key: str):
+        """Undo a failed ingestion: drop its queued batches and delete what was applied"""
+        with self._commit_lock:
+            with self._buffer_lock:
+                dropped = [batch for batch in self._pending if batch[0] == doc_key]
+                self._pending = [batch for batch in self._pending if batch[0] != doc_key]
+                self._pending_chunks -= sum(len(batch[1]) for batch in dropped)
+            self._roll_back(doc_key)
+            self._failures.pop(doc_key, None)
+
+    def recover(self) -> Dict[str, Any]:
+        """Roll sealed documents forward and unfinished ones back.
+
+        Returns counts and the sources of rolled-back documents, which
+        should be ingested again.
+        """
+        with self._lock:
+            documents = self._conn.execute(
+                "SELECT doc_key, source, doc_hash, state, duplicates FROM documents ORDER BY started_at"
+            ).fetchall()
+        rolled_forward, rolled_back, resume = 0, 0, []
+        with self._commit_lock:
+            for doc_key, source, doc_hash, state, duplicates in documents:
+                if state == SEALED:
+                    self._roll_forward(doc_key, source, doc_hash, json.loads(duplicates or "[]"))
+                    rolled_forward += 1
+                else:
+                    self._roll_back(doc_key)
+                    rolled_back += 1
+                    resume.append(source)
+        self.recovered = {"rolled_forward": rolled_forward, "rolled_back": rolled_back, "resume": resume}
+        if documents:
+            logger.warning(
+                f"Ingestion log recovery: {rolled_forward} documents rolled forward, "
+                f"{rolled_back} rolled back"
+            )
+        return self.recovered
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {
+            "group_size": self.group_size,
+            "groups_committed": self.groups,
+            "batches_committed": self.batches,
+            "chunks_committed": self.chunks,
+            "chunks_per_group": round(self.chunks / self.groups, 1) if self.groups else None,
+            "open_documents": open_documents,
+            "last_recovery": self.recovered
+        }
+
+    def _check_failed(self, doc_key: str):
+        error = self._failures.get(doc_key)
+        if error is not None:
+            raise RuntimeError(f"Storing chunks of ingestion {doc_key} failed: {error}") from error
+
+    def _commit(self, group):
+        chunk_total = sum(len(batch[1]) for batch in group)
+        # Chunks already stored belong to an earlier upload: neither logged
+        # nor added, so a rollback of this one leaves them alone
+        claimed = self.store.existing_ids([chunk_id for batch in group for chunk_id in batch[1]])
+        inserts = []
+        for doc_key, ids, documents, embeddings in group:
+            keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in claimed]
+            claimed.update(ids[i] for i in keep)
+            if keep:
+                inserts.append((doc_key, [ids[i] for i in keep], [documents[i] for i in keep], embeddings[keep]))
+
+        # One durable transaction for the whole group
+        batch_ids = []
+        with self._lock, self._conn:
+            for doc_key, ids, documents, embeddings in inserts:
+                cursor = self._conn.execute(
+                    "INSERT INTO batches (doc_key, ids, documents, embeddings, dimension) VALUES (?, ?, ?, ?, ?)",
+                    (doc_key, json.dumps(ids), json.dumps(documents), embeddings.tobytes(), embeddings.shape[1])
+                )
+                batch_ids.append(cursor.lastrowid)
+
+        if inserts:
+            self.store.add_documents(
+                [document for batch in inserts for document in batch[2]],
+                np.concatenate([batch[3] for batch in inserts]),
+                ids=[chunk_id for batch in inserts for chunk_id in batch[1]]
+            )
+
+        marks = ",".join("?" * len(batch_ids))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE batches SET applied = 1, documents = NULL, embeddings = NULL WHERE batch_id IN ({marks})",
+                batch_ids
+            )
+        self.groups += 1
+        self.batches += len(group)
+        self.chunks += chunk_total
+
+    def _apply(self, ids: List[str], documents: List[Dict[str, Any]], embeddings: np.ndarray):
+        """Add the chunks the store does not hold yet"""
+        existing = self.store.existing_ids(ids)
+        keep = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+        if keep:
+            self.store.add_documents(
+                [documents[i] for i in keep],
+                embeddings[keep],
+                ids=[ids[i] for i in keep]
+            )
+
+    def _roll_forward(self, doc_key: str, source: str, doc_hash: Optional[str], duplicates):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ids, documents, embeddings, dimension FROM batches WHERE doc_key = ? AND applied = 0",
+                (doc_key,)
+            ).fetchall()
+        for ids, documents, embeddings, dimension in rows:
+            self._apply(
+                json.loads(ids),
+                json.loads(documents),
+                np.frombuffer(embeddings, dtype=np.float32).reshape(-1, dimension)
+            )
+        dedup = getattr(self.store, "dedup", None)
+        if dedup is not None and duplicates:
+            # The crash may have come after some references were recorded
+            dedup.remove_duplicates(source=source, doc_hash=doc_hash)
+            self.store.add_duplicates([(canonical, metadata) for canonical, metadata in duplicates])
+        logger.info(f"Rolled forward ingestion of {source} ({len(rows)} batches replayed)")
+        self._close(doc_key)
+
+    def _roll_back(self, doc_key: str):
+        with self._lock:
+            rows = self._conn.execute("SELECT ids FROM batches WHERE doc_key = ?", (doc_key,)).fetchall()
+        ids = [chunk_id for (batch_ids,) in rows for chunk_id in json.loads(batch_ids)]
+        if ids:
+            self.store.delete_chunks(ids)
+        logger.info(f"Rolled back {len(ids)} logged chunks of ingestion {doc_key}")
+        self._close(doc_key)
+
+    def _close(self, doc_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM batches WHERE doc_key = ?", (doc_key,))
+            self._conn.execute("DELETE FROM documents WHERE doc_key = ?", (doc_key,))
@@ -0,0 +1,96 @@
+from typing import Optional
+from pathlib import Path
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class IVFIndex:
+    """Inverted-file index over a (possibly memory-mapped) vector matrix.
+
+    Rows are clustered around k-means centroids; a search ranks the
+    centroids against the query and reads only the rows of the ``nprobe``
+    nearest clusters, so the pages it touches grow with the probed
+    fraction of the matrix rather than with the matrix. Results are
+    approximate: recall rises with ``nprobe``. Distances are squared L2.
+    """
+
+    # Rows assigned per block; bounds the float32 temporary for float16 matrices
+    BLOCK_ROWS = 65536
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.centroid_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        # Row ids grouped by cluster; cluster c is order[offsets[c]:offsets[c + 1]]
+        self.order = order
+        self.offsets = offsets
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        nlist: Optional[int] = None,
+        sample_size: int = 32768,
+        iterations: int = 10,
+        seed: int = 0
+    ) -> "IVFIndex":
+        """Fit centroids on a sample of rows, then assign every row"""
+        started = time.perf_counter()
+        count = len(vectors)
+        nlist = nlist or int(np.clip(np.sqrt(count), 1, 4096))
+        nlist = max(1, min(nlist, count))
+        rng = np.random.default_rng(seed)
+        # Sorted so the sample is read in file order
+        sample_rows = np.sort(rng.choice(count, size=min(count, max(sample_size, nlist)), replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = cls._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            sizes = np.bincount(labels, minlength=nlist)
+            filled = sizes > 0
+            centroids[filled] = sums[filled] / sizes[filled, None]
+            # Empty clusters restart from random sample rows
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), size=len(empty), replace=False)]
+
+        labels = np.empty(count, dtype=np.int32)
+        for start in range(0, count, cls.BLOCK_ROWS):
+            block = np.asarray(vectors[start:start + cls.BLOCK_ROWS], dtype=np.float32)
+            labels[start:start + len(block)] = cls._assign(block, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=nlist))]).astype(np.int64)
+        logger.info(f"Trained IVF index: {count} rows in {nlist} lists in {time.perf_counter() - started:.2f}s")
+        return cls(centroids, order, offsets)
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Rows of the ``nprobe`` clusters nearest the query, in file order"""
+        nprobe = max(1, min(nprobe, self.nlist))
+        distances = self.centroid_norms - 2.0 * (self.centroids @ np.asarray(query, dtype=np.float32))
+        nearest = np.argpartition(distances, nprobe - 1)[:nprobe] if nprobe < self.nlist else range(self.nlist)
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in nearest])
+        return np.sort(rows)
+
+    def save(self, path: Path):
+        tmp = Path(path).with_name(f".{Path(path).name}.tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"])
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        norms = np.einsum("ij,ij->i", centroids, centroids)
+        return np.argmin(norms - 2.0 * (vectors @ centroids.T), axis=1).astype(np.int32)
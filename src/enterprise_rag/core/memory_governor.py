@@ -0,0 +1,193 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+import gc
+import logging
+import os
+import resource
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak rather than current RSS, but better than nothing off Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def container_memory_limit() -> Optional[int]:
+    """Memory limit of the enclosing cgroup (v2 or v1), if there is one"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            value = Path(path).read_text().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value)
+    return None
+
+class IngestJob:
+    """Memory accounting for one ingestion job"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reserved = 0
+        self.peak_reserved = 0
+        self.peak_rss = 0
+        self.throttled_seconds = 0.0
+        self.throttle_count = 0
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "job": self.name,
+            "reserved_bytes": self.reserved,
+            "peak_reserved_bytes": self.peak_reserved,
+            "peak_rss_bytes": self.peak_rss,
+            "throttle_count": self.throttle_count,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class MemoryGovernor:
+    """Admits ingestion work against a memory budget.
+
+    Each stage reserves an estimate of the bytes it is about to hold before
+    doing the work. A reservation waits while the jobs' combined
+    reservations would exceed ``budget_bytes`` or process RSS is above
+    ``rss_limit_bytes``, so concurrent ingestion slows down instead of
+    running the process out of memory. A job is never made to wait on its
+    own reservations: when no other job holds memory it proceeds even over
+    budget, so one oversized document still completes.
+
+    A job that already holds memory only waits while another job holding
+    memory is still running, and so will release it. When every holder is
+    waiting, one of them goes ahead over budget; otherwise they would wait
+    on each other forever.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        rss_limit_bytes: Optional[int] = None,
+        poll_interval: float = 0.1,
+        history: int = 20
+    ):
+        self.budget_bytes = budget_bytes
+        self.rss_limit_bytes = rss_limit_bytes
+        self.poll_interval = poll_interval
+        self.in_flight = 0
+        self.peak_rss = 0
+        self._jobs: Dict[int, IngestJob] = {}
+        # Jobs blocked in reserve(), by id
+        self._waiting: set = set()
+        self._finished = deque(maxlen=history)
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def job(self, name: str):
+        """Track one ingestion job; its reservations are released on exit"""
+        job = IngestJob(name)
+        with self._cond:
+            self._jobs[id(job)] = job
+        try:
+            yield job
+        finally:
+            with self._cond:
+                self._sample_rss(job)
+                self.in_flight -= job.reserved
+                job.reserved = 0
+                job.finished_at = time.time()
+                self._jobs.pop(id(job), None)
+                self._finished.append(job)
+                self._cond.notify_all()
+            logger.info(f"Ingestion job memory: {job.report()}")
+
+    def reserve(self, job: IngestJob, nbytes: int, stage: str = "ingest"):
+        """Block until ``nbytes`` more fit in the budget, then account them"""
+        waited_from = None
+        with self._cond:
+            while True:
+                rss = self._sample_rss(job)
+                over_budget = self.in_flight + nbytes > self.budget_bytes
+                over_rss = self.rss_limit_bytes is not None and rss > self.rss_limit_bytes
+                if not (over_budget or over_rss) or not self._can_wait(job):
+                    break
+                self._waiting.add(id(job))
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    job.throttle_count += 1
+                    logger.info(
+                        f"Throttling {stage} of {job.name}: {self.in_flight + nbytes} bytes "
+                        f"reserved of {self.budget_bytes}, RSS {rss}"
+                    )
+                # RSS only drops when other jobs release memory or Python
+                # frees it, so poll rather than wait for a notification
+                self._cond.wait(self.poll_interval)
+
+            self._waiting.discard(id(job))
+            self.in_flight += nbytes
+            job.reserved += nbytes
+            job.peak_reserved = max(job.peak_reserved, job.reserved)
+            if waited_from is not None:
+                job.throttled_seconds += time.monotonic() - waited_from
+
+        if over_rss:
+            # Alone and still over the RSS limit: reclaim what we can and go on
+            gc.collect()
+            logger.warning(f"{job.name} proceeding over the RSS limit with no other job to wait for")
+
+    def _can_wait(self, job: IngestJob) -> bool:
+        """Whether waiting can end: some other job will release memory"""
+        others = self.in_flight - job.reserved
+        if not job.reserved:
+            return others > 0
+        # Holding memory: only wait on a holder that is not itself waiting
+        return any(
+            other is not job and other.reserved > 0 and id(other) not in self._waiting
+            for other in self._jobs.values()
+        )
+
+    def release(self, job: IngestJob, nbytes: int):
+        with self._cond:
+            nbytes = min(nbytes, job.reserved)
+            self.in_flight -= nbytes
+            job.reserved -= nbytes
+            self._cond.notify_all()
+
+    @contextmanager
+    def reservation(self, job: IngestJob, nbytes: int, stage: str = "ingest"):
+        self.reserve(job, nbytes, stage)
+        try:
+            yield
+        finally:
+            self.release(job, nbytes)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            active: List[Dict[str, Any]] = [job.report() for job in self._jobs.values()]
+            recent = [job.report() for job in self._finished]
+            rss = current_rss()
+            self.peak_rss = max(self.peak_rss, rss)
+            return {
+                "budget_bytes": self.budget_bytes,
+                "rss_limit_bytes": self.rss_limit_bytes,
+                "in_flight_bytes": self.in_flight,
+                "rss_bytes": rss,
+                "peak_rss_bytes": self.peak_rss,
+                "active_jobs": active,
+                "recent_jobs": recent
+            }
+
+    def _sample_rss(self, job: IngestJob) -> int:
+        rss = current_rss()
+        job.peak_rss = max(job.peak_rss, rss)
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
@@ -0,0 +1,291 @@
+from typing import List, Dict, Any, Optional
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+from .snapshot import Snapshot, export_snapshot
+from .tracing import stage
+
+logger = logging.getLogger(__name__)
+
+POINTER_FILE = "CURRENT"
+SNAPSHOT_SUFFIX = ".snap"
+
+class MmapIndex:
+    """One immutable published version of the index, opened with mmap.
+
+    Every worker that opens the same snapshot shares the vector pages through
+    the OS page cache, so adding workers adds almost no resident memory.
+    Distances are squared L2, matching the Chroma collection's default.
+    """
+
+    # Rows scored per block; bounds the float32 temporary for float16 snapshots
+    SEARCH_BLOCK_ROWS = 65536
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.snapshot = Snapshot(self.path)
+        self.manifest = self.snapshot.header
+        self.count = self.snapshot.count
+        self.dimension = self.snapshot.dimension
+        self._chunk_positions = None
+
+        if self.count:
+            self.vectors = self.snapshot.vectors
+            self.sq_norms = self.snapshot.sq_norms
+            self.columns = self.snapshot.columns
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 3,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        if self.count == 0:
+            return []
+        with stage("query"):
+            top, scores = self.nearest(query_embedding, top_k)
+        with stage("format"):
+            rows = self.rows(top, scores)
+            if include_embeddings:
+                for row, i in zip(rows, top):
+                    row['embedding'] = np.asarray(self.vectors[i], dtype=np.float32)
+            return rows
+
+    def neighbors(self, hit: Dict[str, Any], window: int) -> List[Dict[str, Any]]:
+        """Chunks within ``window`` positions of a hit in the same document"""
+        if self._chunk_positions is None:
+            # One pass over the metadata column, the first time it is needed
+            positions = {}
+            for i in range(self.count):
+                metadata = json.loads(self.columns["metadatas"][i])
+                positions[(metadata.get("source"), metadata.get("chunk_id"))] = i
+            self._chunk_positions = positions
+        metadata = hit.get("metadata") or {}
+        source, chunk_id = metadata.get("source"), metadata.get("chunk_id")
+        if chunk_id is None:
+            return []
+        found = [
+            self._chunk_positions.get((source, chunk_id + offset))
+            for offset in range(-window, window + 1) if offset
+        ]
+        positions = [i for i in found if i is not None]
+        return self.rows(positions, [None] * len(positions))
+
+    def nearest(self, query_embedding: np.ndarray, top_k: int, excluded: Optional[np.ndarray] = None):
+        """Positions and distances of the nearest rows, skipping rows set in ``excluded``"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if self.vectors.dtype == np.float32 and self.count <= self.SEARCH_BLOCK_ROWS:
+            dots = self.vectors @ query
+        else:
+            dots = np.empty(self.count, dtype=np.float32)
+            for start in range(0, self.count, self.SEARCH_BLOCK_ROWS):
+                block = self.vectors[start:start + self.SEARCH_BLOCK_ROWS]
+                dots[start:start + len(block)] = block.astype(np.float32) @ query
+        distances = self.sq_norms - 2.0 * dots + float(query @ query)
+        if excluded is not None:
+            distances[excluded] = np.inf
+        k = min(top_k, self.count)
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        if excluded is not None:
+            top = top[np.isfinite(distances[top])]
+        return top.tolist(), distances[top].astype(np.float32).tolist()
+
+    def rows(self, positions: List[int], scores: List[float]) -> List[Dict[str, Any]]:
+        return [
+            {
+                'text': self.columns["texts"][i],
+                'metadata': json.loads(self.columns["metadatas"][i]),
+                'score': score,
+                'id': self.columns["ids"][i]
+            }
+            for i, score in zip(positions, scores)
+        ]
+
+class SharedIndexReader:
+    """Read-only stand-in for VectorStore in reader workers.
+
+    Follows the ``CURRENT`` pointer written by IndexPublisher and swaps to a
+    new version when it changes; the check is one small file read at most
+    every ``refresh_interval`` seconds.
+    """
+
+    def __init__(self, index_directory: str, refresh_interval: float = 1.0):
+        self.index_directory = Path(index_directory)
+        self.refresh_interval = refresh_interval
+        self._index: Optional[MmapIndex] = None
+        self._current_name: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh(force=True)
+
+    @property
+    def version(self) -> int:
+        index = self._current()
+        return index.manifest.get("store_version", 0) if index else 0
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 3,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
+        with stage("count"):
+            index = self._current()
+        if index is None:
+            logger.warning("Shared index has not been published yet")
+            return []
+        return index.search(query_embedding, top_k, include_embeddings)
+
+    def get_neighbors(self, hits: List[Dict[str, Any]], window: int = 1) -> List[List[Dict[str, Any]]]:
+        index = self._current()
+        if index is None:
+            return [[] for _ in hits]
+        return [index.neighbors(hit, window) for hit in hits]
+
+    def count(self) -> int:
+        index = self._current()
+        return index.count if index else 0
+
+    def is_empty(self) -> bool:
+        return self.count() == 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        index = self._current()
+        if index is None:
+            return {"total_chunks": 0, "total_documents": 0, "published": False}
+        manifest = index.manifest
+        return {
+            "collection": manifest.get("collection"),
+            "total_chunks": index.count,
+            "total_documents": len(manifest.get("chunks_per_source", {})),
+            "chunks_per_source": manifest.get("chunks_per_source", {}),
+            "dimension": index.dimension,
+            "version": manifest.get("store_version"),
+            "dtype": manifest.get("dtype"),
+            "published_at": manifest.get("created_at"),
+            "published": True
+        }
+
+    def _current(self) -> Optional[MmapIndex]:
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self._refresh()
+        return self._index
+
+    def _refresh(self, force: bool = False):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                name = (self.index_directory / POINTER_FILE).read_text().strip()
+            except FileNotFoundError:
+                return
+            if not force and name == self._current_name:
+                return
+            try:
+                self._index = MmapIndex(self.index_directory / name)
+                self._current_name = name
+                logger.info(f"Mapped shared index version {name} ({self._index.count} chunks)")
+            except Exception as e:
+                logger.error(f"Failed to map shared index {name}: {e}")
+
+class IndexPublisher:
+    """Writer-side exporter that publishes VectorStore contents for readers.
+
+    A background thread watches ``vector_store.version`` and, when it has
+    changed, writes a new snapshot file and atomically repoints ``CURRENT``
+    at it. The previous ``keep_versions - 1`` snapshots are kept on disk;
+    readers still mapping a pruned one keep working since unlinked files
+    stay mapped until closed.
+
+    Publishing re-exports the whole store, so changes are coalesced: a new
+    version is published once writes have paused for ``settle`` seconds,
+    or ``max_lag`` seconds after the first unpublished change. Consecutive
+    publishes are at least as far apart as the last one took, which caps
+    the time spent exporting at about half.
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        index_directory: str,
+        interval: float = 1.0,
+        keep_versions: int = 2,
+        dtype: str = "float32",
+        settle: float = 2.0,
+        max_lag: float = 30.0
+    ):
+        self.vector_store = vector_store
+        self.index_directory = Path(index_directory)
+        self.interval = interval
+        self.keep_versions = keep_versions
+        self.dtype = dtype
+        self.settle = settle
+        self.max_lag = max_lag
+        self.published_version: Optional[int] = None
+        self.last_publish_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="index-publisher")
+        self._thread.start()
+        logger.info(f"Index publisher started for {self.index_directory}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def publish(self) -> Path:
+        """Export the store to a new snapshot file and make it current"""
+        store = self.vector_store
+        self.index_directory.mkdir(parents=True, exist_ok=True)
+
+        version = store.version
+        name = f"v{version:08d}-{int(time.time() * 1000)}{SNAPSHOT_SUFFIX}"
+        target = self.index_directory / name
+        result = export_snapshot(store, target, dtype=self.dtype)
+
+        pointer_tmp = self.index_directory / f".{POINTER_FILE}.tmp"
+        pointer_tmp.write_text(name)
+        os.replace(pointer_tmp, self.index_directory / POINTER_FILE)
+
+        self.published_version = Snapshot(target).header["store_version"]
+        self._prune(keep=name)
+        logger.info(f"Published shared index {name} ({result['chunks']} chunks)")
+        return target
+
+    def _run(self):
+        seen_version, changed_at, behind_since, next_publish = None, 0.0, None, 0.0
+        while not self._stop.is_set():
+            version = self.vector_store.version
+            now = time.monotonic()
+            if version == self.published_version:
+                behind_since = None
+            else:
+                if version != seen_version:
+                    seen_version, changed_at = version, now
+                behind_since = behind_since or now
+                due = now - changed_at >= self.settle or now - behind_since >= self.max_lag
+                if due and now >= next_publish:
+                    try:
+                        self.publish()
+                    except Exception as e:
+                        logger.error(f"Index publish failed: {e}")
+                    finished = time.monotonic()
+                    self.last_publish_seconds = finished - now
+                    next_publish = finished + self.last_publish_seconds
+                    behind_since = None
+            self._stop.wait(self.interval)
+
+    def _prune(self, keep: str):
+        versions = sorted(
+            p for p in self.index_directory.iterdir()
+            if p.is_file() and p.name.startswith("v") and p.name.endswith(SNAPSHOT_SUFFIX) and p.name != keep
+        )
+        for old in versions[:max(0, len(versions) - (self.keep_versions - 1))]:
+            old.unlink(missing_ok=True)
@@ -0,0 +1,355 @@
+from typing import List, Dict, Any, Optional, Iterable
+from pathlib import Path
+import argparse
+import json
+import logging
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PROJECTION_MODES = ("pca", "truncate")
+
+class Projection:
+    """Linear map from the model's embedding space to a smaller one.
+
+    ``pca`` projects onto the top principal components of the corpus and
+    must be fitted first; ``truncate`` keeps the leading dimensions and
+    re-normalizes, which suits Matryoshka-trained models whose prefixes are
+    embeddings in their own right.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        dimension: int,
+        source_dimension: int,
+        mean: Optional[np.ndarray] = None,
+        components: Optional[np.ndarray] = None,
+        explained_variance: Optional[float] = None
+    ):
+        if mode not in PROJECTION_MODES:
+            raise ValueError(f"Unknown projection mode: {mode}")
+        if dimension >= source_dimension:
+            raise ValueError(f"Reduced dimension {dimension} must be below {source_dimension}")
+        self.mode = mode
+        self.dimension = dimension
+        self.source_dimension = source_dimension
+        self.mean = mean
+        self.components = components
+        self.explained_variance = explained_variance
+
+    @classmethod
+    def fit(cls, mode: str, dimension: int, batches: Iterable[np.ndarray]) -> "Projection":
+        """Fit on the corpus, streamed in batches of vectors.
+
+        PCA accumulates the sum and scatter matrix in float64, so memory is
+        O(d^2) whatever the corpus size.
+        """
+        count, total, scatter, source_dimension = 0, None, None, None
+        for batch in batches:
+            vectors = np.asarray(batch, dtype=np.float64)
+            if not len(vectors):
+                continue
+            source_dimension = vectors.shape[1]
+            if mode == "truncate":
+                break
+            if total is None:
+                total = np.zeros(source_dimension)
+                scatter = np.zeros((source_dimension, source_dimension))
+            count += len(vectors)
+            total += vectors.sum(axis=0)
+            scatter += vectors.T @ vectors
+        if source_dimension is None:
+            raise ValueError("Cannot fit a projection on an empty corpus")
+        if mode == "truncate":
+            return cls(mode, dimension, source_dimension)
+
+        mean = total / count
+        covariance = scatter / count - np.outer(mean, mean)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1][:dimension]
+        explained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+        return cls(
+            mode,
+            dimension,
+            source_dimension,
+            mean=mean.astype(np.float32),
+            components=eigenvectors[:, order].T.astype(np.float32),
+            explained_variance=explained
+        )
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.mode == "truncate":
+            reduced = vectors[..., :self.dimension]
+            norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+            return reduced / np.maximum(norms, 1e-12)
+        return (vectors - self.mean) @ self.components.T
+
+    def save(self, path: str):
+        arrays = {"mean": self.mean, "components": self.components} if self.mode == "pca" else {}
+        meta = {
+            "mode": self.mode,
+            "dimension": self.dimension,
+            "source_dimension": self.source_dimension,
+            "explained_variance": self.explained_variance
+        }
+        target = Path(path)
+        tmp = target.with_suffix(".tmp.npz")
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        tmp.replace(target)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                meta["mode"],
+                meta["dimension"],
+                meta["source_dimension"],
+                mean=data["mean"] if "mean" in data else None,
+                components=data["components"] if "components" in data else None,
+                explained_variance=meta.get("explained_variance")
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "dimension": self.dimension,
+            "source_dimension": self.source_dimension,
+            "explained_variance": self.explained_variance
+        }
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest distances per row, nearest first"""
+    k = min(k, distances.shape[1])
+    part = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, part, axis=1).argsort(axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+def _sq_l2(queries: np.ndarray, vectors: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+    return sq_norms[None, :] - 2.0 * (queries @ vectors.T) + (queries ** 2).sum(axis=1)[:, None]
+
+def evaluate_recall(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    projection: Projection,
+    k_values: List[int],
+    rescore_factor: int = 4,
+    exclude: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """Recall@k of reduced-space search against exact full-dimension search.
+
+    Both are brute force, so the numbers isolate the projection (and the
+    rescoring depth) from any ANN index error. ``exclude`` gives, per
+    query, a row to leave out of the rankings, for queries sampled from
+    the corpus itself.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    max_k = max(k_values)
+    rows = np.arange(len(queries))
+
+    started = time.perf_counter()
+    full = _sq_l2(queries, vectors, (vectors ** 2).sum(axis=1))
+    if exclude is not None:
+        full[rows, exclude] = np.inf
+    truth = _top_k(full, max_k)
+    full_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    reduced_vectors = projection.transform(vectors)
+    reduced_norms = (reduced_vectors ** 2).sum(axis=1)
+    started = time.perf_counter()
+    reduced = _sq_l2(projection.transform(queries), reduced_vectors, reduced_norms)
+    if exclude is not None:
+        reduced[rows, exclude] = np.inf
+    candidates = _top_k(reduced, max_k * rescore_factor)
+    candidate_vectors = vectors[candidates]
+    rescored = ((candidate_vectors - queries[:, None, :]) ** 2).sum(axis=2)
+    if exclude is not None:
+        rescored[candidates == exclude[:, None]] = np.inf
+    found = np.take_along_axis(candidates, _top_k(rescored, max_k), axis=1)
+    reduced_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    unscored = candidates[:, :max_k]
+
+    def recall(result: np.ndarray, k: int) -> float:
+        hits = [len(set(result[i, :k]) & set(truth[i, :k])) / k for i in range(len(queries))]
+        return round(float(np.mean(hits)), 4)
+
+    return {
+        **projection.stats(),
+        "rescore_factor": rescore_factor,
+        "queries": len(queries),
+        "recall": {f"@{k}": recall(found, k) for k in k_values},
+        "recall_without_rescoring": {f"@{k}": recall(unscored, k) for k in k_values},
+        "full_ms_per_query": round(full_ms, 3),
+        "reduced_ms_per_query": round(reduced_ms, 3),
+        "bytes_per_vector": {"full": projection.source_dimension * 4, "reduced": projection.dimension * 4}
+    }
+
+def _serve_queries(
+    persist_directory: str,
+    collection: str,
+    dimension: Optional[int],
+    mode: str,
+    rescore_factor: int,
+    queries: np.ndarray,
+    k: int,
+    results
+):
+    """Run in a fresh process: open a built store and time its searches"""
+    from .memory_governor import current_rss
+    from .vector_store import VectorStore
+    baseline = current_rss()
+    store = VectorStore(
+        collection,
+        persist_directory,
+        dedup_threshold=None,
+        reduced_dimension=dimension,
+        projection_mode=mode,
+        rescore_factor=rescore_factor
+    )
+    # The first search loads the index
+    store.search(queries[0], top_k=k)
+    latencies, found = [], []
+    for query in queries:
+        started = time.perf_counter()
+        hits = store.search(query, top_k=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append([hit["id"] for hit in hits])
+    rss = current_rss()
+    results.put({
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "rss_bytes": rss,
+        "rss_growth_bytes": rss - baseline,
+        "found": found
+    })
+
+def measure_end_to_end(
+    source,
+    queries: np.ndarray,
+    dimensions: List[int],
+    mode: str,
+    k_values: List[int],
+    rescore_factor: int = 4,
+    work_directory: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Latency, RSS and recall@k of ``VectorStore.search`` as deployed.
+
+    The corpus of ``source`` is copied into one store at full dimension and
+    one per reduced dimension; each is then searched from a fresh process,
+    so the latency covers the whole search path (index query, full-vector
+    rescoring, formatting) and the RSS is what serving that store costs.
+    Recall is measured against the full-dimension store's results.
+    """
+    from .vector_store import VectorStore
+    max_k = max(k_values)
+    context = multiprocessing.get_context("spawn")
+    reports = []
+    with tempfile.TemporaryDirectory(dir=work_directory) as root:
+        for dimension in [None, *dimensions]:
+            persist_directory = str(Path(root) / f"d{dimension or 'full'}")
+            store = VectorStore(
+                source.collection_name,
+                persist_directory,
+                dedup_threshold=None,
+                reduced_dimension=dimension,
+                projection_mode=mode,
+                rescore_factor=rescore_factor
+            )
+            for page in source.iter_batches(include=["embeddings", "documents", "metadatas"]):
+                store.add_documents(
+                    [{"text": text, "metadata": metadata} for text, metadata in zip(page["documents"], page["metadatas"])],
+                    np.asarray(page["embeddings"], dtype=np.float32),
+                    ids=page["ids"]
+                )
+            if dimension and mode == "pca":
+                store.fit_projection()
+            del store
+
+            results = context.Queue()
+            worker = context.Process(
+                target=_serve_queries,
+                args=(persist_directory, source.collection_name, dimension, mode, rescore_factor, queries, max_k, results)
+            )
+            worker.start()
+            report = results.get()
+            worker.join()
+            reports.append({"dimension": dimension or "full", **report})
+
+    truth = reports[0]["found"]
+    for report in reports:
+        found = report.pop("found")
+        report["recall"] = {
+            f"@{k}": round(float(np.mean([
+                len(set(hits[:k]) & set(expected[:k])) / k for hits, expected in zip(found, truth)
+            ])), 4)
+            for k in k_values
+        }
+    return reports
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k of reduced-dimension search against the full-dimension baseline"
+    )
+    parser.add_argument("--collection", default="radiation_docs")
+    parser.add_argument("--persist-directory", default="data/vector_store")
+    parser.add_argument("--mode", choices=PROJECTION_MODES, default="pca")
+    parser.add_argument("--dims", default="64,128,256", help="comma-separated reduced dimensions to try")
+    parser.add_argument("--k", default="1,5,10", help="comma-separated k values")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200, help="corpus vectors sampled as queries")
+    parser.add_argument("--queries-file", help="text file of queries, one per line, embedded with --model")
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--end-to-end", action="store_true",
+        help="also build a store per dimension and measure search latency and RSS through VectorStore"
+    )
+    parser.add_argument("--work-directory", help="where the --end-to-end stores are built (default: system temp)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from .vector_store import VectorStore
+    store = VectorStore(args.collection, args.persist_directory)
+    vectors = np.concatenate([
+        np.asarray(page["embeddings"], dtype=np.float32)
+        for page in store.iter_batches(include=["embeddings"])
+    ]) if store.count() else np.empty((0, 0), dtype=np.float32)
+    if not len(vectors):
+        raise SystemExit("The collection is empty")
+
+    exclude = None
+    if args.queries_file:
+        from .embedding_service import EmbeddingService
+        texts = [line.strip() for line in Path(args.queries_file).read_text().splitlines() if line.strip()]
+        queries = EmbeddingService(args.model).generate_embeddings(texts)
+    else:
+        # Leave-one-out: each sampled chunk is excluded from its own ranking
+        rng = np.random.default_rng(args.seed)
+        exclude = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+        queries = vectors[exclude]
+
+    k_values = [int(k) for k in args.k.split(",")]
+    dimensions, reports = [], []
+    for dimension in (int(d) for d in args.dims.split(",")):
+        if dimension >= vectors.shape[1]:
+            logger.warning(f"Skipping dimension {dimension}: vectors have {vectors.shape[1]}")
+            continue
+        dimensions.append(dimension)
+        projection = Projection.fit(args.mode, dimension, [vectors])
+        reports.append(evaluate_recall(vectors, queries, projection, k_values, args.rescore_factor, exclude))
+    output = {"chunks": len(vectors), "source_dimension": vectors.shape[1], "results": reports}
+    if args.end_to_end:
+        output["end_to_end"] = measure_end_to_end(
+            store, np.asarray(queries, dtype=np.float32), dimensions, args.mode,
+            k_values, args.rescore_factor, args.work_directory
+        )
+    print(json.dumps(output, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import asyncio
 import logging
+import re
+import numpy as np
+from .diversify import mmr_select
+from .deadline import Deadline, DeadlineExceeded
+from .embed_batcher import EmbeddingBatcher
 from .embedding_service import EmbeddingService
 from .vector_store import VectorStore
+from .semantic_cache import SemanticCache
+from .single_flight import SingleFlight
+from .tracing import stage
+from ..utils.text import truncate_text, make_snippet
 
 logger = logging.getLogger(__name__)
 
@@ -9,43 +20,278 @@ class RAGEngine:
     def __init__(
         self,
         embedding_service: EmbeddingService,
-        vector_store: VectorStore
+        vector_store: VectorStore,
+        cache_size: int = 1024,
+        cache_threshold: float = 0.95,
+        diversity: float = 0.0,
+        mmr_fetch_factor: int = 4,
+        batcher: Optional[EmbeddingBatcher] = None
     ):
         self.embedding_service = embedding_service
+        # Query embeddings share forward passes and cache with /embed
+        self.batcher = batcher
         self.vector_store = vector_store
+        # Concurrent identical retrievals share one embedding and search
+        self.single_flight = SingleFlight()
+        # Paraphrases of recent queries reuse their results until the store changes
+        self.cache = SemanticCache(cache_size, cache_threshold) if cache_size > 0 else None
+        # MMR re-ranks top_k * mmr_fetch_factor candidates when diversity > 0
+        self.diversity = diversity
+        self.mmr_fetch_factor = mmr_fetch_factor
         logger.info("RAG Engine initialized")
 
     async def process_query(
         self,
         query: str,
-        top_k: int = 3
+        top_k: int = 3,
+        compact: bool = False,
+        max_text_length: Optional[int] = None,
+        snippet_length: Optional[int] = None,
+        diversity: Optional[float] = None,
+        expand_neighbors: int = 0,
+        deadline: Optional[Deadline] = None
     ) -> Dict[str, Any]:
+        """Answer a query, within ``deadline`` when one is given.
+
+        Stages that do not fit in the remaining time are skipped and named
+        in the response's ``degraded`` list, with ``partial`` set.
+        """
         try:
             logger.info(f"Processing query: {query}")
-            
-            # Generate query embedding
-            query_embedding = self.embedding_service.generate_embeddings([query])[0]
-            logger.info("Generated query embedding")
-            
-            # Get relevant documents
-            results = self.vector_store.search(
-                query_embedding=query_embedding,
-                top_k=top_k
-            )
-            logger.info(f"Found {len(results)} relevant documents")
-
-            # Format response
-            response = {
-                'query': query,
-                'results': results,
-                'total_results': len(results),
-                'categories': {
-                    'Relevant Documents': results
-                }
-            }
 
+            results, degraded = await self._run_pipeline(query, top_k, diversity, expand_neighbors, deadline)
+            with stage("shape"):
+                results = self._shape_results(results, query, max_text_length, snippet_length)
+
+            response = self._build_response(query, results, compact)
+            if degraded:
+                response['partial'] = True
+                response['degraded'] = degraded
             return response
 
         except Exception as e:
             logger.error(f"Error processing query: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def stream_query(
+        self,
+        query: str,
+        top_k: int = 3,
+        max_text_length: Optional[int] = None,
+        snippet_length: Optional[int] = None,
+        diversity: Optional[float] = None,
+        expand_neighbors: int = 0,
+        deadline: Optional[Deadline] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield pipeline events as each stage finishes.
+
+        Every hit is emitted as its own ``result`` event once retrieval
+        completes, before neighbors are looked up; with ``expand_neighbors``
+        a ``neighbors`` event per hit follows, then a ``done`` event
+        carrying the totals.
+        """
+        try:
+            logger.info(f"Streaming query: {query}")
+
+            results, degraded = await self._retrieve_within(query, top_k, diversity, deadline)
+            with stage("shape"):
+                shaped = self._shape_results(results, query, max_text_length, snippet_length)
+            for rank, result in enumerate(shaped):
+                yield {"event": "result", "data": {"rank": rank, **result}}
+
+            if expand_neighbors and results:
+                if deadline is not None and deadline.expired:
+                    degraded.append("expand_neighbors")
+                else:
+                    expanded = await asyncio.to_thread(self._expand, results, expand_neighbors)
+                    for rank, result in enumerate(expanded):
+                        yield {
+                            "event": "neighbors",
+                            "data": {"rank": rank, "id": result["id"], "neighbors": result["neighbors"]}
+                        }
+
+            done = {"query": query, "total_results": len(shaped)}
+            if degraded:
+                done.update(partial=True, degraded=degraded)
+            yield {"event": "done", "data": done}
+
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            raise
+
+    async def _run_pipeline(
+        self,
+        query: str,
+        top_k: int,
+        diversity: Optional[float],
+        expand_neighbors: int,
+        deadline: Optional[Deadline]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Retrieve and expand; returns the results and the stages that were skipped"""
+        results, degraded = await self._retrieve_within(query, top_k, diversity, deadline)
+        if expand_neighbors and results:
+            if deadline is not None and deadline.expired:
+                degraded.append("expand_neighbors")
+            else:
+                results = await asyncio.to_thread(self._expand, results, expand_neighbors)
+        return results, degraded
+
+    async def _retrieve_within(
+        self,
+        query: str,
+        top_k: int,
+        diversity: Optional[float],
+        deadline: Optional[Deadline]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Retrieve, returning no results if the deadline runs out first"""
+        try:
+            results, degraded = await self._retrieve_shared(query, top_k, diversity, deadline)
+        except (asyncio.TimeoutError, DeadlineExceeded) as e:
+            logger.warning(f"Query ran out of time during retrieval: {str(e) or 'deadline expired'}")
+            return [], ["retrieve"]
+        return results, list(degraded)
+
+    async def _retrieve_shared(
+        self,
+        query: str,
+        top_k: int,
+        diversity: Optional[float] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Retrieve, coalescing with any identical retrieval already running.
+
+        Shaping and neighbor expansion are applied per request afterwards, so
+        only the normalized query, ``top_k`` and diversity form the key.
+        """
+        diversity = self.diversity if diversity is None else diversity
+        normalized = self.normalize_query(query)
+        if self.cache is not None:
+            with stage("cache"):
+                cached = self.cache.get_exact(normalized, top_k, self.vector_store.version, diversity)
+            if cached is not None:
+                return cached, []
+        if deadline is not None:
+            deadline.check("retrieve")
+        return await self.single_flight.do(
+            (normalized, top_k, diversity),
+            lambda scope: asyncio.to_thread(self._retrieve, query, top_k, diversity, scope),
+            deadline
+        )
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip().casefold()
+
+    def _retrieve(
+        self,
+        query: str,
+        top_k: int,
+        diversity: float = 0.0,
+        scope: Optional[Deadline] = None
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        scope = scope or Deadline()
+        # Generate query embedding
+        scope.check("embed")
+        with stage("embed"):
+            if self.batcher is not None:
+                try:
+                    query_embedding = self.batcher.embed([query], timeout=scope.remaining())[0]
+                except FutureTimeoutError:
+                    raise DeadlineExceeded("deadline expired during embed")
+            else:
+                query_embedding = self.embedding_service.generate_embeddings([query])[0]
+        logger.info("Generated query embedding")
+
+        # Read the version first so results are never cached under a newer one
+        version = self.vector_store.version
+        if self.cache is not None:
+            with stage("cache"):
+                cached = self.cache.get(query_embedding, top_k, version, diversity)
+            if cached is not None:
+                logger.info("Served query from the semantic cache")
+                return cached, []
+
+        # Get relevant documents, over-fetching when they will be diversified
+        scope.check("search")
+        results = self.vector_store.search(
+            query_embedding=query_embedding,
+            top_k=top_k * self.mmr_fetch_factor if diversity > 0 else top_k,
+            include_embeddings=diversity > 0
+        )
+        if diversity > 0 and results and scope.expired:
+            # Out of time for re-ranking: the plain nearest neighbors will do
+            for result in results:
+                result.pop("embedding", None)
+            logger.info(f"Skipped re-ranking of {len(results)} candidates past the deadline")
+            return results[:top_k], ["rerank"]
+        if diversity > 0 and results:
+            with stage("mmr"):
+                order = mmr_select(
+                    query_embedding,
+                    np.stack([result.pop("embedding") for result in results]),
+                    top_k,
+                    diversity
+                )
+                results = [results[i] for i in order]
+        logger.info(f"Found {len(results)} relevant documents")
+        if self.cache is not None:
+            self.cache.put(self.normalize_query(query), query_embedding, top_k, results, version, diversity)
+        return results, []
+
+    def _expand(self, results: List[Dict[str, Any]], window: int) -> List[Dict[str, Any]]:
+        """Attach the chunks around each hit from the same document.
+
+        Neighbors come from stored ``chunk_id`` positions, not a vector
+        search; chunks that are hits themselves are not repeated.
+        """
+        with stage("expand"):
+            neighbors = self.vector_store.get_neighbors(results, window)
+            hit_ids = {result["id"] for result in results}
+            return [
+                {**result, "neighbors": [n for n in around if n["id"] not in hit_ids]}
+                for result, around in zip(results, neighbors)
+            ]
+
+    @staticmethod
+    def _shape_results(
+        results: List[Dict[str, Any]],
+        query: str,
+        max_text_length: Optional[int],
+        snippet_length: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Apply snippet extraction or truncation to result text"""
+        if not max_text_length and not snippet_length:
+            return results
+
+        shaped = []
+        for result in results:
+            text = result["text"]
+            if snippet_length:
+                text = make_snippet(text, query, snippet_length)
+            else:
+                text = truncate_text(text, max_text_length)
+            shaped.append({**result, "text": text})
+        return shaped
+
+    @staticmethod
+    def _build_response(
+        query: str,
+        results: List[Dict[str, Any]],
+        compact: bool
+    ) -> Dict[str, Any]:
+        # Compact responses carry the hits once instead of twice
+        if compact:
+            return {
+                'query': query,
+                'results': results,
+                'total_results': len(results)
+            }
+
+        return {
+            'query': query,
+            'results': results,
+            'total_results': len(results),
+            'categories': {
+                'Relevant Documents': results
+            }
+        }
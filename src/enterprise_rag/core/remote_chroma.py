@@ -0,0 +1,237 @@
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple
+from urllib.parse import urlparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import chromadb
+import httpx
+from chromadb.config import Settings
+from chromadb.errors import ChromaError
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth another attempt
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# Per-query fields of a Chroma query result; the rest are not split between callers
+QUERY_FIELDS = ("ids", "embeddings", "documents", "uris", "data", "metadatas", "distances")
+
+def _transient(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    return isinstance(error, ChromaError) and error.code() in RETRY_STATUS
+
+class RemoteChromaClient:
+    """Chroma server client for VectorStore, so API pods share one index.
+
+    Wraps Chroma's async HTTP client, which keeps a pool of keep-alive
+    connections, in a private event loop thread; VectorStore calls it
+    synchronously from its worker threads and concurrent calls share the
+    pool. Each attempt is bounded by ``timeout`` seconds, and timeouts,
+    connection errors, 429 and 5xx responses are retried up to ``retries``
+    times with jittered exponential backoff. Concurrent queries with the
+    same parameters that arrive within ``query_batch_ms`` are sent as one
+    multi-embedding request and split on return.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 10.0,
+        retries: int = 3,
+        backoff: float = 0.2,
+        max_connections: int = 32,
+        query_batch_ms: float = 2.0,
+        max_query_batch: int = 32,
+        refresh_interval: float = 5.0,
+        token: Optional[str] = None
+    ):
+        parsed = urlparse(url if "://" in url else f"http://{url}")
+        self.url = url
+        self.host = parsed.hostname or "localhost"
+        self.ssl = parsed.scheme == "https"
+        self.port = parsed.port or (443 if self.ssl else 8000)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.query_batch_wait = query_batch_ms / 1000
+        self.max_query_batch = max_query_batch
+        # How often VectorStore looks for writes made by other pods
+        self.refresh_interval = refresh_interval
+        self.requests = 0
+        self.retried = 0
+        self.failed = 0
+        self.queries = 0
+        self.query_requests = 0
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="chroma-client", daemon=True).start()
+        settings = Settings(
+            anonymized_telemetry=False,
+            chroma_http_max_connections=max_connections,
+            chroma_http_max_keepalive_connections=max_connections
+        )
+        headers = {"x-chroma-token": token} if token else None
+        try:
+            self._client = self.call(
+                lambda _: chromadb.AsyncHttpClient(
+                    host=self.host, port=self.port, ssl=self.ssl, headers=headers, settings=settings
+                )
+            )
+        except Exception as e:
+            logger.error(f"Failed to connect to Chroma server at {url}: {e}")
+            self.close()
+            raise
+        logger.info(f"Connected to Chroma server at {url}")
+
+    def call(self, make: Callable[[int], Awaitable[Any]], retry: bool = True) -> Any:
+        """Run ``make(attempt)`` on the client loop with timeout and retries; blocks until done"""
+        return asyncio.run_coroutine_threadsafe(self._attempt(make, retry), self._loop).result()
+
+    async def _attempt(self, make: Callable[[int], Awaitable[Any]], retry: bool) -> Any:
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                return await asyncio.wait_for(make(attempt), self.timeout)
+            except Exception as e:
+                if not retry or attempt >= self.retries or not _transient(e):
+                    self.failed += 1
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                attempt += 1
+                self.retried += 1
+                logger.warning(f"Chroma request failed ({e!r}); retry {attempt}/{self.retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    def get_collection(self, name: str) -> "RemoteCollection":
+        return RemoteCollection(self, self.call(lambda _: self._client.get_collection(name)))
+
+    def create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> "RemoteCollection":
+        # Not retried: a lost response would make the retry fail as a duplicate
+        return RemoteCollection(
+            self, self.call(lambda _: self._client.create_collection(name, metadata=metadata), retry=False)
+        )
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> "RemoteCollection":
+        return RemoteCollection(
+            self, self.call(lambda _: self._client.get_or_create_collection(name, metadata=metadata))
+        )
+
+    def delete_collection(self, name: str):
+        self.call(lambda _: self._client.delete_collection(name))
+
+    def heartbeat(self) -> int:
+        return self.call(lambda _: self._client.heartbeat())
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "requests": self.requests,
+            "retried": self.retried,
+            "failed": self.failed,
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.query_requests, 2) if self.query_requests else None
+        }
+
+class RemoteCollection:
+    """Synchronous stand-in for a Chroma collection on the server"""
+
+    def __init__(self, client: RemoteChromaClient, collection):
+        self._client = client
+        self._collection = collection
+        # Queries waiting to be sent together, by their parameters; only
+        # touched on the client loop
+        self._pending: Dict[Tuple, List[Tuple[List[Any], asyncio.Future]]] = {}
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    @property
+    def metadata(self) -> Optional[Dict[str, Any]]:
+        return self._collection.metadata
+
+    def count(self) -> int:
+        return self._client.call(lambda _: self._collection.count())
+
+    def add(self, **kwargs):
+        # A retry may follow an attempt that was applied but whose response
+        # was lost, so it upserts the same rows instead
+        self._client.call(
+            lambda attempt: (self._collection.add if attempt == 0 else self._collection.upsert)(**kwargs)
+        )
+
+    def upsert(self, **kwargs):
+        self._client.call(lambda _: self._collection.upsert(**kwargs))
+
+    def get(self, **kwargs) -> Dict[str, Any]:
+        return self._client.call(lambda _: self._collection.get(**kwargs))
+
+    def delete(self, **kwargs):
+        self._client.call(lambda _: self._collection.delete(**kwargs))
+
+    def modify(self, **kwargs):
+        self._client.call(lambda _: self._collection.modify(**kwargs), retry=False)
+
+    def query(
+        self,
+        query_embeddings: List[Any],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        include = list(include or ["metadatas", "documents", "distances"])
+        return asyncio.run_coroutine_threadsafe(
+            self._queue_query(list(query_embeddings), n_results, where, include),
+            self._client._loop
+        ).result()
+
+    async def _queue_query(self, embeddings: List[Any], n_results: int, where, include: List[str]) -> Dict[str, Any]:
+        client = self._client
+        client.queries += len(embeddings)
+        key = (n_results, json.dumps(where, sort_keys=True, default=str), tuple(include))
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((embeddings, future))
+        if len(batch) == 1:
+            asyncio.get_running_loop().call_later(client.query_batch_wait, self._flush, key, batch)
+        if sum(len(queued) for queued, _ in batch) >= client.max_query_batch:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key: Tuple, batch: List[Tuple[List[Any], asyncio.Future]]):
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        asyncio.ensure_future(self._send(key, batch))
+
+    async def _send(self, key: Tuple, batch: List[Tuple[List[Any], asyncio.Future]]):
+        n_results, where, include = key[0], json.loads(key[1]), list(key[2])
+        embeddings = [embedding for queued, _ in batch for embedding in queued]
+        self._client.query_requests += 1
+        try:
+            result = await self._client._attempt(
+                lambda _: self._collection.query(
+                    query_embeddings=embeddings, n_results=n_results, where=where, include=include
+                ),
+                retry=True
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        start = 0
+        for queued, future in batch:
+            end = start + len(queued)
+            if not future.done():
+                future.set_result({
+                    field: value[start:end] if field in QUERY_FIELDS and value is not None else value
+                    for field, value in result.items()
+                })
+            start = end
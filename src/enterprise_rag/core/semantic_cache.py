@@ -0,0 +1,137 @@
+from typing import List, Dict, Any, Hashable, Optional
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """Caches retrieval results by query embedding.
+
+    Recent query embeddings are kept, unit-normalized, in a fixed-size
+    matrix used as a ring buffer; a lookup is one matrix-vector product
+    over at most ``capacity`` rows, so it costs far less than a search of
+    the store. A hit needs cosine similarity of at least ``threshold`` with
+    an entry retrieved for at least as many results as requested and with
+    the same ``variant`` (retrieval options other than ``top_k``). Exact
+    repeats of a normalized query string are answered before embedding.
+    The whole cache is dropped whenever the store's version changes.
+    """
+
+    def __init__(self, capacity: int = 1024, threshold: float = 0.95):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._top_k = np.zeros(capacity, dtype=np.int32)
+        self._variant = np.zeros(capacity, dtype=np.int32)
+        self._variant_codes: Dict[Hashable, int] = {}
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * capacity
+        self._queries: List[Optional[tuple]] = [None] * capacity
+        self._by_query: Dict[str, int] = {}
+        self._size = 0
+        self._next = 0
+        self._version: Optional[int] = None
+
+    def get_exact(
+        self,
+        query: str,
+        top_k: int,
+        version: int,
+        variant: Hashable = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Results cached for this exact normalized query string, if any"""
+        with self._lock:
+            self._check_version(version)
+            slot = self._by_query.get((query, variant))
+            if slot is None or self._top_k[slot] < top_k:
+                return None
+            self.exact_hits += 1
+            return self._results[slot][:top_k]
+
+    def get(
+        self,
+        embedding: np.ndarray,
+        top_k: int,
+        version: int,
+        variant: Hashable = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Results of the most similar cached query above the threshold"""
+        with self._lock:
+            self._check_version(version)
+            code = self._variant_codes.get(variant)
+            if self._size == 0 or code is None:
+                self.misses += 1
+                return None
+            query = self._normalize(embedding)
+            similarities = self._matrix[:self._size] @ query
+            unusable = (self._top_k[:self._size] < top_k) | (self._variant[:self._size] != code)
+            similarities[unusable] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._results[best][:top_k]
+
+    def put(
+        self,
+        query: str,
+        embedding: np.ndarray,
+        top_k: int,
+        results: List[Dict[str, Any]],
+        version: int,
+        variant: Hashable = None
+    ):
+        with self._lock:
+            self._check_version(version)
+            vector = self._normalize(embedding)
+            if self._matrix is None:
+                self._matrix = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+
+            slot = self._next
+            evicted = self._queries[slot]
+            if evicted is not None and self._by_query.get(evicted) == slot:
+                del self._by_query[evicted]
+            key = (query, variant)
+            self._matrix[slot] = vector
+            self._top_k[slot] = top_k
+            self._variant[slot] = self._variant_codes.setdefault(variant, len(self._variant_codes))
+            self._results[slot] = results
+            self._queries[slot] = key
+            self._by_query[key] = slot
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.exact_hits + self.misses
+        return {
+            "entries": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.exact_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    def _check_version(self, version: int):
+        if version != self._version:
+            if self._size:
+                logger.info(f"Store changed to version {version}, dropping {self._size} cached queries")
+            self._results = [None] * self.capacity
+            self._queries = [None] * self.capacity
+            self._by_query = {}
+            self._variant_codes = {}
+            self._size = 0
+            self._next = 0
+            self._version = version
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
@@ -0,0 +1,86 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import logging
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    __slots__ = ("task", "scope", "waiters")
+
+    def __init__(self, task: asyncio.Task, scope: Deadline):
+        self.task = task
+        self.scope = scope
+        self.waiters = 0
+
+class SingleFlight:
+    """Shares one in-flight computation between concurrent identical calls.
+
+    The first caller for a key starts the work as its own task; callers
+    that arrive while it runs await the same task instead of repeating it.
+    The key is forgotten as soon as the task finishes, so this coalesces
+    concurrent requests only and never serves stale results. Each caller
+    awaits through ``asyncio.shield`` so one disconnecting client does not
+    cancel the work for the others.
+
+    The work receives a ``Deadline`` scope that lasts as long as its latest
+    caller's deadline. A caller stops waiting at its own deadline; when the
+    last caller has gone, the scope is cancelled so the work stops at its
+    next checkpoint.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        work: Callable[[Deadline], Awaitable[Any]],
+        deadline: Optional[Deadline] = None
+    ) -> Any:
+        flight = self._in_flight.get(key)
+        if flight is None:
+            scope = Deadline()
+            if deadline is not None:
+                scope.expires_at, scope.cutoff = deadline.expires_at, deadline.cutoff
+            flight = _Flight(asyncio.ensure_future(work(scope)), scope)
+            self._in_flight[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight, task))
+            self.executed += 1
+        else:
+            flight.scope.extend(deadline)
+            self.coalesced += 1
+            logger.debug(f"Coalesced request onto in-flight computation for {key!r}")
+
+        flight.waiters += 1
+        try:
+            timeout = deadline.remaining() if deadline is not None else None
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                # Nobody wants the result any more; later callers start afresh
+                flight.scope.cancel("abandoned by every caller")
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+                self.abandoned += 1
+
+    def _finished(self, key: Hashable, flight: _Flight, task: asyncio.Task):
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None and not flight.waiters:
+            # Retrieved here so abandoned work does not log as unhandled
+            logger.debug(f"Abandoned computation for {key!r} ended with {task.exception()!r}")
+
+    def stats(self) -> Dict[str, int]:
+        total = self.executed + self.coalesced
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
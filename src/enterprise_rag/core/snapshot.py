@@ -0,0 +1,352 @@
+"""Versioned, checksummed single-file snapshots of the vector store.
+
+Layout::
+
+    MAGIC | sections ... | header JSON | u64 header offset | u32 header length | MAGIC
+
+Sections are 64-byte aligned and each carries a CRC32 in the header:
+
+- ``vectors``            count x dimension, float32 or float16, row-major
+- ``sq_norms``           float32 squared L2 norm of every stored vector
+- ``<column>.offsets``   int64, count + 1 entries, for ids, texts, metadatas
+- ``<column>.blob``      UTF-8 bytes of that column (metadata as JSON)
+
+The header sits at the end so the file is written in one streaming pass;
+readers find it through the fixed-size footer and memory-map the sections.
+
+    python -m enterprise_rag.core.snapshot export data/snapshots/latest.snap
+    python -m enterprise_rag.core.snapshot import data/snapshots/latest.snap
+    python -m enterprise_rag.core.snapshot install data/snapshots/latest.snap data/shared_index
+    python -m enterprise_rag.core.snapshot verify data/snapshots/latest.snap
+"""
+from typing import Dict, Any, List, Optional, BinaryIO
+from pathlib import Path
+import argparse
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zlib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ERAGSNAP"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+STRING_COLUMNS = ("ids", "texts", "metadatas")
+_FOOTER = struct.Struct("<QI")
+_COPY_BLOCK = 1024 * 1024
+# Ids listed per page while the write lock is held
+ID_SCAN_BATCH = 10000
+
+class SnapshotError(Exception):
+    """Raised when a snapshot file is malformed or fails verification"""
+
+class Snapshot:
+    """A snapshot file opened read-only with every section memory-mapped"""
+
+    def __init__(self, path: Path, verify: bool = False):
+        self.path = Path(path)
+        self.header = self._read_header(self.path)
+        self.count = int(self.header["count"])
+        self.dimension = self.header.get("dimension")
+
+        if verify:
+            self.verify()
+
+        if self.count:
+            self.vectors = self._map("vectors", np.dtype(self.header["dtype"]), (self.count, self.dimension))
+            self.sq_norms = self._map("sq_norms", np.float32, (self.count,))
+            self.columns = {
+                name: StringColumn(
+                    self._map(f"{name}.blob", np.uint8, None),
+                    self._map(f"{name}.offsets", np.int64, (self.count + 1,))
+                )
+                for name in STRING_COLUMNS
+            }
+
+    def verify(self):
+        """Recompute every section's CRC32 and compare with the header"""
+        with self.path.open("rb") as f:
+            for name, section in self.header["sections"].items():
+                f.seek(section["offset"])
+                crc, remaining = 0, section["length"]
+                while remaining:
+                    block = f.read(min(_COPY_BLOCK, remaining))
+                    if not block:
+                        raise SnapshotError(f"Section {name} is truncated")
+                    crc = zlib.crc32(block, crc)
+                    remaining -= len(block)
+                if crc != section["crc32"]:
+                    raise SnapshotError(f"Checksum mismatch in section {name}")
+
+    def iter_rows(self, batch_size: int = 1000):
+        """Yield dict pages shaped like VectorStore.iter_batches output"""
+        for start in range(0, self.count, batch_size):
+            end = min(start + batch_size, self.count)
+            yield {
+                "ids": [self.columns["ids"][i] for i in range(start, end)],
+                "embeddings": np.asarray(self.vectors[start:end], dtype=np.float32),
+                "documents": [self.columns["texts"][i] for i in range(start, end)],
+                "metadatas": [json.loads(self.columns["metadatas"][i]) for i in range(start, end)]
+            }
+
+    def _map(self, name: str, dtype, shape) -> np.ndarray:
+        section = self.header["sections"][name]
+        if section["length"] == 0:
+            return np.zeros(shape or 0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=section["offset"], shape=shape)
+
+    @staticmethod
+    def _read_header(path: Path) -> Dict[str, Any]:
+        size = path.stat().st_size
+        tail = len(MAGIC) + _FOOTER.size
+        with path.open("rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise SnapshotError(f"{path} is not a snapshot file")
+            f.seek(size - tail)
+            header_offset, header_length = _FOOTER.unpack(f.read(_FOOTER.size))
+            if f.read(len(MAGIC)) != MAGIC:
+                raise SnapshotError(f"{path} is truncated")
+            f.seek(header_offset)
+            header = json.loads(f.read(header_length))
+        if header.get("format_version") != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format {header.get('format_version')}")
+        return header
+
+class StringColumn:
+    """Read-only view over a memory-mapped UTF-8 blob split by offsets"""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self._offsets[i], self._offsets[i + 1]
+        return self._blob[start:end].tobytes().decode("utf-8")
+
+class _SectionWriter:
+    """Appends an aligned section to the snapshot and tracks its checksum"""
+
+    def __init__(self, f: BinaryIO, sections: Dict[str, Dict[str, int]], name: str):
+        self.f = f
+        self.sections = sections
+        self.name = name
+        self.crc = 0
+        self.length = 0
+
+    def __enter__(self):
+        position = self.f.tell()
+        self.f.write(b"\0" * (-position % ALIGNMENT))
+        self.offset = self.f.tell()
+        return self
+
+    def write(self, data: bytes):
+        self.f.write(data)
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+
+    def copy_from(self, source: BinaryIO):
+        source.seek(0)
+        for block in iter(lambda: source.read(_COPY_BLOCK), b""):
+            self.write(block)
+
+    def __exit__(self, *exc):
+        self.sections[self.name] = {"offset": self.offset, "length": self.length, "crc32": self.crc}
+        return False
+
+def export_snapshot(store, path: str, dtype: str = "float32", texts: bool = True) -> Dict[str, Any]:
+    """Write the store to a snapshot file while it keeps serving searches.
+
+    The chunk ids are listed under the store's write lock and then read
+    without it, so writes are blocked only for the id scan, not for the
+    whole export. The snapshot holds the chunks stored when it started,
+    minus any deleted while it ran. The file is written
+    next to its destination and renamed into place when complete. Memory
+    use is bounded by one page of the store plus the spooled string columns
+    on disk. With ``texts=False`` the text column is left empty, for
+    snapshots whose readers get text from the store's text store.
+    """
+    if dtype not in ("float32", "float16"):
+        raise ValueError("dtype must be float32 or float16")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    with store.write_lock:
+        version = store.version
+        stats = store.get_stats()
+        ids = [
+            chunk_id
+            for page in store.iter_batches(include=[], batch_size=ID_SCAN_BATCH)
+            for chunk_id in page["ids"]
+        ]
+
+    # Rows are read without the lock; chunks deleted meanwhile are skipped
+    dimension = stats.get("dimension")
+    source_counts: Dict[str, int] = {}
+    sections: Dict[str, Dict[str, int]] = {}
+    count = 0
+
+    with tempfile.TemporaryDirectory(dir=path.parent) as spool_dir:
+        spool = {
+            name: (
+                open(os.path.join(spool_dir, f"{name}.blob"), "w+b"),
+                open(os.path.join(spool_dir, f"{name}.offsets"), "w+b")
+            )
+            for name in STRING_COLUMNS
+        }
+        norms_spool = open(os.path.join(spool_dir, "sq_norms"), "w+b")
+        positions = {name: 0 for name in STRING_COLUMNS}
+        for _, offsets in spool.values():
+            offsets.write(np.zeros(1, dtype=np.int64).tobytes())
+
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                f.write(MAGIC)
+
+                # Vectors stream straight into the file; the other
+                # columns are spooled and appended afterwards
+                with _SectionWriter(f, sections, "vectors") as vectors_section:
+                    include = ["embeddings", "documents", "metadatas"] if texts else ["embeddings", "metadatas"]
+                    for page in store.iter_batches(include=include, ids=ids):
+                        vectors = np.asarray(page["embeddings"], dtype=dtype)
+                        vectors_section.write(vectors.tobytes())
+                        as_float = vectors.astype(np.float32)
+                        norms_spool.write(np.einsum("ij,ij->i", as_float, as_float).tobytes())
+                        count += len(page["ids"])
+
+                        values = {
+                            "ids": page["ids"],
+                            "texts": page["documents"] if texts else [None] * len(page["ids"]),
+                            "metadatas": [json.dumps(m or {}) for m in page["metadatas"]]
+                        }
+                        for name in STRING_COLUMNS:
+                            blob, offsets = spool[name]
+                            ends = []
+                            for value in values[name]:
+                                encoded = (value or "").encode("utf-8")
+                                blob.write(encoded)
+                                positions[name] += len(encoded)
+                                ends.append(positions[name])
+                            offsets.write(np.asarray(ends, dtype=np.int64).tobytes())
+                        for metadata in page["metadatas"]:
+                            source = (metadata or {}).get("source", "unknown")
+                            source_counts[source] = source_counts.get(source, 0) + 1
+
+                with _SectionWriter(f, sections, "sq_norms") as section:
+                    section.copy_from(norms_spool)
+                for name in STRING_COLUMNS:
+                    blob, offsets = spool[name]
+                    with _SectionWriter(f, sections, f"{name}.offsets") as section:
+                        section.copy_from(offsets)
+                    with _SectionWriter(f, sections, f"{name}.blob") as section:
+                        section.copy_from(blob)
+
+                header = {
+                    "format_version": FORMAT_VERSION,
+                    "collection": stats.get("collection"),
+                    "store_version": version,
+                    "count": count,
+                    "dimension": dimension,
+                    "dtype": dtype,
+                    "metric": "l2",
+                    "chunks_per_source": source_counts,
+                    "created_at": time.time(),
+                    "sections": sections
+                }
+                header_bytes = json.dumps(header).encode("utf-8")
+                header_offset = f.tell()
+                f.write(header_bytes)
+                f.write(_FOOTER.pack(header_offset, len(header_bytes)))
+                f.write(MAGIC)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            for blob, offsets in spool.values():
+                blob.close()
+                offsets.close()
+            norms_spool.close()
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    size = path.stat().st_size
+    elapsed = time.perf_counter() - start
+    logger.info(f"Exported {count} chunks to {path} ({size} bytes, {dtype}) in {elapsed:.2f}s")
+    return {"path": str(path), "chunks": count, "bytes": size, "dtype": dtype, "seconds": elapsed}
+
+def import_snapshot(store, path: str, verify: bool = True, batch_size: int = 1000) -> int:
+    """Replace the store's contents with a snapshot, keeping chunk IDs"""
+    snapshot = Snapshot(path, verify=verify)
+    with store.write_lock:
+        store.clear()
+        for page in snapshot.iter_rows(batch_size):
+            store.add_documents(
+                [{"text": t, "metadata": m} for t, m in zip(page["documents"], page["metadatas"])],
+                page["embeddings"],
+                ids=page["ids"]
+            )
+    logger.info(f"Imported {snapshot.count} chunks from {path}")
+    return snapshot.count
+
+def install_snapshot(path: str, index_directory: str, pointer_file: str = "CURRENT") -> Path:
+    """Copy a snapshot into a shared index directory and make it current"""
+    Snapshot(path, verify=True)
+    index_directory = Path(index_directory)
+    index_directory.mkdir(parents=True, exist_ok=True)
+    target = index_directory / Path(path).name
+    tmp = index_directory / f".{target.name}.tmp"
+    shutil.copyfile(path, tmp)
+    os.replace(tmp, target)
+    pointer_tmp = index_directory / f".{pointer_file}.tmp"
+    pointer_tmp.write_text(target.name)
+    os.replace(pointer_tmp, index_directory / pointer_file)
+    logger.info(f"Installed snapshot {target}")
+    return target
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export, import and inspect vector store snapshots")
+    parser.add_argument("--collection", default="radiation_docs")
+    parser.add_argument("--persist-directory", default="data/vector_store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("--dtype", choices=("float32", "float16"), default="float32")
+    import_cmd = commands.add_parser("import")
+    import_cmd.add_argument("path")
+    install_cmd = commands.add_parser("install")
+    install_cmd.add_argument("path")
+    install_cmd.add_argument("index_directory")
+    verify_cmd = commands.add_parser("verify")
+    verify_cmd.add_argument("path")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command in ("verify", "install"):
+        if args.command == "install":
+            install_snapshot(args.path, args.index_directory)
+        snapshot = Snapshot(args.path, verify=True)
+        header = {k: v for k, v in snapshot.header.items() if k != "sections"}
+        print(json.dumps(header, indent=2))
+        return
+
+    from .vector_store import VectorStore
+    store = VectorStore(args.collection, args.persist_directory)
+    if args.command == "export":
+        print(json.dumps(export_snapshot(store, args.path, dtype=args.dtype), indent=2))
+    else:
+        print(json.dumps({"chunks": import_snapshot(store, args.path)}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+import json
+import logging
+import sqlite3
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used instead
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+class TextStore:
+    """Compressed chunk text kept outside the vector index.
+
+    Texts written together are packed into blocks of up to ``block_size``
+    raw bytes and each block is compressed as a unit (zstd when the
+    ``zstandard`` package is installed, zlib otherwise), which compresses
+    far better than chunk by chunk. A small LRU of decompressed blocks
+    serves neighbouring lookups. Only final results are looked up, so a
+    search decompresses a handful of blocks at most. A block is dropped
+    once all its chunks are deleted; ``repack`` rewrites the live texts of
+    blocks that deletes have left mostly dead.
+    """
+
+    def __init__(self, path: str, block_size: int = 64 * 1024, level: int = 3, cache_blocks: int = 64):
+        self.path = Path(path)
+        self.block_size = block_size
+        self.level = level
+        self.cache_blocks = cache_blocks
+        self.codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+        self._cache: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS blocks (
+                    block_id INTEGER PRIMARY KEY AUTOINCREMENT, codec INTEGER, raw_size INTEGER, data BLOB,
+                    chunk_count INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY, block_id INTEGER, position INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS chunks_block ON chunks (block_id);
+            """)
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(blocks)")]
+            if "chunk_count" not in columns:
+                # Stores from before repacking; counted from the block when needed
+                self._conn.execute("ALTER TABLE blocks ADD COLUMN chunk_count INTEGER")
+        logger.info(f"Text store opened at {self.path} ({'zstd' if self.codec == CODEC_ZSTD else 'zlib'})")
+
+    def put(self, ids: List[str], texts: List[str]):
+        """Store texts, packing them into compressed blocks"""
+        with self._lock, self._conn:
+            self._pack(ids, texts)
+
+    def get(self, ids: List[str]) -> Dict[str, str]:
+        """Texts of the given chunks; ids not in the store are left out"""
+        found: Dict[str, str] = {}
+        with self._lock:
+            locations = []
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                locations.extend(self._conn.execute(
+                    f"SELECT chunk_id, block_id, position FROM chunks WHERE chunk_id IN ({marks})",
+                    batch
+                ).fetchall())
+            for chunk_id, block_id, position in locations:
+                found[chunk_id] = self._read_block(block_id)[position]
+        return found
+
+    def contains(self, ids: List[str]) -> set:
+        """The subset of ids whose text is in the store"""
+        present = set()
+        with self._lock:
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                present.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({marks})", batch
+                ))
+        return present
+
+    def fill(self, ids: List[str], documents: Optional[List[Optional[str]]]) -> List[Optional[str]]:
+        """Complete a document list from the store where the index has no text"""
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        missing = [chunk_id for chunk_id, text in zip(ids, documents) if text is None]
+        if missing:
+            texts = self.get(missing)
+            documents = [
+                texts.get(chunk_id) if text is None else text
+                for chunk_id, text in zip(ids, documents)
+            ]
+        return documents
+
+    def delete(self, ids: List[str]):
+        """Forget chunks and drop blocks that no longer hold any"""
+        with self._lock, self._conn:
+            for batch in self._batches(ids):
+                marks = ",".join("?" * len(batch))
+                blocks = [row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT block_id FROM chunks WHERE chunk_id IN ({marks})", batch
+                )]
+                self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({marks})", batch)
+                for block_id in blocks:
+                    alive = self._conn.execute(
+                        "SELECT 1 FROM chunks WHERE block_id = ? LIMIT 1", (block_id,)
+                    ).fetchone()
+                    if alive is None:
+                        self._conn.execute("DELETE FROM blocks WHERE block_id = ?", (block_id,))
+                        self._cache.pop(block_id, None)
+
+    def repack(self, min_live_fraction: float = 0.5, batch_blocks: int = 64) -> int:
+        """Rewrite blocks with fewer than ``min_live_fraction`` of their chunks live.
+
+        Their live texts are packed into new blocks and the old blocks
+        dropped, ``batch_blocks`` at a time so lookups are not held up for
+        the whole pass. Returns the number of blocks rewritten.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT b.block_id, b.chunk_count, COUNT(*) FROM blocks b "
+                "JOIN chunks c ON c.block_id = b.block_id GROUP BY b.block_id"
+            ).fetchall()
+            sparse = [
+                block_id for block_id, total, live in rows
+                if live < min_live_fraction * (total if total is not None else len(self._read_block(block_id)))
+            ]
+
+        for start in range(0, len(sparse), batch_blocks):
+            with self._lock, self._conn:
+                ids, texts = [], []
+                for block_id in sparse[start:start + batch_blocks]:
+                    live = self._conn.execute(
+                        "SELECT chunk_id, position FROM chunks WHERE block_id = ?", (block_id,)
+                    ).fetchall()
+                    if not live:
+                        # Emptied by a delete since the scan, which dropped it
+                        continue
+                    block = self._read_block(block_id)
+                    for chunk_id, position in live:
+                        ids.append(chunk_id)
+                        texts.append(block[position])
+                    self._conn.execute("DELETE FROM blocks WHERE block_id = ?", (block_id,))
+                    self._cache.pop(block_id, None)
+                self._pack(ids, texts)
+        if sparse:
+            logger.info(f"Repacked {len(sparse)} sparse text blocks")
+        return len(sparse)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM blocks")
+            self._cache.clear()
+
+    def vacuum(self):
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            blocks, raw, stored, slots = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(LENGTH(data)), 0), "
+                "SUM(chunk_count) FROM blocks"
+            ).fetchone()
+        return {
+            "chunks": chunks,
+            # Deleted chunks whose blocks are still stored (None for older stores)
+            "dead_chunks": slots - chunks if slots is not None else None,
+            "blocks": blocks,
+            "raw_bytes": raw,
+            "compressed_bytes": stored,
+            "codec": "zstd" if self.codec == CODEC_ZSTD else "zlib"
+        }
+
+    def _pack(self, ids: List[str], texts: List[str]):
+        block_ids, block_texts, size = [], [], 0
+        for chunk_id, text in zip(ids, texts):
+            text = text or ""
+            if block_texts and size + len(text) > self.block_size:
+                self._write_block(block_ids, block_texts)
+                block_ids, block_texts, size = [], [], 0
+            block_ids.append(chunk_id)
+            block_texts.append(text)
+            size += len(text)
+        if block_texts:
+            self._write_block(block_ids, block_texts)
+
+    def _write_block(self, ids: List[str], texts: List[str]):
+        raw = json.dumps(texts).encode("utf-8")
+        cursor = self._conn.execute(
+            "INSERT INTO blocks (codec, raw_size, data, chunk_count) VALUES (?, ?, ?, ?)",
+            (self.codec, len(raw), self._compress(raw), len(texts))
+        )
+        block_id = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)",
+            [(chunk_id, block_id, position) for position, chunk_id in enumerate(ids)]
+        )
+
+    def _read_block(self, block_id: int) -> List[str]:
+        texts = self._cache.get(block_id)
+        if texts is not None:
+            self._cache.move_to_end(block_id)
+            return texts
+        codec, data = self._conn.execute(
+            "SELECT codec, data FROM blocks WHERE block_id = ?", (block_id,)
+        ).fetchone()
+        texts = json.loads(self._decompress(codec, data))
+        self._cache[block_id] = texts
+        if len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
+        return texts
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return zlib.compress(raw, min(self.level * 2, 9))
+
+    @staticmethod
+    def _decompress(codec: int, data: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise RuntimeError("Text store holds zstd blocks but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    @staticmethod
+    def _batches(values: List[str], size: int = 500):
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(values), size):
+            yield values[start:start + size]
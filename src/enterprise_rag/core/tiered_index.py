@@ -0,0 +1,595 @@
+from typing import List, Dict, Any, Optional, Tuple
+from pathlib import Path
+import json
+import logging
+import threading
+import time
+import numpy as np
+from .ivf import IVFIndex
+from .mmap_index import MmapIndex
+from .snapshot import export_snapshot
+from .tracing import stage
+
+logger = logging.getLogger(__name__)
+
+COLD_PREFIX = "cold-"
+COLD_SUFFIX = ".snap"
+IVF_SUFFIX = ".ivf"
+
+def _ivf_path(path: Path) -> Path:
+    return path.with_suffix(IVF_SUFFIX)
+
+class _ColdTier:
+    """A cold snapshot and the rows searches skip in it.
+
+    ``deleted`` rows were removed from the store after the snapshot was
+    written; ``excluded`` adds the rows of documents currently served by
+    the hot tier. Both arrays are replaced, never changed in place, so a
+    search always sees a consistent pair. Snapshots of at least
+    ``ivf_min_rows`` rows get an IVF index, kept next to the file, so
+    searches read only the rows of the clusters nearest the query.
+    """
+
+    def __init__(self, index: MmapIndex, rows_by_source: Dict[str, np.ndarray], ivf: Optional[IVFIndex] = None):
+        self.index = index
+        self.rows_by_source = rows_by_source
+        self.ivf = ivf
+        self.deleted = np.zeros(index.count, dtype=bool)
+        self.excluded = self.deleted
+
+    @classmethod
+    def open(cls, path: Path, ivf_min_rows: int = 10000) -> "_ColdTier":
+        index = MmapIndex(path)
+        rows: Dict[str, List[int]] = {}
+        for i in range(index.count):
+            source = json.loads(index.columns["metadatas"][i]).get("source", "unknown")
+            rows.setdefault(source, []).append(i)
+        ivf = None
+        if index.count >= ivf_min_rows:
+            try:
+                ivf = IVFIndex.load(_ivf_path(path))
+                if ivf.offsets[-1] != index.count:
+                    raise ValueError("row count does not match the snapshot")
+            except (OSError, ValueError, KeyError) as e:
+                logger.info(f"Training IVF index for {path.name} ({e})")
+                ivf = IVFIndex.train(index.vectors)
+                ivf.save(_ivf_path(path))
+        return cls(index, {source: np.asarray(r, dtype=np.int64) for source, r in rows.items()}, ivf)
+
+    def live_rows(self, source: str) -> np.ndarray:
+        rows = self.rows_by_source.get(source)
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        return rows[~self.deleted[rows]]
+
+    def set_excluded(self, source: str, excluded: bool):
+        rows = self.rows_by_source.get(source)
+        if rows is None:
+            return
+        mask = self.excluded.copy()
+        mask[rows] = True if excluded else self.deleted[rows]
+        self.excluded = mask
+
+    def delete(self, ids: List[str], sources: List[str]):
+        wanted = set(ids)
+        deleted, excluded = self.deleted.copy(), self.excluded.copy()
+        for source in set(sources):
+            for row in self.rows_by_source.get(source, ()):
+                if self.index.columns["ids"][row] in wanted:
+                    deleted[row] = excluded[row] = True
+        self.deleted, self.excluded = deleted, excluded
+
+class TieredIndex:
+    """Hot/cold tiers serving searches for a VectorStore.
+
+    The hot tier holds whole documents in RAM: everything uploaded since
+    the cold tier was written, plus documents hit often enough to be
+    promoted; it is searched exactly. The cold tier is a snapshot of the
+    whole store, memory-mapped, with hot and deleted rows masked out. Large
+    cold tiers are searched through an IVF index that reads the rows of
+    the ``nprobe`` clusters nearest the query, so only those pages become
+    resident and the corpus can exceed RAM. When the store's document
+    centroid pass is on, cold searches read the candidate documents' rows
+    instead. A search ranks both tiers by squared L2 distance, the
+    collection's default metric, and merges their top-k.
+
+    Every document carries a hit score that decays with ``half_life``.
+    ``maintain`` (run by a background thread) promotes cold documents whose
+    score reaches ``promote_hits`` and demotes the lowest-scoring hot ones
+    while the hot tier is over ``hot_max_chunks``. A document can only be
+    demoted once the cold snapshot holds all of its chunks, so a full hot
+    tier triggers a rewrite of the snapshot, at most every
+    ``min_rebuild_interval`` seconds; heavy deletion does too. The new
+    snapshot and its IVF index are written without the write lock; chunks
+    deleted meanwhile are masked in it before it replaces the old one.
+
+    Moving documents between tiers changes results only within the IVF
+    approximation, so the store's version (and the caches keyed on it) are
+    left alone. Mutations run under the store's write lock; searches take
+    no lock.
+    """
+
+    def __init__(
+        self,
+        store,
+        directory: str,
+        hot_max_chunks: int = 50000,
+        promote_hits: float = 3.0,
+        half_life: float = 3600.0,
+        interval: float = 5.0,
+        min_rebuild_interval: float = 300.0,
+        rebuild_deleted_ratio: float = 0.2,
+        dtype: str = "float32",
+        nprobe: int = 16,
+        ivf_min_rows: int = 10000
+    ):
+        self.store = store
+        self.directory = Path(directory)
+        self.hot_max_chunks = hot_max_chunks
+        self.promote_hits = promote_hits
+        self.half_life = half_life
+        self.interval = interval
+        self.min_rebuild_interval = min_rebuild_interval
+        self.rebuild_deleted_ratio = rebuild_deleted_ratio
+        self.dtype = dtype
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+
+        # Hot rows live in over-allocated arrays so appends rarely copy;
+        # searches read the published view tuple
+        self._hot_vectors: Optional[np.ndarray] = None
+        self._hot_norms: Optional[np.ndarray] = None
+        self._hot_ids: List[str] = []
+        self._hot_metadatas: List[Dict[str, Any]] = []
+        self._hot_count = 0
+        self._hot_rows: Dict[str, List[int]] = {}
+        self._hot_view: Tuple = (None, None, [], [], 0)
+
+        self._cold: Optional[_ColdTier] = None
+        self._cold_path: Optional[Path] = None
+        self._rebuilt_at = 0.0
+        # Deletions made while a rebuild runs, replayed onto its snapshot
+        self._removed_during_rebuild: Optional[Tuple[List[str], List[str]]] = None
+        # Bumped by reset, so a rebuild started before it is discarded
+        self._generation = 0
+
+        self._scores: Dict[str, float] = {}
+        self._hits_lock = threading.Lock()
+        self._decayed_at = time.monotonic()
+        self.hot_hits = 0
+        self.cold_hits = 0
+        self.promotions = 0
+        self.demotions = 0
+        self.rebuilds = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load_cold()
+
+    def ready(self) -> bool:
+        """Whether the tiers together hold the whole store"""
+        if self._cold is not None:
+            return True
+        return self._hot_count == self.store.count()
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        include_embeddings: bool = False,
+        sources: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Merged top-k of both tiers, shaped like a Chroma query result.
+
+        ``sources`` restricts the cold tier to those documents' rows.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = float(query @ query)
+        candidates = []
+
+        with stage("hot"):
+            vectors, norms, ids, metadatas, count = self._hot_view
+            if count:
+                distances = norms[:count] - 2.0 * (vectors[:count] @ query) + query_norm
+                k = min(top_k, count)
+                for i in np.argpartition(distances, k - 1)[:k]:
+                    candidates.append((float(distances[i]), ids[i], metadatas[i], vectors[i], True))
+
+        with stage("cold"):
+            cold = self._cold
+            if cold is not None and cold.index.count:
+                index, excluded = cold.index, cold.excluded
+                if sources is not None:
+                    groups = [cold.rows_by_source[s] for s in sources if s in cold.rows_by_source]
+                    rows = np.concatenate(groups) if groups else np.empty(0, dtype=np.int64)
+                    positions, scores = self._scan(index, np.sort(rows[~excluded[rows]]), query, query_norm, top_k)
+                elif cold.ivf is not None:
+                    nprobe = self.nprobe
+                    while True:
+                        rows = cold.ivf.probe(query, nprobe)
+                        rows = rows[~excluded[rows]]
+                        # Widen the probe when masking left too few rows
+                        if len(rows) >= top_k or nprobe >= cold.ivf.nlist:
+                            break
+                        nprobe *= 2
+                    positions, scores = self._scan(index, rows, query, query_norm, top_k)
+                else:
+                    positions, scores = index.nearest(query, top_k, excluded=excluded)
+                for position, score in zip(positions, scores):
+                    candidates.append((
+                        score,
+                        index.columns["ids"][position],
+                        json.loads(index.columns["metadatas"][position]),
+                        index.vectors[position],
+                        False
+                    ))
+
+        # A document moving between tiers can briefly be visible in both
+        candidates.sort(key=lambda candidate: candidate[0])
+        seen, merged = set(), []
+        for candidate in candidates:
+            if candidate[1] not in seen:
+                seen.add(candidate[1])
+                merged.append(candidate)
+        merged = merged[:top_k]
+        hot = sum(candidate[4] for candidate in merged)
+        self.hot_hits += hot
+        self.cold_hits += len(merged) - hot
+
+        results = {
+            "ids": [[candidate[1] for candidate in merged]],
+            "metadatas": [[candidate[2] for candidate in merged]],
+            "distances": [[candidate[0] for candidate in merged]]
+        }
+        if include_embeddings:
+            results["embeddings"] = [np.asarray([candidate[3] for candidate in merged], dtype=np.float32)]
+        return results
+
+    @staticmethod
+    def _scan(index: MmapIndex, rows: np.ndarray, query: np.ndarray, query_norm: float, top_k: int):
+        """Top-k of the given cold rows by exact distance"""
+        if not len(rows):
+            return [], []
+        distances = (
+            index.sq_norms[rows]
+            - 2.0 * (np.asarray(index.vectors[rows], dtype=np.float32) @ query)
+            + query_norm
+        )
+        k = min(top_k, len(rows))
+        top = np.argpartition(distances, k - 1)[:k]
+        return [int(rows[i]) for i in top], [float(distances[i]) for i in top]
+
+    def record_hits(self, results: List[Dict[str, Any]]):
+        """Count a query's hit documents towards their scores"""
+        sources = {(result.get("metadata") or {}).get("source", "unknown") for result in results}
+        with self._hits_lock:
+            for source in sources:
+                self._scores[source] = self._scores.get(source, 0.0) + 1.0
+
+    def add(self, ids: List[str], embeddings: np.ndarray, metadatas: List[Dict[str, Any]]):
+        """New chunks go to the hot tier, along with the rest of their document"""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        sources = [metadata.get("source", "unknown") for metadata in metadatas]
+        for source in dict.fromkeys(sources):
+            if source not in self._hot_rows and self._cold is not None:
+                self._promote(source)
+        self._append_hot(ids, vectors, metadatas, sources)
+        with self._hits_lock:
+            for source in set(sources):
+                # Recent uploads start as if they had just been queried
+                self._scores[source] = max(self._scores.get(source, 0.0), self.promote_hits)
+
+    def remove(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Drop deleted chunks from both tiers"""
+        sources = [(metadata or {}).get("source", "unknown") for metadata in metadatas]
+        wanted = set(ids)
+        if any(self._hot_ids[row] in wanted for source in set(sources) for row in self._hot_rows.get(source, ())):
+            self._keep_hot([chunk_id not in wanted for chunk_id in self._hot_ids[:self._hot_count]])
+        if self._cold is not None:
+            self._cold.delete(ids, sources)
+        if self._removed_during_rebuild is not None:
+            self._removed_during_rebuild[0].extend(ids)
+            self._removed_during_rebuild[1].extend(sources)
+        with self._hits_lock:
+            for source in set(sources):
+                if source not in self._hot_rows and not len(self._cold_rows(source)):
+                    self._scores.pop(source, None)
+
+    def reset(self):
+        """Forget both tiers, after the store was cleared"""
+        self._keep_hot([])
+        self._generation += 1
+        self._cold, old = None, self._cold_path
+        self._cold_path = None
+        if old is not None:
+            old.unlink(missing_ok=True)
+            _ivf_path(old).unlink(missing_ok=True)
+        with self._hits_lock:
+            self._scores.clear()
+
+    def maintain(self) -> Dict[str, Any]:
+        """Decay scores, rewrite the cold snapshot if needed, then promote and demote"""
+        promotions, demotions, rebuilds = self.promotions, self.demotions, self.rebuilds
+        with self.store.write_lock:
+            self._decay()
+            rebuild = self._needs_rebuild()
+        if rebuild:
+            self._rebuild_cold()
+
+        with self.store.write_lock:
+            self._make_room(0)
+
+            with self._hits_lock:
+                scores = dict(self._scores)
+            cold_only = sorted(
+                (source for source, score in scores.items()
+                 if score >= self.promote_hits and source not in self._hot_rows),
+                key=lambda source: -scores[source]
+            )
+            for source in cold_only:
+                size = len(self._cold_rows(source))
+                if not size or size > self.hot_max_chunks:
+                    continue
+                if not self._make_room(size, below=scores[source]):
+                    break
+                self._promote(source)
+
+            return {
+                "promoted": self.promotions - promotions,
+                "demoted": self.demotions - demotions,
+                "cold_rebuilt": self.rebuilds > rebuilds,
+                "hot_chunks": self._hot_count
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="tier-maintainer")
+        self._thread.start()
+        logger.info(f"Tier maintenance started (hot tier up to {self.hot_max_chunks} chunks)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def stats(self) -> Dict[str, Any]:
+        cold = self._cold
+        with self._hits_lock:
+            scores = sorted(self._scores.items(), key=lambda item: -item[1])[:10]
+        dimension = self._hot_vectors.shape[1] if self._hot_vectors is not None else 0
+        served = self.hot_hits + self.cold_hits
+        return {
+            "ready": self.ready(),
+            "hot_documents": len(self._hot_rows),
+            "hot_chunks": self._hot_count,
+            "hot_max_chunks": self.hot_max_chunks,
+            "hot_bytes": self._hot_count * (dimension + 1) * 4,
+            "cold_chunks": int(cold.index.count - cold.deleted.sum()) if cold is not None else 0,
+            "cold_deleted": int(cold.deleted.sum()) if cold is not None else 0,
+            "cold_file": str(self._cold_path) if self._cold_path is not None else None,
+            "cold_bytes": self._cold_path.stat().st_size if self._cold_path is not None else 0,
+            "hot_hit_ratio": round(self.hot_hits / served, 4) if served else None,
+            "promotions": self.promotions,
+            "demotions": self.demotions,
+            "cold_rebuilds": self.rebuilds,
+            "top_documents": [{"source": source, "score": round(score, 2)} for source, score in scores]
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Tier maintenance failed: {e}")
+
+    def _cold_rows(self, source: str) -> np.ndarray:
+        cold = self._cold
+        return cold.live_rows(source) if cold is not None else np.empty(0, dtype=np.int64)
+
+    def _promote(self, source: str):
+        """Copy a document's cold rows into RAM and mask them in the cold tier"""
+        rows = self._cold_rows(source)
+        if not len(rows):
+            return
+        index = self._cold.index
+        self._append_hot(
+            [index.columns["ids"][i] for i in rows],
+            np.asarray(index.vectors[rows], dtype=np.float32),
+            [json.loads(index.columns["metadatas"][i]) for i in rows],
+            [source] * len(rows)
+        )
+        self._cold.set_excluded(source, True)
+        self.promotions += 1
+        logger.debug(f"Promoted {source} to the hot tier ({len(rows)} chunks)")
+
+    def _demote(self, source: str):
+        # Unmask first so the document never drops out of both tiers
+        self._cold.set_excluded(source, False)
+        hot = set(self._hot_rows.get(source, ()))
+        self._keep_hot([row not in hot for row in range(self._hot_count)])
+        self.demotions += 1
+        logger.debug(f"Demoted {source} to the cold tier")
+
+    def _covered(self, source: str) -> bool:
+        """Whether the cold snapshot holds every chunk of a hot document"""
+        return len(self._cold_rows(source)) == len(self._hot_rows.get(source, ()))
+
+    def _make_room(self, size: int, below: float = float("inf")) -> bool:
+        """Demote lower-scoring documents until ``size`` more chunks fit"""
+        if self._hot_count + size <= self.hot_max_chunks:
+            return True
+        if self._cold is None:
+            return False
+        with self._hits_lock:
+            ranked = sorted(self._hot_rows, key=lambda source: self._scores.get(source, 0.0))
+            scores = {source: self._scores.get(source, 0.0) for source in ranked}
+        for source in ranked:
+            if self._hot_count + size <= self.hot_max_chunks:
+                break
+            if scores[source] < below and self._covered(source):
+                self._demote(source)
+        return self._hot_count + size <= self.hot_max_chunks
+
+    def _needs_rebuild(self) -> bool:
+        if time.monotonic() - self._rebuilt_at < self.min_rebuild_interval:
+            return False
+        cold = self._cold
+        if cold is None:
+            return self._hot_count > self.hot_max_chunks or not self.ready()
+        if cold.deleted.sum() > self.rebuild_deleted_ratio * max(cold.index.count, 1):
+            return True
+        if self._hot_count <= self.hot_max_chunks:
+            return False
+        demotable = sum(len(rows) for source, rows in self._hot_rows.items() if self._covered(source))
+        return self._hot_count - demotable > self.hot_max_chunks
+
+    def _rebuild_cold(self):
+        """Write the whole store to a new cold snapshot and switch to it.
+
+        The export and IVF training run without the write lock; only the
+        switch takes it. Chunks added meanwhile are already hot, and
+        deletions are replayed onto the new snapshot.
+        """
+        started = time.perf_counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{COLD_PREFIX}{int(time.time() * 1000)}{COLD_SUFFIX}"
+        with self.store.write_lock:
+            generation = self._generation
+            self._removed_during_rebuild = ([], [])
+        try:
+            export_snapshot(self.store, str(path), dtype=self.dtype, texts=False)
+            cold = _ColdTier.open(path, self.ivf_min_rows)
+        except Exception:
+            with self.store.write_lock:
+                self._removed_during_rebuild = None
+            path.unlink(missing_ok=True)
+            _ivf_path(path).unlink(missing_ok=True)
+            raise
+
+        with self.store.write_lock:
+            removed, self._removed_during_rebuild = self._removed_during_rebuild, None
+            if generation != self._generation:
+                # The store was cleared while this snapshot was written
+                path.unlink(missing_ok=True)
+                _ivf_path(path).unlink(missing_ok=True)
+                return
+            if removed[0]:
+                cold.delete(*removed)
+            excluded = cold.deleted.copy()
+            for source in self._hot_rows:
+                if source in cold.rows_by_source:
+                    excluded[cold.rows_by_source[source]] = True
+            cold.excluded = excluded
+
+            old, self._cold, self._cold_path = self._cold_path, cold, path
+            if old is not None:
+                # Searches still reading it keep their mapping
+                old.unlink(missing_ok=True)
+                _ivf_path(old).unlink(missing_ok=True)
+            self._rebuilt_at = time.monotonic()
+            self.rebuilds += 1
+        logger.info(
+            f"Rewrote cold tier with {cold.index.count} chunks in {time.perf_counter() - started:.2f}s"
+        )
+
+    def _load_cold(self):
+        """Reopen the latest cold snapshot and reconcile it with the store.
+
+        Documents whose chunk ids differ from the snapshot's (changed since
+        it was written) are masked in it and loaded into the hot tier from
+        the collection, so the tiers are usable straight away.
+        """
+        if not self.directory.exists():
+            return
+        paths = sorted(self.directory.glob(f"{COLD_PREFIX}*{COLD_SUFFIX}"))
+        for stale in paths[:-1]:
+            stale.unlink(missing_ok=True)
+            _ivf_path(stale).unlink(missing_ok=True)
+        if not paths:
+            return
+        try:
+            cold = _ColdTier.open(paths[-1], self.ivf_min_rows)
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cold tier {paths[-1]}: {e}")
+            paths[-1].unlink(missing_ok=True)
+            _ivf_path(paths[-1]).unlink(missing_ok=True)
+            return
+
+        stored: Dict[str, set] = {}
+        for page in self.store.iter_batches(include=["metadatas"]):
+            for chunk_id, metadata in zip(page["ids"], page["metadatas"] or []):
+                stored.setdefault((metadata or {}).get("source", "unknown"), set()).add(chunk_id)
+        changed = set()
+        deleted = cold.deleted.copy()
+        for source, rows in cold.rows_by_source.items():
+            if {cold.index.columns["ids"][i] for i in rows} != stored.get(source, set()):
+                deleted[rows] = True
+                changed.add(source)
+        changed.update(source for source in stored if source not in cold.rows_by_source)
+        cold.deleted = cold.excluded = deleted
+
+        if changed:
+            for page in self.store.iter_batches(include=["embeddings", "metadatas"]):
+                keep = [
+                    i for i, metadata in enumerate(page["metadatas"])
+                    if (metadata or {}).get("source", "unknown") in changed
+                ]
+                if keep:
+                    metadatas = [page["metadatas"][i] for i in keep]
+                    self._append_hot(
+                        [page["ids"][i] for i in keep],
+                        np.asarray(page["embeddings"], dtype=np.float32)[keep],
+                        metadatas,
+                        [metadata.get("source", "unknown") for metadata in metadatas]
+                    )
+        self._cold, self._cold_path = cold, paths[-1]
+        logger.info(
+            f"Mapped cold tier {paths[-1].name} ({cold.index.count} chunks, "
+            f"{len(changed)} changed documents loaded hot)"
+        )
+
+    def _append_hot(self, ids: List[str], vectors: np.ndarray, metadatas: List[Dict[str, Any]], sources: List[str]):
+        count, added = self._hot_count, len(ids)
+        if not added:
+            return
+        if self._hot_vectors is None or count + added > len(self._hot_vectors):
+            capacity = max(1024, int((count + added) * 1.5))
+            grown = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            grown_norms = np.empty(capacity, dtype=np.float32)
+            if count:
+                grown[:count] = self._hot_vectors[:count]
+                grown_norms[:count] = self._hot_norms[:count]
+            self._hot_vectors, self._hot_norms = grown, grown_norms
+        self._hot_vectors[count:count + added] = vectors
+        self._hot_norms[count:count + added] = np.einsum("ij,ij->i", vectors, vectors)
+        self._hot_ids.extend(ids)
+        self._hot_metadatas.extend(metadatas)
+        for offset, source in enumerate(sources):
+            self._hot_rows.setdefault(source, []).append(count + offset)
+        self._hot_count = count + added
+        self._publish_hot()
+
+    def _keep_hot(self, keep: List[bool]):
+        """Rebuild the hot tier from the rows where ``keep`` is set, into fresh arrays"""
+        rows = [row for row, kept in enumerate(keep) if kept]
+        if self._hot_vectors is not None and rows:
+            self._hot_vectors = self._hot_vectors[rows].copy()
+            self._hot_norms = self._hot_norms[rows].copy()
+        else:
+            self._hot_vectors = self._hot_norms = None
+        self._hot_ids = [self._hot_ids[row] for row in rows]
+        self._hot_metadatas = [self._hot_metadatas[row] for row in rows]
+        self._hot_rows = {}
+        for row, metadata in enumerate(self._hot_metadatas):
+            self._hot_rows.setdefault(metadata.get("source", "unknown"), []).append(row)
+        self._hot_count = len(rows)
+        self._publish_hot()
+
+    def _publish_hot(self):
+        self._hot_view = (self._hot_vectors, self._hot_norms, self._hot_ids, self._hot_metadatas, self._hot_count)
+
+    def _decay(self):
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self._decayed_at) / self.half_life) if self.half_life else 0.0
+        self._decayed_at = now
+        with self._hits_lock:
+            self._scores = {source: score * factor for source, score in self._scores.items() if score * factor >= 0.01}
@@ -0,0 +1,175 @@
+from typing import List, Dict, Any, Optional
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+import cProfile
+import io
+import itertools
+import logging
+import pstats
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("rag_trace", default=None)
+_profiling = threading.local()
+_DISABLED = nullcontext()
+
+def current_trace() -> Optional["Trace"]:
+    return _current_trace.get()
+
+def stage(name: str):
+    """Time a pipeline stage of the current request, if it is being traced.
+
+    Untraced requests get a shared no-op context manager, so the cost of an
+    instrumented stage is a single context variable lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return _DISABLED
+    return _Stage(trace, name)
+
+class _Stage:
+    __slots__ = ("trace", "name", "start", "profile")
+
+    def __init__(self, trace: "Trace", name: str):
+        self.trace = trace
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        # cProfile hooks one thread; profile the outermost stage in each
+        # thread the request runs on and merge them when reporting
+        if self.trace.profile and not getattr(_profiling, "active", False):
+            _profiling.active = True
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.profile is not None:
+            self.profile.disable()
+            _profiling.active = False
+            self.trace.add_profile(self.profile)
+        self.trace.record(self.name, self.start, end)
+        return False
+
+class Trace:
+    """Stage timings, and optionally a cProfile profile, for one request"""
+
+    def __init__(self, profile: bool = False, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.profile = profile
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def activate(self):
+        """Make this the current trace; returns a token for ``deactivate``"""
+        return _current_trace.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current_trace.reset(token)
+
+    def record(self, name: str, start: float, end: float):
+        with self._lock:
+            self.spans.append({
+                "stage": name,
+                "start_ms": round((start - self.origin) * 1000, 3),
+                "duration_ms": round((end - start) * 1000, 3),
+                "thread": threading.current_thread().name
+            })
+
+    def add_profile(self, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        """Spans ordered by start time, offsets relative to the trace start"""
+        with self._lock:
+            return sorted(self.spans, key=lambda span: span["start_ms"])
+
+    def server_timing(self) -> str:
+        """Render the spans as a Server-Timing header value"""
+        totals: Dict[str, float] = {}
+        for span in self.waterfall():
+            totals[span["stage"]] = totals.get(span["stage"], 0.0) + span["duration_ms"]
+        return ", ".join(f"{name};dur={duration:.3f}" for name, duration in totals.items())
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def top_functions(self, limit: int = 25, sort: str = "cumulative") -> Optional[str]:
+        stats = self.stats()
+        if stats is None:
+            return None
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump_profile(self, directory: str) -> Optional[str]:
+        """Write the merged profile as a .prof file (snakeviz, flameprof, gprof2dot)"""
+        stats = self.stats()
+        if stats is None:
+            return None
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        target = path / f"{self.trace_id}.prof"
+        stats.dump_stats(str(target))
+        return str(target)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((time.perf_counter() - self.origin) * 1000, 3),
+            "waterfall": self.waterfall()
+        }
+
+class TraceSampler:
+    """Decides which requests are traced.
+
+    A request is traced when it asks for it (``X-RAG-Trace: 1``, or
+    ``profile`` to also run cProfile) or when it is the Nth since the last
+    sampled one. ``sample_every=0`` disables sampling; ``profile`` makes
+    sampled requests profiled too.
+    """
+
+    def __init__(self, sample_every: int = 0, profile: bool = False):
+        self.sample_every = sample_every
+        self.profile = profile
+        self.traced = 0
+        self._counter = itertools.count(1)
+
+    def configure(self, sample_every: Optional[int] = None, profile: Optional[bool] = None):
+        if sample_every is not None:
+            self.sample_every = max(0, sample_every)
+        if profile is not None:
+            self.profile = profile
+
+    def start(self, requested: Optional[str] = None) -> Optional[Trace]:
+        requested = (requested or "").strip().lower()
+        if requested in ("1", "true", "profile"):
+            trace = Trace(profile=requested == "profile")
+        elif self.sample_every and next(self._counter) % self.sample_every == 0:
+            trace = Trace(profile=self.profile)
+        else:
+            return None
+        self.traced += 1
+        return trace
+
+    def stats(self) -> Dict[str, Any]:
+        return {"sample_every": self.sample_every, "profile": self.profile, "traced": self.traced}
@@ -1,23 +1,109 @@
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
+from pathlib import Path
 import chromadb
 from chromadb.config import Settings
+import hashlib
 import logging
+import shutil
+import sqlite3
+import threading
+import time
 import uuid
+from .dedup import DedupIndex
+from .full_vectors import FullVectorStore
+from .projection import Projection
+from .remote_chroma import RemoteChromaClient
+from .text_store import TextStore
+from .tiered_index import TieredIndex
+from .tracing import stage
 
 logger = logging.getLogger(__name__)
 
+# Collection metadata naming the projection file of a collection that
+# indexes projected vectors
+PROJECTION_KEY = "projection"
+
 class VectorStore:
-    def __init__(self, collection_name: str, persist_directory: str):
+    # Page size used when scanning the collection
+    SCAN_BATCH_SIZE = 1000
+
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str,
+        candidate_documents: int = 20,
+        coarse_min_documents: int = 50,
+        dedup_threshold: Optional[float] = None,
+        reduced_dimension: Optional[int] = None,
+        projection_mode: str = "pca",
+        rescore_factor: int = 4,
+        hot_tier_chunks: int = 0,
+        tier_promote_hits: float = 3.0,
+        tier_half_life: float = 3600.0,
+        tier_nprobe: int = 16,
+        remote: Optional[RemoteChromaClient] = None
+    ):
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+
+        # Against a shared Chroma server, state kept on local disk would
+        # differ between pods, so the features that need it are off
+        self.remote = remote
+        self._remote_checked_at = 0.0
+        self._remote_refreshing = False
+        if remote is not None and (dedup_threshold or reduced_dimension or hot_tier_chunks):
+            logger.warning(
+                "Near-duplicate detection, reduced-dimension and tiered search keep local state; "
+                "they are off with a remote Chroma server"
+            )
+            dedup_threshold, reduced_dimension, hot_tier_chunks = None, None, 0
+
+        # Two-level search: documents are ranked by the centroid of their
+        # chunk vectors first, then only the best candidates' chunks are
+        # searched. Small corpora keep the exact flat search.
+        self.candidate_documents = candidate_documents
+        self.coarse_min_documents = coarse_min_documents
+
+        # Reduced-dimension search: once a projection is fitted the
+        # collection indexes projected vectors, and the full vectors used to
+        # rescore candidates live in a side store outside any index
+        self.reduced_dimension = reduced_dimension
+        self.projection_mode = projection_mode
+        self.rescore_factor = rescore_factor
+        self.full_vectors: Optional[FullVectorStore] = None
+        # Loaded projections by file name; a collection's metadata names its own
+        self._projections: Dict[str, Projection] = {}
+
+        # Tiered search: recent and popular documents in RAM, the rest in
+        # a memory-mapped snapshot
+        self.tiers: Optional[TieredIndex] = None
+
+        # In-memory statistics, kept in step with every write
+        self._stats_lock = threading.Lock()
+        self._chunk_count = 0
+        self._source_counts: Dict[str, int] = {}
+        self._dimension: Optional[int] = None
+        self._disk_size: Optional[int] = None
+        self._centroid_count = 0
+        self.version = 0
+
+        # Serializes writers; searches never take it
+        self._write_lock = threading.RLock()
+
         try:
-            self.client = chromadb.PersistentClient(
+            self.client = remote or chromadb.PersistentClient(
                 path=persist_directory,
                 settings=Settings(
                     anonymized_telemetry=False,
                     allow_reset=True
                 )
             )
-            
+
+            if remote is None:
+                self._recover_interrupted_swap()
+                self._remove_orphan_segments()
+
             # Create or get collection
             try:
                 self.collection = self.client.get_collection(collection_name)
@@ -25,73 +111,1075 @@ class VectorStore:
             except:
                 self.collection = self.client.create_collection(collection_name)
                 logger.info(f"Created new collection: {collection_name}")
-                
+            self.centroids = self.client.get_or_create_collection(f"{collection_name}_centroids")
+
+            # Chunk text lives in a compressed side store; the collection
+            # holds only ids, vectors and metadata. A remote collection keeps
+            # the text itself.
+            self.texts = (
+                TextStore(str(Path(persist_directory) / "chunk_text.sqlite3"))
+                if remote is None else None
+            )
+
+            projection_file = (self.collection.metadata or {}).get(PROJECTION_KEY)
+            if remote is None and (reduced_dimension or projection_file):
+                self.full_vectors = FullVectorStore(str(Path(persist_directory) / "full_vectors.sqlite3"))
+                self._load_projection(projection_file)
+            self._centroid_count = self.centroids.count()
+
+            # Near-duplicate chunks are recorded against a canonical chunk
+            # instead of being stored again
+            self.dedup = (
+                DedupIndex(str(Path(persist_directory) / "dedup.sqlite3"), threshold=dedup_threshold)
+                if dedup_threshold else None
+            )
+
+            self._load_stats()
+            if hot_tier_chunks:
+                self.tiers = TieredIndex(
+                    self,
+                    str(Path(persist_directory) / "tiers"),
+                    hot_max_chunks=hot_tier_chunks,
+                    promote_hits=tier_promote_hits,
+                    half_life=tier_half_life,
+                    nprobe=tier_nprobe
+                )
+            if self.centroids.count() != len(self._source_counts):
+                logger.warning(
+                    "Document centroid index is out of date; using flat search "
+                    "until it is rebuilt (POST /admin/compact)"
+                )
+            if reduced_dimension and not self.reduced_search_enabled() and self._chunk_count:
+                logger.warning(
+                    "Reduced-dimension projection is not fitted; using full-dimension search "
+                    "until it is (POST /admin/projection)"
+                )
+
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
 
-    def add_documents(self, documents: List[Dict[str, Any]], embeddings: np.ndarray):
+    def add_documents(
+        self,
+        documents: List[Dict[str, Any]],
+        embeddings: np.ndarray,
+        ids: Optional[List[str]] = None
+    ):
         try:
-            # Generate unique IDs
-            ids = [str(uuid.uuid4()) for _ in range(len(documents))]
-            
+            # Generate unique IDs unless the caller supplies them
+            if ids is None:
+                ids = [str(uuid.uuid4()) for _ in range(len(documents))]
+
             # Prepare data
             texts = [doc["text"] for doc in documents]
             metadatas = [doc["metadata"] for doc in documents]
-            
-            # Add to collection
-            self.collection.add(
-                documents=texts,
-                embeddings=embeddings.tolist(),
-                metadatas=metadatas,
-                ids=ids
-            )
+
+            # Text and full vectors first, so a search never finds a chunk
+            # without them
+            with self._write_lock:
+                if self.texts is not None:
+                    self.texts.put(ids, texts)
+                projection = self._projection_for_add(embeddings)
+                if projection is not None:
+                    self.full_vectors.put(ids, embeddings)
+                self.collection.add(
+                    embeddings=(projection.transform(embeddings) if projection is not None else embeddings).tolist(),
+                    metadatas=metadatas,
+                    documents=texts if self.texts is None else None,
+                    ids=ids
+                )
+                self._update_centroids(metadatas, embeddings)
+                self._record_added(metadatas, embeddings)
+                if self.tiers is not None:
+                    self.tiers.add(ids, embeddings, metadatas)
+                if self.dedup is not None:
+                    self.dedup.register(
+                        ids,
+                        texts,
+                        [m.get("source", "unknown") for m in metadatas],
+                        [m.get("doc_hash") for m in metadatas]
+                    )
             logger.info(f"Added {len(documents)} documents to vector store")
-            
+
         except Exception as e:
             logger.error(f"Failed to add documents: {e}")
             raise
 
-    def search(self, query_embedding: np.ndarray, top_k: int = 3) -> List[Dict[str, Any]]:
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 3,
+        include_embeddings: bool = False
+    ) -> List[Dict[str, Any]]:
         try:
             # Ensure we don't request more results than we have documents
-            count = self.collection.count()
+            with stage("count"):
+                count = self.count()
             if count == 0:
                 logger.warning("Vector store is empty")
                 return []
-                
+
+            # One collection for the whole search; a projection refit swaps
+            # in another, with its own projection
+            collection = self.collection
+            where = sources = None
+            if self.coarse_search_enabled():
+                with stage("coarse"):
+                    sources = self._candidate_sources(query_embedding)
+                    where, count = self._candidate_filter(sources)
+
             actual_k = min(top_k, count)
             logger.info(f"Searching for top {actual_k} results")
-            
-            results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=actual_k
-            )
-            
-            formatted_results = []
-            if results['documents']:
-                for i in range(len(results['documents'][0])):
-                    formatted_results.append({
-                        'text': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'score': float(results['distances'][0][i]) if 'distances' in results else 0.0,
-                        'id': results['ids'][0][i]
-                    })
-            
+
+            if self.tiered_search_enabled():
+                # The hot tier is searched whole, whatever the candidate documents
+                results = self.tiers.search(
+                    query_embedding,
+                    min(top_k, self.count()),
+                    include_embeddings,
+                    sources if where is not None else None
+                )
+            elif self._projection_of(collection) is not None:
+                results = self._search_reduced(
+                    collection, query_embedding, actual_k, count, where, include_embeddings
+                )
+            else:
+                with stage("query"):
+                    include = ["metadatas", "distances"] if self.texts is not None else ["metadatas", "documents", "distances"]
+                    if include_embeddings:
+                        include.append("embeddings")
+                    results = collection.query(
+                        query_embeddings=[query_embedding.tolist()],
+                        n_results=actual_k,
+                        where=where,
+                        include=include
+                    )
+
+            with stage("format"):
+                formatted_results = self._format_results(results)
+                missing = [result for result in formatted_results if result["text"] is None]
+                texts = self._fetch_texts([result["id"] for result in missing])
+                for result, text in zip(missing, texts):
+                    result["text"] = text
+                if self.dedup is not None:
+                    self._attach_duplicates(formatted_results)
+            if self.tiers is not None:
+                self.tiers.record_hits(formatted_results)
             return formatted_results
-            
+
         except Exception as e:
             logger.error(f"Search failed: {e}")
             raise
 
+    def _search_reduced(
+        self,
+        collection,
+        query_embedding: np.ndarray,
+        top_k: int,
+        count: int,
+        where: Optional[Dict[str, Any]],
+        include_embeddings: bool
+    ) -> Dict[str, Any]:
+        """Shortlist in the reduced space, then rank by full-dimension distance.
+
+        The shortlist's full vectors are read from the side store by id.
+        Returns its best ``top_k`` shaped like a Chroma query result, so it
+        formats like one.
+        """
+        projection = self._projection_of(collection)
+        with stage("query"):
+            shortlist = collection.query(
+                query_embeddings=[projection.transform(query_embedding).tolist()],
+                n_results=min(top_k * self.rescore_factor, count),
+                where=where,
+                include=["metadatas"]
+            )
+        with stage("rescore"):
+            metadatas = dict(zip(shortlist["ids"][0], shortlist["metadatas"][0]))
+            # Chunks deleted since the query are left out
+            ids, vectors = self.full_vectors.get(shortlist["ids"][0])
+            if not ids:
+                return {"ids": [[]], "metadatas": [[]], "distances": [[]]}
+            distances = self._distances(np.asarray(query_embedding, dtype=np.float32), vectors)
+            order = np.argsort(distances)[:top_k]
+            ranked = [ids[i] for i in order]
+        results = {
+            "ids": [ranked],
+            "metadatas": [[metadatas[chunk_id] for chunk_id in ranked]],
+            "distances": [distances[order]]
+        }
+        if include_embeddings:
+            results["embeddings"] = [vectors[order]]
+        return results
+
+    def _distances(self, query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Distances in the collection's own metric, matching Chroma's scores"""
+        space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+        if space == "ip":
+            return 1.0 - vectors @ query
+        if space == "cosine":
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+            return 1.0 - (vectors @ query) / np.maximum(norms, 1e-12)
+        return ((vectors - query) ** 2).sum(axis=1)
+
+    def tiered_search_enabled(self) -> bool:
+        """Whether searches go to the hot and cold tiers instead of the collection"""
+        return self.tiers is not None and self.tiers.ready()
+
+    def reduced_search_enabled(self) -> bool:
+        """Whether searches go through the reduced-dimension index"""
+        return self.projection is not None
+
+    @property
+    def projection(self) -> Optional[Projection]:
+        """Projection of the vectors the collection indexes; None for full vectors"""
+        return self._projection_of(self.collection)
+
+    def _projection_of(self, collection) -> Optional[Projection]:
+        return self._projections.get((collection.metadata or {}).get(PROJECTION_KEY))
+
+    def fit_projection(self) -> Dict[str, Any]:
+        """Fit the projection on the current corpus and rebuild the collection with it.
+
+        The projected collection is built in a staging collection and
+        swapped in, so searches keep using the previous one meanwhile.
+        """
+        if not self.reduced_dimension:
+            raise ValueError("Reduced-dimension search is not enabled")
+        with self._write_lock:
+            started = time.perf_counter()
+            projection = Projection.fit(
+                self.projection_mode,
+                self.reduced_dimension,
+                (page["embeddings"] for page in self.iter_batches(include=["embeddings"]))
+            )
+            copied = self._rebuild_collection(projection)
+            with self._stats_lock:
+                self.version += 1
+
+        logger.info(
+            f"Fitted {projection.mode} projection {projection.source_dimension} -> "
+            f"{projection.dimension} over {copied} chunks"
+        )
+        return {
+            **projection.stats(),
+            "chunks": copied,
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def _rebuild_collection(self, projection: Optional[Projection]) -> int:
+        """Copy every chunk into a fresh collection and swap it in.
+
+        The new collection indexes ``projection``'s vectors, with the full
+        vectors in the side store, or the full vectors themselves when
+        ``projection`` is None. Text still held in the collection from
+        before the text store existed is moved into it on the way. Returns
+        the number of chunks copied.
+        """
+        metadata = {
+            key: value for key, value in (self.collection.metadata or {}).items() if key != PROJECTION_KEY
+        }
+        projection_file = None
+        if projection is not None:
+            # A new file per fit: the old collection keeps its own until the swap
+            projection_file = f"projection-{uuid.uuid4().hex[:12]}.npz"
+            projection.save(str(Path(self.persist_directory) / projection_file))
+            self._projections[projection_file] = projection
+            metadata[PROJECTION_KEY] = projection_file
+
+        staging_name = f"{self.collection_name}_staging"
+        self._drop_collection(staging_name)
+        staging = self.client.create_collection(staging_name, metadata=metadata or None)
+
+        copied = 0
+        for page in self.iter_batches(include=["embeddings", "documents", "metadatas"]):
+            if self.texts is not None:
+                present = self.texts.contains(page["ids"])
+                legacy = [
+                    (chunk_id, text) for chunk_id, text in zip(page["ids"], page["documents"])
+                    if chunk_id not in present and text is not None
+                ]
+                if legacy:
+                    self.texts.put(*map(list, zip(*legacy)))
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            if projection is not None:
+                present = self.full_vectors.contains(page["ids"])
+                missing = [i for i, chunk_id in enumerate(page["ids"]) if chunk_id not in present]
+                if missing:
+                    self.full_vectors.put([page["ids"][i] for i in missing], vectors[missing])
+                vectors = projection.transform(vectors)
+            staging.add(
+                ids=page["ids"],
+                embeddings=vectors.tolist(),
+                metadatas=page["metadatas"],
+                documents=page["documents"] if self.texts is None else None
+            )
+            copied += len(page["ids"])
+
+        # Rename before dropping so in-flight searches never miss the collection
+        retired = self.collection
+        retired_name = f"{self.collection_name}_retired"
+        self._drop_collection(retired_name)
+        retired.modify(name=retired_name)
+        staging.modify(name=self.collection_name)
+        self.collection = staging
+        self._delete_collection(retired_name)
+
+        retired_file = (retired.metadata or {}).get(PROJECTION_KEY)
+        if retired_file and retired_file != projection_file:
+            self._projections.pop(retired_file, None)
+            (Path(self.persist_directory) / retired_file).unlink(missing_ok=True)
+        if projection is None and self.full_vectors is not None:
+            self.full_vectors.clear()
+        return copied
+
+    def _load_projection(self, projection_file: Optional[str]):
+        """Load the collection's projection and drop any the collection does not use"""
+        directory = Path(self.persist_directory)
+        for path in directory.glob("projection*.npz"):
+            if path.name != projection_file:
+                # Left by an interrupted fit, or by the old separate reduced index
+                path.unlink()
+        try:
+            self._delete_collection(f"{self.collection_name}_reduced")
+            logger.warning("Dropped the separate reduced-dimension index; refit it (POST /admin/projection)")
+        except Exception:
+            pass
+        if not projection_file:
+            return
+        projection = Projection.load(str(directory / projection_file))
+        self._projections[projection_file] = projection
+        if projection.mode != self.projection_mode or projection.dimension != self.reduced_dimension:
+            logger.warning(
+                f"The collection indexes a {projection.mode} projection to {projection.dimension} dimensions, "
+                f"which does not match the configuration; searches use it until it is refitted "
+                f"(POST /admin/projection), or with reduced-dimension search off, compacted"
+            )
+
+    def _projection_for_add(self, embeddings: np.ndarray) -> Optional[Projection]:
+        """Projection new chunks are indexed in"""
+        if (
+            self.reduced_dimension and self.projection is None
+            and self.projection_mode == "truncate" and self._chunk_count == 0
+        ):
+            # Truncation needs no fitting, so an empty store can start reduced
+            self._rebuild_collection(
+                Projection("truncate", self.reduced_dimension, int(np.shape(embeddings)[-1]))
+            )
+        return self.projection
+
+    def _fetch_texts(self, ids: List[str]) -> List[Optional[str]]:
+        """Chunk texts for the given ids, in order.
+
+        Chunks written before the text store existed keep their text in the
+        collection; those are read from there until a compaction moves them.
+        """
+        texts = self.texts.fill(ids, None) if self.texts is not None else [None] * len(ids)
+        legacy = [chunk_id for chunk_id, text in zip(ids, texts) if text is None]
+        if legacy:
+            stored = self.collection.get(ids=legacy, include=["documents"])
+            found = dict(zip(stored["ids"], stored["documents"] or []))
+            texts = [found.get(chunk_id) if text is None else text for chunk_id, text in zip(ids, texts)]
+        return texts
+
+    def _attach_duplicates(self, results: List[Dict[str, Any]]):
+        """List the other documents that contain each hit's text"""
+        references = self.dedup.references([result["id"] for result in results])
+        for result in results:
+            if result["id"] in references:
+                result["duplicates"] = references[result["id"]]
+
+    def add_duplicates(self, duplicates):
+        """Record near-duplicate chunks against their stored canonical chunks"""
+        if self.dedup is not None and duplicates:
+            with self._write_lock:
+                self.dedup.add_duplicates(duplicates)
+                # Search results now list the new references
+                with self._stats_lock:
+                    self.version += 1
+            logger.info(f"Recorded {len(duplicates)} duplicate chunks by reference")
+
+    def get_neighbors(self, hits: List[Dict[str, Any]], window: int = 1) -> List[List[Dict[str, Any]]]:
+        """Chunks within ``window`` positions of each hit in the same document.
+
+        Uses the stored ``source`` and ``chunk_id`` metadata, so this is one
+        metadata lookup for all hits rather than any vector search.
+        """
+        wanted: Dict[str, set] = {}
+        for hit in hits:
+            metadata = hit.get("metadata") or {}
+            if metadata.get("chunk_id") is None:
+                continue
+            chunk_ids = wanted.setdefault(metadata.get("source", "unknown"), set())
+            for offset in range(-window, window + 1):
+                if offset:
+                    chunk_ids.add(metadata["chunk_id"] + offset)
+        if not wanted:
+            return [[] for _ in hits]
+
+        clauses = [
+            {"$and": [{"source": source}, {"chunk_id": {"$in": sorted(chunk_ids)}}]}
+            for source, chunk_ids in wanted.items()
+        ]
+        page = self.collection.get(
+            where=clauses[0] if len(clauses) == 1 else {"$or": clauses},
+            include=["metadatas"]
+        )
+        texts = self._fetch_texts(page["ids"])
+        by_position = {
+            (metadata.get("source"), metadata.get("chunk_id")): {
+                'text': text,
+                'metadata': metadata,
+                'score': None,
+                'id': doc_id
+            }
+            for doc_id, text, metadata in zip(page["ids"], texts, page["metadatas"])
+        }
+
+        neighbors = []
+        for hit in hits:
+            metadata = hit.get("metadata") or {}
+            source, chunk_id = metadata.get("source"), metadata.get("chunk_id")
+            if chunk_id is None:
+                neighbors.append([])
+                continue
+            neighbors.append([
+                by_position[(source, chunk_id + offset)]
+                for offset in range(-window, window + 1)
+                if offset and (source, chunk_id + offset) in by_position
+            ])
+        return neighbors
+
+    def coarse_search_enabled(self) -> bool:
+        """Whether searches use the document centroid pass"""
+        documents = len(self._source_counts)
+        return documents >= self.coarse_min_documents and self._centroid_count == documents
+
+    def _candidate_sources(self, query_embedding: np.ndarray) -> List[str]:
+        """The documents whose centroids are nearest the query"""
+        candidates = self.centroids.query(
+            query_embeddings=[query_embedding.tolist()],
+            n_results=min(self.candidate_documents, self._centroid_count),
+            include=["metadatas"]
+        )
+        return [m["source"] for m in candidates["metadatas"][0]]
+
+    def _candidate_filter(self, sources: List[str]):
+        """Filter restricting the chunk search to the candidate documents, and their chunk count"""
+        chunks = sum(self._source_counts.get(source, 0) for source in sources)
+        if not chunks:
+            return None, self.count()
+        return {"source": {"$in": sources}}, chunks
+
+    @staticmethod
+    def _format_results(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        formatted_results = []
+        if results['ids'] and results['ids'][0]:
+            ids = results['ids'][0]
+            documents = results['documents'][0] if results.get('documents') else [None] * len(ids)
+            metadatas = results['metadatas'][0] if results['metadatas'] else [{}] * len(ids)
+
+            # Distances stay float32 scalars; ORJSONResponse serializes them
+            # natively, at their shortest float32 representation
+            if results.get('distances'):
+                scores = np.asarray(results['distances'][0], dtype=np.float32)
+            else:
+                scores = np.zeros(len(ids), dtype=np.float32)
+
+            for text, metadata, score, doc_id in zip(documents, metadatas, scores, ids):
+                formatted_results.append({
+                    'text': text,
+                    'metadata': metadata or {},
+                    'score': score,
+                    'id': doc_id
+                })
+
+            if results.get('embeddings') is not None:
+                embeddings = np.asarray(results['embeddings'][0], dtype=np.float32)
+                for result, embedding in zip(formatted_results, embeddings):
+                    result['embedding'] = embedding
+
+        return formatted_results
+
     def clear(self):
-        """Clear all documents from the collection"""
+        """Clear all documents by dropping and recreating the collection"""
         try:
-            self.collection.delete(ids=self.collection.get()['ids'])
+            with self._write_lock:
+                retired = self.collection
+                retired_name = f"{self.collection_name}_retired"
+                self._drop_collection(retired_name)
+                retired.modify(name=retired_name)
+                metadata = {
+                    key: value for key, value in (retired.metadata or {}).items() if key != PROJECTION_KEY
+                }
+                self.collection = self.client.create_collection(self.collection_name, metadata=metadata or None)
+                self._delete_collection(retired_name)
+                self._reset_centroids()
+                self._reset_projection()
+                if self.tiers is not None:
+                    self.tiers.reset()
+                if self.texts is not None:
+                    self.texts.clear()
+                if self.dedup is not None:
+                    self.dedup.clear()
+                self._reset_stats()
             logger.info("Cleared vector store")
         except Exception as e:
             logger.error(f"Failed to clear vector store: {e}")
             raise
 
+    def delete_document(
+        self,
+        source: Optional[str] = None,
+        doc_hash: Optional[str] = None
+    ) -> int:
+        """Delete every chunk of one document, matched by source path or content hash.
+
+        Chunks are removed in pages of SCAN_BATCH_SIZE so memory use does not
+        depend on the document size. Returns the number of chunks deleted.
+        """
+        if not source and not doc_hash:
+            raise ValueError("delete_document requires a source or a doc_hash")
+
+        where = {"source": source} if source else {"doc_hash": doc_hash}
+        removed: Dict[str, int] = {}
+        references = 0
+        try:
+            with self._write_lock:
+                if self.dedup is not None:
+                    references = self.dedup.remove_duplicates(
+                        source=source, doc_hash=None if source else doc_hash
+                    )
+                while True:
+                    page = self.collection.get(
+                        where=where,
+                        include=["metadatas"],
+                        limit=self.SCAN_BATCH_SIZE
+                    )
+                    if not page["ids"]:
+                        break
+                    self._remove_page(page, removed)
+                self._record_removed(removed)
+                for removed_source in removed:
+                    self._rebuild_centroid(removed_source)
+
+            total = sum(removed.values()) + references
+            logger.info(f"Deleted {total} chunks matching {where}")
+            return total
+        except Exception as e:
+            logger.error(f"Failed to delete document: {e}")
+            raise
+
+    def delete_chunks(self, ids: List[str]) -> int:
+        """Delete chunks by id; ids that are not stored are ignored"""
+        removed: Dict[str, int] = {}
+        try:
+            with self._write_lock:
+                for start in range(0, len(ids), self.SCAN_BATCH_SIZE):
+                    page = self.collection.get(
+                        ids=ids[start:start + self.SCAN_BATCH_SIZE],
+                        include=["metadatas"]
+                    )
+                    if page["ids"]:
+                        self._remove_page(page, removed)
+                self._record_removed(removed)
+                for removed_source in removed:
+                    self._rebuild_centroid(removed_source)
+            total = sum(removed.values())
+            logger.info(f"Deleted {total} chunks by id")
+            return total
+        except Exception as e:
+            logger.error(f"Failed to delete chunks: {e}")
+            raise
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """The subset of ids that are stored"""
+        return set(self.collection.get(ids=ids, include=[])["ids"]) if ids else set()
+
+    def _remove_page(self, page: Dict[str, Any], removed: Dict[str, int]):
+        """Delete one page of chunks everywhere, counting them per source in ``removed``"""
+        promoted = self._promote_duplicates(page["ids"]) if self.dedup is not None else None
+        self.collection.delete(ids=page["ids"])
+        if self.tiers is not None:
+            self.tiers.remove(page["ids"], page["metadatas"] or [])
+        if self.full_vectors is not None:
+            self.full_vectors.delete(page["ids"])
+        if promoted:
+            self.add_documents(*promoted)
+        if self.texts is not None:
+            self.texts.delete(page["ids"])
+        if self.dedup is not None:
+            self.dedup.remove_chunks(page["ids"])
+        for metadata in page["metadatas"] or []:
+            page_source = (metadata or {}).get("source", "unknown")
+            removed[page_source] = removed.get(page_source, 0) + 1
+
+    def _promote_duplicates(self, chunk_ids: List[str]):
+        """Re-home chunks other documents still reference before they are deleted.
+
+        For each canonical chunk about to go that has duplicates elsewhere,
+        one duplicate becomes a stored chunk (same text and embedding, its
+        own metadata) and the others are re-pointed at it. Returns the
+        ``add_documents`` arguments for the new chunks, or None.
+        """
+        referenced = list(self.dedup.references(chunk_ids))
+        if not referenced:
+            return None
+        stored = self._get(ids=referenced, include=["embeddings"])
+        texts = self._fetch_texts(stored["ids"])
+        documents, embeddings, ids = [], [], []
+        for chunk_id, text, embedding in zip(stored["ids"], texts, stored["embeddings"]):
+            new_id = str(uuid.uuid4())
+            metadata = self.dedup.promote(chunk_id, new_id)
+            documents.append({"text": text, "metadata": metadata})
+            embeddings.append(embedding)
+            ids.append(new_id)
+        logger.info(f"Promoted {len(ids)} duplicate chunks to keep them searchable")
+        return documents, np.asarray(embeddings, dtype=np.float32), ids
+
+    def compact(self) -> Dict[str, Any]:
+        """Rebuild the collection and vacuum the underlying SQLite file.
+
+        Heavy delete churn leaves tombstones in the HNSW index and free pages
+        in SQLite; copying the live rows into a fresh collection in pages
+        restores index speed, and VACUUM hands the space back to the OS.
+        Searches keep using the old collection until the swap. Text still
+        held in the collection from before the text store existed is moved
+        into it on the way, text blocks left mostly dead by deletes are
+        rewritten, and the reduced-dimension projection is refitted
+        (or, with reduced-dimension search off, full vectors are indexed again).
+        """
+        try:
+            with self._write_lock:
+                size_before = self._measure_disk_size()
+                # Refitted on the way, so the copy is projected once
+                projection = None
+                if self.reduced_dimension and self._chunk_count:
+                    projection = Projection.fit(
+                        self.projection_mode,
+                        self.reduced_dimension,
+                        (page["embeddings"] for page in self.iter_batches(include=["embeddings"]))
+                    )
+                copied = self._rebuild_collection(projection)
+
+                self._load_stats()
+                self.rebuild_centroids()
+                self._vacuum()
+                repacked = 0
+                if self.texts is not None:
+                    repacked = self.texts.repack()
+                    self.texts.vacuum()
+                if self.full_vectors is not None:
+                    self.full_vectors.vacuum()
+                size_after = self._measure_disk_size()
+
+            logger.info(f"Compacted {copied} chunks: {size_before} -> {size_after} bytes on disk")
+            return {
+                "chunks": copied,
+                "text_blocks_repacked": repacked,
+                "disk_size_before": size_before,
+                "disk_size_after": size_after
+            }
+        except Exception as e:
+            logger.error(f"Compaction failed: {e}")
+            raise
+
+    def iter_batches(
+        self,
+        include: List[str],
+        batch_size: Optional[int] = None,
+        ids: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Page through the whole collection, SCAN_BATCH_SIZE rows at a time.
+
+        Callers that need a consistent view should hold ``write_lock``, or
+        list the ids under it and pass them as ``ids``: only those chunks
+        are read, and any deleted since are left out.
+        Requested documents are filled in from the text store, and
+        embeddings are always full-dimension ones.
+        """
+        batch_size = batch_size or self.SCAN_BATCH_SIZE
+        offset = 0
+        while True:
+            if ids is None:
+                page = self._get(include=include, limit=batch_size, offset=offset)
+                read = len(page.pop("read"))
+                if not read:
+                    break
+                offset += read
+                if not page["ids"]:
+                    continue
+            elif offset < len(ids):
+                page = self._get(ids=ids[offset:offset + batch_size], include=include)
+                page.pop("read")
+                offset += batch_size
+                if not page["ids"]:
+                    continue
+            else:
+                break
+            if "documents" in include and self.texts is not None:
+                page["documents"] = self.texts.fill(page["ids"], page["documents"])
+            yield page
+
+    def _get(self, include: List[str], **kwargs) -> Dict[str, Any]:
+        """``collection.get`` with full-dimension embeddings.
+
+        When the collection indexes projected vectors, the full ones come
+        from the side store, and rows deleted in between are left out;
+        ``read`` lists every id the collection returned.
+        """
+        collection = self.collection
+        projection = self._projection_of(collection)
+        if projection is None or "embeddings" not in include:
+            page = collection.get(include=include, **kwargs)
+            page["read"] = page["ids"]
+            return page
+        page = collection.get(include=[field for field in include if field != "embeddings"], **kwargs)
+        page["read"] = page["ids"]
+        found, vectors = self.full_vectors.get(page["ids"])
+        if len(found) < len(page["ids"]):
+            present = set(found)
+            keep = [i for i, chunk_id in enumerate(page["ids"]) if chunk_id in present]
+            for field in ("ids", "metadatas", "documents"):
+                if page.get(field) is not None:
+                    page[field] = [page[field][i] for i in keep]
+        page["embeddings"] = vectors
+        return page
+
+    def rebuild_centroids(self):
+        """Recompute every document centroid from its chunks"""
+        with self._write_lock:
+            self._reset_centroids()
+            for source in list(self._source_counts):
+                self._rebuild_centroid(source)
+        logger.info(f"Rebuilt {self._centroid_count} document centroids")
+
+    @staticmethod
+    def _centroid_id(source: str) -> str:
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def _update_centroids(self, metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        """Fold a batch of new chunk vectors into their documents' running means"""
+        vectors = np.asarray(embeddings, dtype=np.float64)
+        sums: Dict[str, np.ndarray] = {}
+        counts: Dict[str, int] = {}
+        for metadata, vector in zip(metadatas, vectors):
+            source = metadata.get("source", "unknown")
+            sums[source] = sums.get(source, 0) + vector
+            counts[source] = counts.get(source, 0) + 1
+
+        ids = [self._centroid_id(source) for source in sums]
+        existing = self.centroids.get(ids=ids, include=["embeddings", "metadatas"])
+        previous = {
+            metadata["source"]: (np.asarray(embedding, dtype=np.float64), metadata["chunk_count"])
+            for embedding, metadata in zip(existing["embeddings"] if existing["ids"] else [], existing["metadatas"] or [])
+        }
+
+        centroids, centroid_metadatas = [], []
+        for source, total in sums.items():
+            mean, count = previous.get(source, (0.0, 0))
+            new_count = count + counts[source]
+            centroids.append(((mean * count + total) / new_count).tolist())
+            centroid_metadatas.append({"source": source, "chunk_count": new_count})
+        self.centroids.upsert(ids=ids, embeddings=centroids, metadatas=centroid_metadatas)
+        self._centroid_count = self.centroids.count()
+
+    def _rebuild_centroid(self, source: str):
+        """Recompute one document's centroid, or drop it if no chunks remain"""
+        total, count, offset = None, 0, 0
+        while True:
+            page = self._get(
+                where={"source": source},
+                include=["embeddings"],
+                limit=self.SCAN_BATCH_SIZE,
+                offset=offset
+            )
+            if not page["read"]:
+                break
+            offset += len(page["read"])
+            if not page["ids"]:
+                continue
+            vectors = np.asarray(page["embeddings"], dtype=np.float64)
+            total = vectors.sum(axis=0) if total is None else total + vectors.sum(axis=0)
+            count += len(vectors)
+
+        centroid_id = self._centroid_id(source)
+        if count:
+            self.centroids.upsert(
+                ids=[centroid_id],
+                embeddings=[(total / count).tolist()],
+                metadatas=[{"source": source, "chunk_count": count}]
+            )
+        else:
+            self.centroids.delete(ids=[centroid_id])
+        self._centroid_count = self.centroids.count()
+
+    def _reset_centroids(self):
+        self._delete_collection(self.centroids.name)
+        self.centroids = self.client.create_collection(f"{self.collection_name}_centroids")
+        self._centroid_count = 0
+
+    def _reset_projection(self):
+        """Drop the projection and full vectors, which belonged to the old corpus"""
+        for projection_file in self._projections:
+            (Path(self.persist_directory) / projection_file).unlink(missing_ok=True)
+        self._projections = {}
+        if self.full_vectors is not None:
+            self.full_vectors.clear()
+
+    def _drop_collection(self, name: str):
+        """Delete a collection if it exists"""
+        try:
+            self._delete_collection(name)
+        except chromadb.errors.NotFoundError:
+            pass
+
+    def _delete_collection(self, name: str):
+        """Delete a collection, and for a local store its segment files.
+
+        Chroma forgets a deleted collection's segments but leaves their
+        directories (the HNSW index files) on disk, where nothing would
+        ever remove them.
+        """
+        segment_ids = self._segment_ids(name)
+        self.client.delete_collection(name)
+        for segment_id in segment_ids:
+            shutil.rmtree(Path(self.persist_directory) / segment_id, ignore_errors=True)
+
+    def _segment_ids(self, name: Optional[str] = None) -> List[str]:
+        """Ids of the segments of one collection, or of every collection"""
+        db_path = Path(self.persist_directory) / "chroma.sqlite3"
+        if self.remote is not None or not db_path.exists():
+            return []
+        query = "SELECT s.id FROM segments s JOIN collections c ON s.collection = c.id"
+        try:
+            with sqlite3.connect(str(db_path), timeout=30) as conn:
+                if name is None:
+                    return [row[0] for row in conn.execute(query)]
+                return [row[0] for row in conn.execute(f"{query} WHERE c.name = ?", (name,))]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not list Chroma segments: {e}")
+            return []
+
+    def _remove_orphan_segments(self):
+        """Remove segment directories of collections deleted before they were cleaned up"""
+        live = set(self._segment_ids())
+        if not live:
+            return
+        for path in Path(self.persist_directory).iterdir():
+            try:
+                uuid.UUID(path.name)
+            except ValueError:
+                continue
+            if path.is_dir() and path.name not in live:
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info(f"Removed orphaned segment directory {path.name}")
+
+    def _recover_interrupted_swap(self):
+        """Finish or undo a collection swap that a crash interrupted.
+
+        A swap renames the live collection to ``_retired`` and a complete
+        ``_staging`` copy to the live name, then drops ``_retired``. With
+        the live name missing and both others present, the crash fell
+        between the renames and the staging copy is promoted; otherwise
+        leftovers are dropped, as they would block the next swap's renames.
+        Only for a local store: against a shared server, another pod's swap
+        may be in progress.
+        """
+        def exists(name: str) -> bool:
+            try:
+                self.client.get_collection(name)
+                return True
+            except chromadb.errors.NotFoundError:
+                return False
+
+        staging_name = f"{self.collection_name}_staging"
+        retired_name = f"{self.collection_name}_retired"
+        if not exists(self.collection_name) and exists(retired_name) and exists(staging_name):
+            self.client.get_collection(staging_name).modify(name=self.collection_name)
+            logger.warning(f"Finished an interrupted swap of collection {self.collection_name}")
+        # Including the staging names earlier versions used
+        for name in (
+            retired_name, staging_name, f"{self.collection_name}_compact",
+            f"{self.collection_name}_reduced_staging", f"{self.collection_name}_reduced_retired"
+        ):
+            if exists(name):
+                self._delete_collection(name)
+                logger.warning(f"Dropped leftover collection {name}")
+
+    def _vacuum(self):
+        if self.remote is not None:
+            # The server's storage is not ours to vacuum
+            return
+        db_path = Path(self.persist_directory) / "chroma.sqlite3"
+        if not db_path.exists():
+            return
+        try:
+            with sqlite3.connect(str(db_path), timeout=30) as conn:
+                conn.execute("VACUUM")
+        except sqlite3.Error as e:
+            # The store stays valid, only the space is not reclaimed
+            logger.warning(f"SQLite vacuum skipped: {e}")
+
+    @property
+    def write_lock(self) -> threading.RLock:
+        """Lock serializing writers; hold it to read a consistent view"""
+        return self._write_lock
+
+    def count(self) -> int:
+        """Number of chunks in the collection, served from memory"""
+        if self.remote is not None:
+            self._follow_remote()
+        return self._chunk_count
+
     def is_empty(self) -> bool:
-        return self.collection.count() == 0
\ No newline at end of file
+        return self.count() == 0
+
+    def _follow_remote(self):
+        """Pick up writes other pods made to the shared collection.
+
+        At most every ``refresh_interval`` seconds the server's chunk count
+        is compared with ours; a difference bumps ``version`` and reloads
+        the per-document counts in the background, from the centroid
+        collection (one row per document). Only a collection another pod
+        replaced (clear, compact) is reopened by name and scanned in full.
+        """
+        now = time.monotonic()
+        if now - self._remote_checked_at < self.remote.refresh_interval:
+            return
+        self._remote_checked_at = now
+        replaced = False
+        try:
+            total = self.collection.count()
+        except chromadb.errors.NotFoundError:
+            self.collection = self.client.get_or_create_collection(self.collection_name)
+            self.centroids = self.client.get_or_create_collection(f"{self.collection_name}_centroids")
+            total, replaced = None, True
+        except Exception as e:
+            logger.warning(f"Could not check the remote collection: {e}")
+            return
+        with self._stats_lock:
+            if (total == self._chunk_count and not replaced) or self._remote_refreshing:
+                return
+            if total is not None:
+                self._chunk_count = total
+            self.version += 1
+            self._remote_refreshing = True
+        threading.Thread(
+            target=self._refresh_remote, args=(replaced,), name="remote-stats", daemon=True
+        ).start()
+
+    def _refresh_remote(self, replaced: bool):
+        try:
+            if replaced:
+                self._load_stats()
+            else:
+                self._load_source_counts()
+            self._centroid_count = self.centroids.count()
+        except Exception as e:
+            logger.warning(f"Reloading remote collection stats failed: {e}")
+        finally:
+            self._remote_refreshing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return collection statistics without scanning the collection"""
+        with self._stats_lock:
+            if self._disk_size is None:
+                self._disk_size = self._measure_disk_size()
+            return {
+                "collection": self.collection_name,
+                "total_chunks": self._chunk_count,
+                "total_documents": len(self._source_counts),
+                "chunks_per_source": dict(self._source_counts),
+                "dimension": self._dimension,
+                "disk_size_bytes": self._disk_size,
+                "document_centroids": self._centroid_count,
+                "coarse_search": self.coarse_search_enabled(),
+                "text_store": self.texts.stats() if self.texts is not None else None,
+                "reduced_search": self.reduced_search_enabled(),
+                "projection": self.projection.stats() if self.projection is not None else None,
+                "full_vectors": self.full_vectors.stats() if self.full_vectors is not None else None,
+                "tiered_search": self.tiered_search_enabled(),
+                "remote": self.remote.stats() if self.remote is not None else None,
+                "version": self.version
+            }
+
+    def refresh_stats(self):
+        """Rebuild statistics from the collection (one paged metadata scan)"""
+        self._load_stats()
+
+    def _load_stats(self):
+        source_counts: Dict[str, int] = {}
+        total = self.collection.count()
+        for page in self.iter_batches(include=["metadatas"]):
+            for metadata in page["metadatas"] or []:
+                source = (metadata or {}).get("source", "unknown")
+                source_counts[source] = source_counts.get(source, 0) + 1
+
+        dimension = None
+        if total:
+            sample = self._get(limit=1, include=["embeddings"])
+            if sample["embeddings"] is not None and len(sample["embeddings"]):
+                dimension = len(sample["embeddings"][0])
+
+        with self._stats_lock:
+            self._chunk_count = total
+            self._source_counts = source_counts
+            self._dimension = dimension
+            self._disk_size = None
+            self.version += 1
+        logger.info(f"Loaded stats: {total} chunks from {len(source_counts)} documents")
+
+    def _load_source_counts(self):
+        """Per-document chunk counts as the centroid collection records them"""
+        source_counts: Dict[str, int] = {}
+        offset = 0
+        while True:
+            page = self.centroids.get(include=["metadatas"], limit=self.SCAN_BATCH_SIZE, offset=offset)
+            if not page["ids"]:
+                break
+            for metadata in page["metadatas"]:
+                source_counts[metadata["source"]] = metadata["chunk_count"]
+            offset += len(page["ids"])
+        with self._stats_lock:
+            self._source_counts = source_counts
+            self.version += 1
+
+    def _record_added(self, metadatas: List[Dict[str, Any]], embeddings: np.ndarray):
+        with self._stats_lock:
+            self._chunk_count += len(metadatas)
+            for metadata in metadatas:
+                source = metadata.get("source", "unknown")
+                self._source_counts[source] = self._source_counts.get(source, 0) + 1
+            if self._dimension is None and len(embeddings):
+                self._dimension = int(np.shape(embeddings)[-1])
+            self._disk_size = None
+            self.version += 1
+
+    def _record_removed(self, source_counts: Dict[str, int]):
+        with self._stats_lock:
+            for source, removed in source_counts.items():
+                remaining = self._source_counts.get(source, 0) - removed
+                if remaining > 0:
+                    self._source_counts[source] = remaining
+                else:
+                    self._source_counts.pop(source, None)
+                self._chunk_count = max(0, self._chunk_count - removed)
+            self._disk_size = None
+            self.version += 1
+
+    def _reset_stats(self):
+        with self._stats_lock:
+            self._chunk_count = 0
+            self._source_counts = {}
+            self._disk_size = None
+            self.version += 1
+
+    def _measure_disk_size(self) -> Optional[int]:
+        if self.remote is not None:
+            # Held by the server; the local directory says nothing about it
+            return None
+        path = Path(self.persist_directory)
+        if not path.exists():
+            return 0
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
@@ -0,0 +1,9 @@
+from .query import QueryRequest, SearchResult, QueryResponse
+from .embed import EmbedRequest
+
+__all__ = [
+    "QueryRequest",
+    "SearchResult",
+    "QueryResponse",
+    "EmbedRequest"
+]
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str] = Field(min_length=1)
+    # base64: one base64 string of the row-major float32 matrix in JSON;
+    # binary: the raw little-endian float32 bytes as the response body
+    encoding: Literal["base64", "binary"] = "base64"
+    normalize: bool = False
@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
+
+
+class QueryRequest(BaseModel):
+    query: str
+    top_k: int = Field(default=3, ge=1, le=50)
+    compact: bool = False
+    max_text_length: Optional[int] = Field(default=None, ge=1)
+    snippet_length: Optional[int] = Field(default=None, ge=1)
+    # 0 ranks by relevance only; higher values favour results unlike those already chosen
+    diversity: Optional[float] = Field(default=None, ge=0, le=1)
+    # Adjacent chunks of the same document to attach on each side of a hit
+    expand_neighbors: int = Field(default=0, ge=0, le=3)
+    # Time budget; stages that do not fit are skipped and the response is marked partial
+    deadline_ms: Optional[int] = Field(default=None, ge=1, le=60000)
+
+
+class SearchResult(BaseModel):
+    text: str
+    metadata: Dict[str, Any] = Field(default_factory=dict)
+    score: Optional[float] = None
+    id: str
+    neighbors: Optional[List[Dict[str, Any]]] = None
+    duplicates: Optional[List[Dict[str, Any]]] = None
+
+
+class QueryResponse(BaseModel):
+    query: Optional[str] = None
+    results: List[SearchResult] = Field(default_factory=list)
+    total_results: int = 0
+    categories: Optional[Dict[str, List[SearchResult]]] = None
+    message: Optional[str] = None
+    processing_time: Optional[float] = None
+    partial: Optional[bool] = None
+    degraded: Optional[List[str]] = None
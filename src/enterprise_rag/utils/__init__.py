@@ -0,0 +1,6 @@
+from .text import truncate_text, make_snippet
+
+__all__ = [
+    "truncate_text",
+    "make_snippet"
+]
@@ -0,0 +1,53 @@
+import re
+from typing import Optional
+
+_WORD_RE = re.compile(r"\w+")
+_ELLIPSIS = "…"
+
+
+def truncate_text(text: str, max_length: Optional[int]) -> str:
+    """Cut text to at most max_length characters, ending on a word boundary"""
+    if not max_length or len(text) <= max_length:
+        return text
+    cut = text[:max_length]
+    space = cut.rfind(" ")
+    if space > max_length // 2:
+        cut = cut[:space]
+    return cut.rstrip() + _ELLIPSIS
+
+
+def make_snippet(text: str, query: str, length: int) -> str:
+    """Return a window of roughly `length` characters around the first query term hit"""
+    if len(text) <= length:
+        return text
+
+    lowered = text.lower()
+    position = -1
+    for term in _WORD_RE.findall(query.lower()):
+        if len(term) < 3:
+            continue
+        position = lowered.find(term)
+        if position >= 0:
+            break
+
+    if position < 0:
+        return truncate_text(text, length)
+
+    start = max(0, position - length // 3)
+    end = min(len(text), start + length)
+    start = max(0, end - length)
+
+    # Avoid cutting words in half at either edge
+    if start > 0:
+        space = text.find(" ", start)
+        if 0 <= space < position:
+            start = space + 1
+    if end < len(text):
+        space = text.rfind(" ", position, end)
+        if space > position:
+            end = space
+
+    snippet = text[start:end].strip()
+    prefix = _ELLIPSIS if start > 0 else ""
+    suffix = _ELLIPSIS if end < len(text) else ""
+    return f"{prefix}{snippet}{suffix}"
@@ -0,0 +1,74 @@
+from enterprise_rag.core.dedup import DedupIndex
+from enterprise_rag.core.ingest_log import chunk_ids
+
+TEXTS = [
+    "Radiation dose limits for occupational workers are fifty millisievert in any single year.",
+    "Emergency procedures require evacuation of the area and notification of the safety officer.",
+    "Protective equipment includes lead aprons, personal dosimeters and portable shielding panels.",
+    "Transport of radioactive materials follows the packaging and labelling rules of the regulator."
+]
+
+
+def _document(source, doc_hash, texts=TEXTS):
+    return [
+        {"text": text, "metadata": {"source": source, "doc_hash": doc_hash, "chunk_id": i}}
+        for i, text in enumerate(texts)
+    ]
+
+
+def _ingest(index, chunks):
+    """Partition and record chunks the way an upload does; returns the plan"""
+    plan = index.partition(chunks, chunk_ids(chunks))
+    index.register(
+        plan.ids,
+        [chunk["text"] for chunk in plan.unique],
+        [chunk["metadata"]["source"] for chunk in plan.unique],
+        [chunk["metadata"]["doc_hash"] for chunk in plan.unique]
+    )
+    index.add_duplicates(plan.duplicates)
+    return plan
+
+
+def test_identical_reupload_does_nothing(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    first = _ingest(index, _document("a.pdf", "h1"))
+    assert len(first.unique) == len(TEXTS) and not first.duplicates
+
+    again = _ingest(index, _document("a.pdf", "h1"))
+    assert again.unique == [] and again.duplicates == []
+    assert again.existing == len(TEXTS)
+    assert index.stats()["duplicate_chunks"] == 0
+    assert index.references(first.ids) == {}
+
+
+def test_copy_in_another_document_points_at_the_stored_chunks(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    original = _ingest(index, _document("a.pdf", "h1"))
+    # Differs in case and punctuation only, which shingling ignores
+    edited = [text.upper().rstrip(".") + "!" for text in TEXTS]
+
+    copy = _ingest(index, _document("b.pdf", "h2", edited))
+    assert copy.unique == []
+    assert sorted(canonical for canonical, _ in copy.duplicates) == sorted(original.ids)
+    assert all(metadata["source"] == "b.pdf" for _, metadata in copy.duplicates)
+
+
+def test_reuploading_a_copy_does_not_record_its_duplicates_again(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    _ingest(index, _document("a.pdf", "h1"))
+    _ingest(index, _document("b.pdf", "h2"))
+    assert index.stats()["duplicate_chunks"] == len(TEXTS)
+
+    again = _ingest(index, _document("b.pdf", "h2"))
+    assert again.duplicates == [] and again.existing == len(TEXTS)
+    assert index.stats()["duplicate_chunks"] == len(TEXTS)
+
+
+def test_chunk_is_not_matched_against_its_own_document(tmp_path):
+    index = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    _ingest(index, _document("a.pdf", "h1", TEXTS[:1]))
+
+    # The same text at another position of the same document version
+    repeated = [{"text": TEXTS[0], "metadata": {"source": "a.pdf", "doc_hash": "h1", "chunk_id": 5}}]
+    plan = index.partition(repeated, chunk_ids(repeated))
+    assert len(plan.unique) == 1 and plan.duplicates == []
@@ -0,0 +1,36 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import numpy as np
+import pytest
+
+from enterprise_rag.core.embed_batcher import EmbeddingBatcher
+
+
+class _BlockingService:
+    """Encodes only once ``release`` is set"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.encoded = []
+
+    def generate_embeddings(self, texts, priority=None):
+        self.release.wait(5)
+        self.encoded.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def test_timed_out_request_is_withdrawn_from_the_queue():
+    service = _BlockingService()
+    batcher = EmbeddingBatcher(service, max_wait_ms=0)
+
+    # The first request occupies the worker; the second waits in the queue
+    with pytest.raises(FutureTimeoutError):
+        batcher.embed(["first"], timeout=0.05)
+    with pytest.raises(FutureTimeoutError):
+        batcher.embed(["second"], timeout=0.05)
+
+    service.release.set()
+    assert batcher.embed(["third"], timeout=5).shape == (1, 4)
+    assert "second" not in service.encoded
+    assert batcher.stats()["withdrawn"] == 1
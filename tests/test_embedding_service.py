@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from enterprise_rag.core.embedding_pool import EmbeddingWorkerPool
+from enterprise_rag.core.embedding_service import (
+    EmbeddingScheduler,
+    EmbeddingService,
+    PRIORITY_BULK
+)
+
+
+class _Pool:
+    """Replica pool stand-in; batches resolve at once, or fail from ``fail_at`` on"""
+
+    task_timeout = 1.0
+    shards = EmbeddingWorkerPool.shards
+
+    def __init__(self, scheduler, replicas=2, fail_at=None):
+        self.scheduler = scheduler
+        self.replicas = replicas
+        self.fail_at = fail_at
+        self.submitted = 0
+        self.slots_held = []
+
+    def submit(self, texts):
+        future = Future()
+        if self.fail_at is not None and self.submitted >= self.fail_at:
+            future.set_exception(RuntimeError("replica exited"))
+        else:
+            future.set_result(np.ones((len(texts), 4), dtype=np.float32))
+        self.submitted += 1
+        return future
+
+    def encode(self, texts):
+        self.slots_held.append(self.scheduler._active)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+def _service(replicas=2, fail_at=None):
+    """A pooled service without worker processes or a model"""
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.model = None
+    service.bulk_batch_size = 4
+    service.token_budget = 8192
+    service.scheduler = EmbeddingScheduler(capacity=replicas)
+    service.pool = _Pool(service.scheduler, replicas, fail_at)
+    return service
+
+
+def test_caller_waits_for_every_slot_it_asks_for():
+    scheduler = EmbeddingScheduler(capacity=2)
+    scheduler.enter()
+    entered = threading.Event()
+
+    def wide():
+        with scheduler.acquire(slots=2):
+            entered.set()
+
+    thread = threading.Thread(target=wide)
+    thread.start()
+    assert not entered.wait(0.1)
+    scheduler.exit()
+    assert entered.wait(1)
+    thread.join()
+    assert scheduler._active == 0
+
+
+def test_sharded_encode_holds_one_slot_per_shard():
+    service = _service(replicas=2)
+    service.generate_embeddings(["text"] * 4)
+    service.generate_embeddings(["text"] * 32)
+    assert service.pool.slots_held == [1, 2]
+    assert service.scheduler._active == 0
+
+
+def test_closing_the_batch_iterator_early_frees_its_slots():
+    service = _service(replicas=2)
+    batches = service.iter_embeddings(["text"] * 40, PRIORITY_BULK)
+    next(batches)
+    assert service.scheduler._active > 0
+    batches.close()
+    assert service.scheduler._active == 0
+
+
+def test_failed_batch_frees_the_slots_of_those_still_in_flight():
+    service = _service(replicas=2, fail_at=2)
+    with pytest.raises(RuntimeError):
+        for _ in service.iter_embeddings(["text"] * 40, PRIORITY_BULK):
+            pass
+    assert service.scheduler._active == 0
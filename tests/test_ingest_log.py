@@ -0,0 +1,75 @@
+import numpy as np
+
+from enterprise_rag.core.ingest_log import IngestLog, chunk_ids
+from enterprise_rag.core.vector_store import VectorStore
+
+TEXTS = [
+    "Radiation dose limits for occupational workers are fifty millisievert in any single year.",
+    "Emergency procedures require evacuation of the area and notification of the safety officer.",
+    "Protective equipment includes lead aprons, personal dosimeters and portable shielding panels.",
+    "Transport of radioactive materials follows the packaging and labelling rules of the regulator."
+]
+
+
+def _document(source, doc_hash, count=len(TEXTS)):
+    return [
+        {"text": TEXTS[i % len(TEXTS)] + f" ({i})", "metadata": {"source": source, "doc_hash": doc_hash, "chunk_id": i}}
+        for i in range(count)
+    ]
+
+
+def _log_chunks(log, source, doc_hash, chunks):
+    """Log and apply an upload's chunks without finishing it; returns its key"""
+    doc_key = log.begin(source, doc_hash)
+    embeddings = np.random.default_rng(len(chunks)).standard_normal((len(chunks), 8)).astype(np.float32)
+    log.append(doc_key, chunks, embeddings, chunk_ids(chunks))
+    log.flush(doc_key)
+    return doc_key
+
+
+def test_unfinished_upload_is_rolled_back(tmp_path):
+    store = VectorStore("docs", str(tmp_path / "store"))
+    log = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store, group_size=4)
+    _log_chunks(log, "a.pdf", "h1", _document("a.pdf", "h1", 10))
+    assert store.count() == 10
+
+    # The process dies before finish(); the next start recovers
+    recovered = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store).recover()
+    assert recovered == {"rolled_forward": 0, "rolled_back": 1, "resume": ["a.pdf"]}
+    assert store.count() == 0
+
+
+def test_rolling_back_a_reupload_keeps_the_stored_copy(tmp_path):
+    store = VectorStore("docs", str(tmp_path / "store"))
+    log = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store, group_size=4)
+    chunks = _document("a.pdf", "h1", 10)
+    log.finish(_log_chunks(log, "a.pdf", "h1", chunks), [])
+
+    _log_chunks(log, "a.pdf", "h1", chunks)
+    recovered = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store).recover()
+    assert recovered["rolled_back"] == 1
+    assert store.count() == 10
+
+
+def test_sealed_upload_is_rolled_forward_once(tmp_path, monkeypatch):
+    store = VectorStore("docs", str(tmp_path / "store"), dedup_threshold=0.85)
+    log = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store)
+    original = _document("a.pdf", "h1")
+    plan = store.dedup.partition(original, chunk_ids(original))
+    log.finish(_log_chunks(log, "a.pdf", "h1", plan.unique), plan.duplicates)
+
+    # A copy is stored by reference; the process dies after sealing it
+    copy = _document("b.pdf", "h2")
+    plan = store.dedup.partition(copy, chunk_ids(copy))
+    assert plan.unique == [] and len(plan.duplicates) == len(copy)
+    doc_key = log.begin("b.pdf", "h2")
+    monkeypatch.setattr(log, "_close", lambda key: None)
+    log.finish(doc_key, plan.duplicates)
+
+    reopened = IngestLog(str(tmp_path / "ingest_log.sqlite3"), store)
+    recovered = reopened.recover()
+    assert recovered == {"rolled_forward": 1, "rolled_back": 0, "resume": []}
+    # References recorded before the crash are not recorded twice
+    assert store.dedup.stats()["duplicate_chunks"] == len(copy)
+    assert reopened.stats()["open_documents"] == 0
+    assert store.count() == len(original)
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from enterprise_rag.core.memory_governor import MemoryGovernor
+
+
+def _run_jobs(governor, steps, count=2, admitted=None):
+    """Run ``count`` jobs that each make the reservations in ``steps``; returns their threads.
+
+    Every job holds its first reservation before any makes the next one;
+    ``admitted`` runs once at that point.
+    """
+    barrier = threading.Barrier(count, action=admitted)
+
+    def job(name):
+        with governor.job(name) as held:
+            governor.reserve(held, steps[0], "chunks")
+            barrier.wait()
+            for nbytes in steps[1:]:
+                with governor.reservation(held, nbytes, "embed"):
+                    time.sleep(0.01)
+
+    threads = [threading.Thread(target=job, args=(f"job-{i}",), daemon=True) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_jobs_holding_memory_do_not_deadlock():
+    governor = MemoryGovernor(budget_bytes=100, poll_interval=0.01)
+    threads = _run_jobs(governor, [40, 30, 30])
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert governor.in_flight == 0
+
+
+def test_concurrent_jobs_over_rss_limit_do_not_deadlock():
+    governor = MemoryGovernor(budget_bytes=1000, poll_interval=0.01)
+
+    def exceed_rss():
+        governor.rss_limit_bytes = 1
+
+    threads = _run_jobs(governor, [40, 30, 30], count=3, admitted=exceed_rss)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_new_job_waits_for_running_job():
+    governor = MemoryGovernor(budget_bytes=100, poll_interval=0.01)
+    admitted = threading.Event()
+    with governor.job("first") as first:
+        governor.reserve(first, 80)
+
+        def second():
+            with governor.job("second") as job:
+                governor.reserve(job, 50)
+                admitted.set()
+
+        thread = threading.Thread(target=second, daemon=True)
+        thread.start()
+        assert not admitted.wait(0.2)
+    assert admitted.wait(5)
+    thread.join(timeout=5)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from enterprise_rag.core.projection import Projection, evaluate_recall
+from enterprise_rag.core.vector_store import VectorStore
+
+DIMENSION = 64
+REDUCED = 8
+
+
+def _corpus(count=1000, seed=0):
+    """Vectors near an 8-dimensional subspace, and queries near stored vectors"""
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((REDUCED, DIMENSION))
+    vectors = (rng.standard_normal((count, REDUCED)) @ basis + 0.05 * rng.standard_normal((count, DIMENSION)))
+    queries = vectors[rng.choice(count, size=40, replace=False)] + 0.1 * rng.standard_normal((40, DIMENSION))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def test_rescoring_recovers_the_exact_ranking():
+    vectors, queries = _corpus()
+    projection = Projection.fit("pca", REDUCED, np.array_split(vectors, 4))
+    assert projection.explained_variance > 0.95
+
+    report = evaluate_recall(vectors, queries, projection, [1, 10], rescore_factor=4)
+    assert report["recall"]["@10"] >= 0.95
+    assert report["recall"]["@10"] >= report["recall_without_rescoring"]["@10"]
+
+
+def test_projection_save_and_load(tmp_path):
+    vectors, _ = _corpus(200)
+    projection = Projection.fit("pca", REDUCED, [vectors])
+    projection.save(str(tmp_path / "projection.npz"))
+    loaded = Projection.load(str(tmp_path / "projection.npz"))
+    assert loaded.stats() == projection.stats()
+    assert np.array_equal(loaded.transform(vectors), projection.transform(vectors))
+
+    truncate = Projection.fit("truncate", REDUCED, [vectors])
+    assert np.allclose(np.linalg.norm(truncate.transform(vectors), axis=1), 1.0, atol=1e-5)
+
+
+def test_reduced_search_is_rescored_with_full_vectors(tmp_path):
+    vectors, queries = _corpus()
+    store = VectorStore("docs", str(tmp_path), reduced_dimension=REDUCED, rescore_factor=4)
+    documents = [{"text": f"chunk {i}", "metadata": {"source": "a.pdf", "chunk_id": i}} for i in range(len(vectors))]
+    store.add_documents(documents, vectors, ids=[str(i) for i in range(len(vectors))])
+    store.fit_projection()
+    assert store.reduced_search_enabled()
+    # The index holds projected vectors; the full ones sit in the side store
+    assert len(store.collection.get(limit=1, include=["embeddings"])["embeddings"][0]) == REDUCED
+    assert store.get_stats()["dimension"] == DIMENSION
+
+    recalls = []
+    for query in queries:
+        results = store.search(query, top_k=10, include_embeddings=True)
+        found = [int(result["id"]) for result in results]
+        exact = ((vectors[found] - query) ** 2).sum(axis=1)
+        # Scores are full-dimension distances, in order
+        assert np.allclose([result["score"] for result in results], exact, rtol=1e-4)
+        assert list(exact) == sorted(exact)
+        assert results[0]["embedding"].shape == (DIMENSION,)
+        truth = np.argsort(((vectors - query) ** 2).sum(axis=1))[:10]
+        recalls.append(len(set(found) & set(truth.tolist())) / 10)
+    assert np.mean(recalls) >= 0.95
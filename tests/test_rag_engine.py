@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+
+from enterprise_rag.core.rag_engine import RAGEngine
+
+
+class _Embedder:
+    def generate_embeddings(self, texts):
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+
+class _Store:
+    """Two hits, each with one neighbor; records when neighbors are looked up"""
+
+    version = 0
+
+    def __init__(self, log):
+        self.log = log
+
+    def search(self, query_embedding, top_k, include_embeddings=False):
+        return [
+            {"text": f"hit {i}", "metadata": {"source": "a.pdf", "chunk_id": i * 10}, "score": 0.1, "id": f"h{i}"}
+            for i in range(2)
+        ][:top_k]
+
+    def get_neighbors(self, hits, window=1):
+        self.log.append("expand")
+        return [[{"id": f"{hit['id']}-next", "text": "next"}] for hit in hits]
+
+
+def _stream(engine, log, **kwargs):
+    """Run stream_query to the end, logging each event as it is received"""
+    async def collect():
+        events = []
+        async for event in engine.stream_query("dose limits", **kwargs):
+            log.append(event["event"])
+            events.append(event)
+        return events
+    return asyncio.run(collect())
+
+
+def test_stream_sends_hits_before_looking_up_neighbors():
+    log = []
+    engine = RAGEngine(_Embedder(), _Store(log), cache_size=0)
+    events = _stream(engine, log, top_k=2, expand_neighbors=1)
+
+    assert log == ["result", "result", "expand", "neighbors", "neighbors", "done"]
+    assert [event["data"]["id"] for event in events[:2]] == ["h0", "h1"]
+    assert "neighbors" not in events[0]["data"]
+    assert events[2]["data"] == {"rank": 0, "id": "h0", "neighbors": [{"id": "h0-next", "text": "next"}]}
+    assert events[-1]["data"] == {"query": "dose limits", "total_results": 2}
+
+
+def test_stream_without_expansion_sends_no_neighbor_events():
+    log = []
+    engine = RAGEngine(_Embedder(), _Store(log), cache_size=0)
+    _stream(engine, log, top_k=2)
+    assert log == ["result", "result", "done"]
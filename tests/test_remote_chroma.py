@@ -0,0 +1,149 @@
+import shutil
+import socket
+import subprocess
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from enterprise_rag.core.remote_chroma import RemoteChromaClient
+from enterprise_rag.core.vector_store import VectorStore
+
+pytestmark = pytest.mark.skipif(shutil.which("chroma") is None, reason="needs the chroma CLI to run a server")
+
+
+@pytest.fixture(scope="module")
+def chroma_url(tmp_path_factory):
+    """URL of a Chroma server started for these tests"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        ["chroma", "run", "--path", str(tmp_path_factory.mktemp("chroma")), "--host", "127.0.0.1", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{url}/api/v2/heartbeat", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    pytest.fail("Chroma server did not start")
+                time.sleep(0.2)
+        yield url
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def _documents(source, count):
+    return [{"text": f"{source} chunk {i}", "metadata": {"source": source, "chunk_id": i}} for i in range(count)]
+
+
+def _eventually(check, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "condition not reached in time"
+        time.sleep(0.05)
+
+
+class _LosesResponses:
+    """Collection proxy whose next ``failures`` adds are applied but answer with a timeout"""
+
+    def __init__(self, collection, failures=1):
+        self._collection = collection
+        self.failures = failures
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def add(self, **kwargs):
+        await self._collection.add(**kwargs)
+        if self.failures:
+            self.failures -= 1
+            raise httpx.ReadTimeout("response lost")
+
+
+def test_write_by_another_pod_does_not_rescan_the_collection(chroma_url, tmp_path):
+    rng = np.random.default_rng(0)
+    writer = VectorStore("shared", str(tmp_path / "writer"), remote=RemoteChromaClient(chroma_url))
+    writer.add_documents(_documents("a.pdf", 50), rng.standard_normal((50, 16)).astype(np.float32))
+
+    reader = VectorStore(
+        "shared", str(tmp_path / "reader"), remote=RemoteChromaClient(chroma_url, refresh_interval=0.1)
+    )
+    assert reader.count() == 50
+    scans = []
+    full_scan = reader._load_stats
+    reader._load_stats = lambda: (scans.append(1), full_scan())
+
+    writer.add_documents(_documents("b.pdf", 20), rng.standard_normal((20, 16)).astype(np.float32))
+    _eventually(lambda: reader.count() == 70 and reader.get_stats()["chunks_per_source"].get("b.pdf") == 20)
+    writer.delete_document(source="a.pdf")
+    _eventually(lambda: reader.count() == 20 and "a.pdf" not in reader.get_stats()["chunks_per_source"])
+    assert scans == []
+
+    # A replaced collection is the one case that is scanned again
+    writer.clear()
+    _eventually(lambda: reader.count() == 0 and not reader.get_stats()["chunks_per_source"])
+    assert scans
+
+
+def test_add_whose_response_was_lost_is_retried_as_an_upsert(chroma_url):
+    client = RemoteChromaClient(chroma_url, backoff=0.01)
+    collection = client.get_or_create_collection("retries")
+    collection._collection = _LosesResponses(collection._collection)
+
+    ids = [f"chunk-{i}" for i in range(5)]
+    collection.add(ids=ids, embeddings=np.ones((5, 4)).tolist(), documents=ids)
+    assert collection.count() == 5
+    assert client.stats()["retried"] == 1 and client.stats()["failed"] == 0
+
+
+def test_permanent_error_is_not_retried(chroma_url):
+    client = RemoteChromaClient(chroma_url, backoff=0.01)
+    collection = client.get_or_create_collection("no_retries")
+    collection.add(ids=["a"], embeddings=[[1.0, 0.0]])
+
+    with pytest.raises(Exception):
+        # Wrong dimension: the server rejects it every time
+        collection.add(ids=["b"], embeddings=[[1.0, 0.0, 0.0]])
+    assert client.stats()["retried"] == 0 and client.stats()["failed"] == 1
+
+
+def test_concurrent_queries_are_sent_together_and_split_back(chroma_url):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 8)).astype(np.float32)
+    queries = rng.standard_normal((16, 8)).astype(np.float32)
+    setup = RemoteChromaClient(chroma_url).get_or_create_collection("pipelined")
+    setup.add(ids=[str(i) for i in range(200)], embeddings=vectors.tolist())
+
+    # Reference answers, one request per query
+    single = RemoteChromaClient(chroma_url, query_batch_ms=0).get_collection("pipelined")
+    expected = [single.query(query_embeddings=[query.tolist()], n_results=5)["ids"] for query in queries]
+
+    client = RemoteChromaClient(chroma_url, query_batch_ms=100)
+    collection = client.get_collection("pipelined")
+    results = [None] * len(queries)
+    barrier = threading.Barrier(len(queries))
+
+    def run(i):
+        barrier.wait()
+        results[i] = collection.query(query_embeddings=[queries[i].tolist()], n_results=5)["ids"]
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(queries))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == expected
+    stats = client.stats()
+    assert stats["queries"] == len(queries)
+    assert stats["queries_per_request"] > 1
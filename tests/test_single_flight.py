@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from enterprise_rag.core.deadline import Deadline, DeadlineExceeded
+from enterprise_rag.core.single_flight import SingleFlight
+
+
+def _work(scopes, seconds=0.2, result="done"):
+    """Work that records its scope, runs for ``seconds`` and then checks it"""
+    async def work(scope):
+        scopes.append(scope)
+        await asyncio.sleep(seconds)
+        scope.check("finish")
+        return result
+    return work
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    flight, scopes = SingleFlight(), []
+
+    async def run():
+        return await asyncio.gather(*(flight.do("q", _work(scopes, 0.05)) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["done"] * 3
+    assert len(scopes) == 1
+    assert flight.stats()["executed"] == 1 and flight.stats()["coalesced"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_scope_lasts_as_long_as_the_latest_caller():
+    flight, scopes = SingleFlight(), []
+
+    async def run():
+        short, long = Deadline(0.05), Deadline(5)
+        first = asyncio.ensure_future(flight.do("q", _work(scopes), short))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("q", _work(scopes), long))
+        await asyncio.sleep(0)
+        assert scopes[0].expires_at == long.expires_at
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+        # The early caller's deadline does not stop the work the later one waits for
+        return await second
+
+    assert asyncio.run(run()) == "done"
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_caller_without_deadline_lifts_the_scope_limit():
+    flight, scopes = SingleFlight(), []
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("q", _work(scopes, 0.1), Deadline(0.05)))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flight.do("q", _work(scopes, 0.1)))
+        await asyncio.sleep(0)
+        assert scopes[0].expires_at is None
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_work_abandoned_by_every_caller_is_cancelled():
+    flight, scopes = SingleFlight(), []
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("q", _work(scopes), Deadline(0.05))
+        assert scopes[0].cancelled
+        # A later caller does not join the abandoned work
+        assert await flight.do("q", _work(scopes, 0.01)) == "done"
+        with pytest.raises(DeadlineExceeded, match="abandoned"):
+            scopes[0].check("finish")
+
+    asyncio.run(run())
+    assert flight.stats()["abandoned"] == 1 and flight.stats()["executed"] == 2
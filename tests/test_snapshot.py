@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from enterprise_rag.core.snapshot import (
+    FORMAT_VERSION,
+    Snapshot,
+    SnapshotError,
+    export_snapshot,
+    import_snapshot,
+    install_snapshot
+)
+from enterprise_rag.core.vector_store import VectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = VectorStore("docs", str(tmp_path / "store"))
+    documents = [
+        {"text": f"chunk {i} of {source}", "metadata": {"source": source, "chunk_id": i}}
+        for source in ("a.pdf", "b.pdf") for i in range(30)
+    ]
+    vectors = np.random.default_rng(0).standard_normal((60, 16)).astype(np.float32)
+    store.add_documents(documents, vectors, ids=[f"id-{i}" for i in range(60)])
+    return store
+
+
+def _rows(store):
+    rows = {}
+    for page in store.iter_batches(include=["embeddings", "documents", "metadatas"]):
+        for chunk_id, vector, text, metadata in zip(
+            page["ids"], page["embeddings"], page["documents"], page["metadatas"]
+        ):
+            rows[chunk_id] = (np.asarray(vector, dtype=np.float32), text, metadata)
+    return rows
+
+
+def test_export_and_import_round_trip(store, tmp_path):
+    path = tmp_path / "latest.snap"
+    assert export_snapshot(store, str(path))["chunks"] == 60
+
+    snapshot = Snapshot(path, verify=True)
+    assert snapshot.header["format_version"] == FORMAT_VERSION
+    assert snapshot.header["store_version"] == store.version
+    assert snapshot.header["chunks_per_source"] == {"a.pdf": 30, "b.pdf": 30}
+    assert np.allclose(snapshot.sq_norms, (np.asarray(snapshot.vectors) ** 2).sum(axis=1), rtol=1e-5)
+
+    restored = VectorStore("restored", str(tmp_path / "restored"))
+    assert import_snapshot(restored, str(path)) == 60
+    original, copied = _rows(store), _rows(restored)
+    assert copied.keys() == original.keys()
+    for chunk_id, (vector, text, metadata) in original.items():
+        assert np.array_equal(copied[chunk_id][0], vector)
+        assert copied[chunk_id][1:] == (text, metadata)
+
+
+def test_float16_snapshot_keeps_vectors_to_half_precision(store, tmp_path):
+    path = tmp_path / "half.snap"
+    export_snapshot(store, str(path), dtype="float16")
+    snapshot = Snapshot(path, verify=True)
+    assert snapshot.vectors.dtype == np.float16
+    original = _rows(store)
+    for page in snapshot.iter_rows():
+        for chunk_id, vector in zip(page["ids"], page["embeddings"]):
+            assert np.allclose(vector, original[chunk_id][0], atol=1e-2)
+
+
+def test_corrupted_section_fails_verification(store, tmp_path):
+    path = tmp_path / "latest.snap"
+    export_snapshot(store, str(path))
+    offset = Snapshot(path).header["sections"]["vectors"]["offset"]
+    data = bytearray(path.read_bytes())
+    data[offset + 5] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(SnapshotError, match="Checksum mismatch in section vectors"):
+        Snapshot(path, verify=True)
+    with pytest.raises(SnapshotError):
+        install_snapshot(str(path), str(tmp_path / "shared"))
+    assert not (tmp_path / "shared" / "CURRENT").exists()
+
+
+def test_other_format_versions_and_truncated_files_are_refused(store, tmp_path):
+    path = tmp_path / "latest.snap"
+    export_snapshot(store, str(path))
+    data = path.read_bytes()
+
+    marker = f'"format_version": {FORMAT_VERSION}'.encode()
+    future = tmp_path / "future.snap"
+    future.write_bytes(data.replace(marker, f'"format_version": {FORMAT_VERSION + 1}'.encode()))
+    with pytest.raises(SnapshotError, match="Unsupported snapshot format"):
+        Snapshot(future)
+
+    truncated = tmp_path / "truncated.snap"
+    truncated.write_bytes(data[:-3])
+    with pytest.raises(SnapshotError, match="truncated"):
+        Snapshot(truncated)
@@ -0,0 +1,55 @@
+import sqlite3
+
+from enterprise_rag.core.text_store import TextStore
+
+
+def _texts(count):
+    ids = [f"chunk-{i}" for i in range(count)]
+    return ids, {chunk_id: f"{chunk_id} " + "radiation shielding " * 5 for chunk_id in ids}
+
+
+def test_repack_rewrites_mostly_dead_blocks_and_keeps_live_text(tmp_path):
+    store = TextStore(str(tmp_path / "text.sqlite3"), block_size=1000)
+    ids, texts = _texts(100)
+    store.put(ids, [texts[chunk_id] for chunk_id in ids])
+
+    # Keep one chunk in four: every block that still has a live chunk is
+    # left mostly dead
+    deleted = [chunk_id for i, chunk_id in enumerate(ids) if i % 4]
+    store.delete(deleted)
+    blocks = store.stats()["blocks"]
+    assert store.stats()["dead_chunks"] > 25
+
+    assert store.repack() == blocks
+    stats = store.stats()
+    assert stats["chunks"] == 25 and stats["dead_chunks"] == 0
+    assert stats["blocks"] < blocks
+    live = [chunk_id for i, chunk_id in enumerate(ids) if not i % 4]
+    assert store.get(live) == {chunk_id: texts[chunk_id] for chunk_id in live}
+    assert store.get(deleted) == {}
+
+
+def test_repack_leaves_mostly_live_blocks_alone(tmp_path):
+    store = TextStore(str(tmp_path / "text.sqlite3"), block_size=1000)
+    ids, texts = _texts(100)
+    store.put(ids, [texts[chunk_id] for chunk_id in ids])
+    store.delete(ids[::10])
+
+    assert store.repack() == 0
+    assert store.stats()["dead_chunks"] == 10
+    assert len(store.get(ids)) == 90
+
+
+def test_repack_handles_blocks_from_before_chunk_counts(tmp_path):
+    path = tmp_path / "text.sqlite3"
+    store = TextStore(str(path), block_size=1000)
+    ids, texts = _texts(40)
+    store.put(ids, [texts[chunk_id] for chunk_id in ids])
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("UPDATE blocks SET chunk_count = NULL")
+    store.delete(ids[1:])
+
+    assert store.stats()["dead_chunks"] is None
+    assert store.repack() >= 1
+    assert store.get(ids) == {ids[0]: texts[ids[0]]}
+    assert store.stats()["blocks"] == 1
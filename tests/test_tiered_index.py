@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from enterprise_rag.core.ivf import IVFIndex
+from enterprise_rag.core.tiered_index import TieredIndex
+from enterprise_rag.core.vector_store import VectorStore
+
+DOCUMENTS = 40
+CHUNKS = 100
+DIMENSION = 32
+TOP_K = 10
+
+
+def _corpus(seed=0):
+    """Chunks clustered around their document's topic, and queries near stored chunks"""
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((DOCUMENTS, DIMENSION)).astype(np.float32) * 3
+    vectors = np.repeat(topics, CHUNKS, axis=0) + rng.standard_normal((DOCUMENTS * CHUNKS, DIMENSION)).astype(np.float32)
+    picked = rng.choice(len(vectors), size=50, replace=False)
+    queries = vectors[picked] + 0.5 * rng.standard_normal((50, DIMENSION)).astype(np.float32)
+    return vectors, queries
+
+
+def _nearest(vectors, query, k=TOP_K):
+    return set(np.argsort(((vectors - query) ** 2).sum(axis=1))[:k].tolist())
+
+
+def _recall(found, expected):
+    return np.mean([len(f & e) / len(e) for f, e in zip(found, expected)])
+
+
+def test_ivf_recall_against_brute_force():
+    vectors, queries = _corpus()
+    ivf = IVFIndex.train(vectors, nlist=64)
+    expected = [_nearest(vectors, query) for query in queries]
+
+    def search(query, nprobe):
+        rows = ivf.probe(query, nprobe)
+        return {int(rows[i]) for i in _nearest(vectors[rows], query)}
+
+    assert _recall([search(query, 8) for query in queries], expected) >= 0.9
+    # Probing every list is an exact search
+    assert _recall([search(query, ivf.nlist) for query in queries], expected) == 1.0
+
+
+@pytest.fixture(scope="module")
+def tiered(tmp_path_factory):
+    vectors, queries = _corpus()
+    store = VectorStore("docs", str(tmp_path_factory.mktemp("store")))
+    documents = [
+        {"text": f"chunk {i}", "metadata": {"source": f"doc-{i // CHUNKS}.pdf", "chunk_id": i % CHUNKS}}
+        for i in range(len(vectors))
+    ]
+    store.add_documents(documents, vectors, ids=[str(i) for i in range(len(vectors))])
+    tiers = TieredIndex(
+        store,
+        str(tmp_path_factory.mktemp("tiers")),
+        hot_max_chunks=3 * CHUNKS,
+        min_rebuild_interval=0,
+        nprobe=8,
+        ivf_min_rows=1000
+    )
+    tiers.maintain()
+    return tiers, vectors, queries
+
+
+def _tier_search(tiers, query):
+    return {int(chunk_id) for chunk_id in tiers.search(query, TOP_K)["ids"][0]}
+
+
+def test_tiered_recall_against_brute_force(tiered):
+    tiers, vectors, queries = tiered
+    assert tiers.stats()["cold_chunks"] == len(vectors)
+    assert tiers._cold.ivf is not None
+
+    expected = [_nearest(vectors, query) for query in queries]
+    assert _recall([_tier_search(tiers, query) for query in queries], expected) >= 0.9
+
+
+def test_promoted_document_is_found_in_the_hot_tier(tiered):
+    tiers, vectors, queries = tiered
+    # Each query counts a hit document once; one more than promote_hits
+    # allows for the decay before maintenance runs
+    for _ in range(4):
+        tiers.record_hits([{"metadata": {"source": "doc-3.pdf"}}])
+    tiers.maintain()
+    assert tiers.stats()["hot_documents"] == 1
+
+    query = vectors[3 * CHUNKS + 7]
+    assert _tier_search(tiers, query) == _nearest(vectors, query)
+    assert tiers.hot_hits > 0
+    # Every query still sees the whole corpus, split across the tiers
+    expected = [_nearest(vectors, query) for query in queries]
+    assert _recall([_tier_search(tiers, query) for query in queries], expected) >= 0.9
@@ -0,0 +1,63 @@
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from enterprise_rag.core.vector_store import VectorStore
+
+
+def _add_document(store, source, count, rng):
+    documents = [
+        {"text": f"{source} chunk {i}", "metadata": {"source": source, "doc_hash": source, "chunk_id": i}}
+        for i in range(count)
+    ]
+    store.add_documents(documents, rng.standard_normal((count, 64)).astype(np.float32))
+
+
+def _segment_directories(path):
+    directories = set()
+    for entry in Path(path).iterdir():
+        try:
+            uuid.UUID(entry.name)
+        except ValueError:
+            continue
+        directories.add(entry.name)
+    return directories
+
+
+def test_compact_after_delete_shrinks_the_store(tmp_path):
+    store = VectorStore("docs", str(tmp_path))
+    rng = np.random.default_rng(0)
+    _add_document(store, "a.pdf", 3000, rng)
+    _add_document(store, "b.pdf", 3000, rng)
+    store.rebuild_centroids()
+
+    assert store.delete_document(source="a.pdf") == 3000
+    result = store.compact()
+    assert result["chunks"] == 3000
+    assert result["disk_size_after"] < result["disk_size_before"]
+
+
+def test_retired_collections_leave_no_segment_files(tmp_path):
+    store = VectorStore("docs", str(tmp_path))
+    _add_document(store, "a.pdf", 500, np.random.default_rng(0))
+    store.rebuild_centroids()
+    store.compact()
+    store.rebuild_centroids()
+
+    # Every segment directory left belongs to a live collection
+    assert _segment_directories(tmp_path) <= set(store._segment_ids())
+    store.clear()
+    assert _segment_directories(tmp_path) <= set(store._segment_ids())
+
+
+def test_orphaned_segment_directories_are_removed_on_open(tmp_path):
+    store = VectorStore("docs", str(tmp_path))
+    _add_document(store, "a.pdf", 100, np.random.default_rng(0))
+    orphan = tmp_path / str(uuid.uuid4())
+    orphan.mkdir()
+    (orphan / "data_level0.bin").write_bytes(b"\0" * 1024)
+
+    reopened = VectorStore("docs", str(tmp_path))
+    assert not orphan.exists()
+    assert reopened.count() == 100